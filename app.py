@@ -3,6 +3,10 @@ import pandas as pd
 import json
 import os
 import plotly.graph_objects as go
+from logic.result_sink import read_progress, read_partial_results
+from logic import scan_archive
+from logic import run_report
+from logic import portfolio
 
 st.set_page_config(page_title="Short Strangle Bot", layout="wide")
 
@@ -23,66 +27,191 @@ st.markdown("""
 # --- Data Loading ---
 DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
 SCAN_FILE = os.path.join(DATA_DIR, 'market_scan.csv')
+SCAN_PARQUET = os.path.join(DATA_DIR, 'market_scan.parquet')
 FII_FILE = os.path.join(DATA_DIR, 'fii_stats.json')
+STRIKES_FILE = os.path.join(DATA_DIR, 'delta_strikes.csv')
+REPORT_FILE = os.path.join(DATA_DIR, 'run_report.json')
+CORR_FILE = os.path.join(DATA_DIR, 'correlation.parquet')
+
+DISPLAY_COLUMNS = {
+    'Symbol': 'Symbol',
+    'Status': 'Trend Status',
+    'Close': 'Close',
+    'Volume': 'Volume (Qty)',
+    'Confidence': 'Total Confidence %',
+    'Target_Put': 'Sell Put Strike',
+    'Target_Call': 'Sell Call Strike',
+    'Put_Strike': 'Put 20Δ',
+    'Call_Strike': 'Call 20Δ',
+    'Max_Corr': 'Max Corr'
+}
+
+def file_mtime(path):
+    return os.path.getmtime(path) if os.path.exists(path) else None
+
+def scan_key():
+    """Identifies the published scan: changes whenever a new scan lands."""
+    return (file_mtime(SCAN_PARQUET), file_mtime(SCAN_FILE))
+
+# Every cached loader takes the scan key, so parsing and derived views are
+# computed once per new scan and reruns (row clicks) reuse them.
+@st.cache_data(max_entries=2, show_spinner=False)
+def load_scan(key):
+    parquet_mtime, csv_mtime = key
+    # Prefer the typed columnar file unless the CSV is newer (older scanner)
+    if parquet_mtime is not None and (csv_mtime is None or parquet_mtime >= csv_mtime):
+        return pd.read_parquet(SCAN_PARQUET)
+    if csv_mtime is not None:
+        return pd.read_csv(SCAN_FILE)
+    return pd.DataFrame()
+
+@st.cache_data(max_entries=2, show_spinner=False)
+def load_fii(mtime):
+    if mtime is None:
+        return {"ratio": 1.0, "status": "No Data"}
+    with open(FII_FILE, 'r') as f:
+        return json.load(f)
+
+@st.cache_data(max_entries=2, show_spinner=False)
+def load_strikes(mtime):
+    """20-delta strikes written by 'python -m logic.option_chain' after the scan."""
+    if mtime is None:
+        return pd.DataFrame()
+    return pd.read_csv(STRIKES_FILE)
+
+@st.cache_data(max_entries=2, show_spinner=False)
+def build_views(key, strikes_mtime=None):
+    """Passing (sorted) rows, their display frame and the full-scan table."""
+    df = load_scan(key)
+    if df.empty:
+        return df, df, df
+    strikes = load_strikes(strikes_mtime)
+    if not strikes.empty:
+        df = df.merge(strikes[['Symbol', 'Expiry', 'Put_Strike', 'Put_Delta', 'Put_IV', 'Call_Strike', 'Call_Delta', 'Call_IV', 'Credit']],
+                      on='Symbol', how='left')
+    sort_col = 'Volume' if 'Volume' in df.columns else 'Confidence'
+    passing_df = df[df['Passed'] == True].sort_values(by=sort_col, ascending=False).reset_index(drop=True)
+    cols_to_show = [c for c in DISPLAY_COLUMNS if c in df.columns]
+    display_df = passing_df[cols_to_show].rename(columns=DISPLAY_COLUMNS)
+    full_df = df.drop(columns=['Passed'] if 'Passed' in df.columns else [])
+    return passing_df, display_df, full_df
+
+@st.cache_data(max_entries=2, show_spinner=False)
+def load_run_report(mtime):
+    """Instrumentation report written by the last 'python -m logic.screener' run."""
+    if mtime is None:
+        return None
+    return run_report.load_report(REPORT_FILE)
+
+@st.cache_data(max_entries=2, show_spinner=False)
+def load_correlation(mtime):
+    """Correlations of the passing candidates, published by the last scan."""
+    if mtime is None:
+        return None
+    return portfolio.load_correlation(CORR_FILE)
+
+def archive_key():
+    """Latest archived session and its file mtime: changes when a scan is archived."""
+    dates = scan_archive.archived_dates()
+    if not dates:
+        return None
+    return dates[-1], file_mtime(os.path.join(scan_archive.ARCHIVE_DIR, f"date={dates[-1]}", 'scan.parquet'))
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def load_trend(symbol, key, sessions=90):
+    if key is None:
+        return pd.DataFrame()
+    return scan_archive.symbol_series(symbol, columns=('Confidence', 'ADX', 'RSI'), sessions=sessions)
+
+@st.cache_data(max_entries=2, show_spinner=False)
+def load_streaks(key, sessions=30):
+    if key is None:
+        return pd.Series(dtype=int)
+    return scan_archive.pass_streaks(sessions=sessions)
 
 def load_data():
-    if os.path.exists(SCAN_FILE):
-        df = pd.read_csv(SCAN_FILE)
-    else:
-        df = pd.DataFrame()
-    
-    if os.path.exists(FII_FILE):
-        with open(FII_FILE, 'r') as f:
-            fii = json.load(f)
-    else:
-        fii = {"ratio": 1.0, "status": "No Data"}
-    
-    return df, fii
+    key = scan_key()
+    return load_scan(key), load_fii(file_mtime(FII_FILE))
 
 df, fii = load_data()
+passing_df, display_df, full_df = build_views(scan_key(), file_mtime(STRIKES_FILE))
 
 # --- Header ---
 st.title("🎯 Theta Hunter Pro")
 
+# --- Live Scan Progress (streamed rows, never a half-written CSV) ---
+progress = read_progress()
+if progress and progress['status'] == 'running':
+    total = progress['total'] or 1
+    st.progress(min(1.0, progress['done'] / total), text=f"Scan #{progress['scan_id']} in progress: {progress['done']}/{total} stocks scored (started {progress['started']})")
+    # Intraday mode keeps a scan open all session; its rows are live re-scores
+    if df.empty or st.toggle("Show live intraday rows", value=False):
+        df = read_partial_results()
+        passing_df = df[df['Passed'] == True].reset_index(drop=True) if 'Passed' in df.columns else df
+        display_df = passing_df[[c for c in DISPLAY_COLUMNS if c in df.columns]].rename(columns=DISPLAY_COLUMNS)
+        full_df = df
+elif progress and progress['status'] == 'failed':
+    st.warning(f"Scan #{progress['scan_id']} (started {progress['started']}) stopped before publishing; showing the last completed scan.")
+
+# --- Last Run Health ---
+report = load_run_report(file_mtime(REPORT_FILE))
+if report:
+    dropped = report['universe'] - report['saved']
+    fetch = report.get('fetch', {})
+    with st.expander(f"🩺 Last run health: {report['saved']}/{report['universe']} saved, {dropped} dropped, {report['duration_s']:.0f}s ({report['finished']})", expanded=dropped > 0.1 * max(report['universe'], 1)):
+        h1, h2, h3, h4 = st.columns(4)
+        with h1: st.metric("Run time", f"{report['duration_s']:.0f}s")
+        with h2: st.metric("Saved", f"{report['saved']}/{report['universe']}", f"{report['cached']} from cache", delta_color="off")
+        with h3: st.metric("Fetch errors", fetch.get('errors', 0), f"{fetch.get('retries', 0)} retries", delta_color="off")
+        with h4: st.metric("Waiting on limits", f"{fetch.get('wait_s', 0):.0f}s")
+        f1, f2 = st.columns(2)
+        with f1:
+            funnel = pd.DataFrame(report['funnel'])
+            funnel_fig = go.Figure(go.Funnel(y=funnel['step'], x=funnel['count'], textinfo="value"))
+            funnel_fig.update_layout(height=320, margin={'t': 10, 'b': 10}, paper_bgcolor='rgba(0,0,0,0)', font={'color': "white"})
+            st.plotly_chart(funnel_fig, use_container_width=True)
+        with f2:
+            stages = pd.DataFrame(report['stages']).T.rename_axis('Stage').reset_index()
+            st.dataframe(stages, hide_index=True, use_container_width=True)
+            if report['failures']:
+                st.dataframe(pd.DataFrame(list(report['failures'].items()), columns=['Symbol', 'Reason']),
+                             hide_index=True, height=180, use_container_width=True)
+
 # --- Top Picks ---
 if not df.empty:
-    # Filter for Passing stocks first and sort by Volume
-    if 'Volume' in df.columns:
-        passing_df = df[df['Passed'] == True].sort_values(by='Volume', ascending=False).reset_index(drop=True)
-    else:
-        passing_df = df[df['Passed'] == True].sort_values(by='Confidence', ascending=False).reset_index(drop=True)
-    
     st.write(f"Showing {len(passing_df)} liquid sideways opportunities out of {len(df)} stocks scanned.")
-    
-    st.subheader("Top Sideways Opportunities (Sorted by Volume)")
+
+    # Diversified picks: re-optimized on every widget change (greedy pass over the cached matrix)
+    corr = load_correlation(file_mtime(CORR_FILE))
+    sort_label = "Volume"
+    if corr is not None and not passing_df.empty:
+        p1, p2, p3, p4, p5 = st.columns([1, 2, 1, 1, 1])
+        with p1: diversify = st.toggle("Diversify picks", value=False)
+        with p2: max_corr = st.slider("Max pair correlation", 0.2, 1.0, portfolio.MAX_CORR, 0.05, disabled=not diversify)
+        with p3: top_n = st.number_input("Picks", 1, 100, portfolio.TOP_N, disabled=not diversify)
+        with p4: rank_by = st.selectbox("Rank by", ['Volume', 'Confidence'], disabled=not diversify)
+        with p5: method = st.selectbox("Method", ['greedy', 'cluster'], disabled=not diversify)
+        if diversify:
+            passing_df = portfolio.select_diversified(passing_df, corr, int(top_n), max_corr, rank_by, method).reset_index(drop=True)
+            display_df = passing_df[[c for c in DISPLAY_COLUMNS if c in passing_df.columns]].rename(columns=DISPLAY_COLUMNS)
+            sort_label = f"{rank_by}, correlation ≤ {max_corr:.2f}"
+
+    st.subheader(f"Top Sideways Opportunities (Sorted by {sort_label})")
     st.info("👆 Click on a row in the table below to see the Detailed Scoring breakdown.")
     
     # Selection logic for the table
-    # We display a subset of columns but keep the scores in the background data
-    available_cols = df.columns.tolist()
-    target_cols = ['Symbol', 'Status', 'Close', 'Volume', 'Confidence', 'Target_Put', 'Target_Call']
-    cols_to_show = [c for c in target_cols if c in available_cols]
-    
-    display_df = passing_df[cols_to_show]
-    # Rename for display
-    rename_dict = {
-        'Symbol': 'Symbol',
-        'Status': 'Trend Status',
-        'Close': 'Close',
-        'Volume': 'Volume (Qty)',
-        'Confidence': 'Total Confidence %',
-        'Target_Put': 'Sell Put Strike',
-        'Target_Call': 'Sell Call Strike'
-    }
-    display_df.columns = [rename_dict.get(c, c) for c in display_df.columns]
-    
-    # Enable selection
+    # We display a subset of columns but keep the scores in the background data.
+    # Confidence is drawn by a column renderer instead of a pandas Styler, so a
+    # rerun does not re-style the whole frame.
     event = st.dataframe(
-        display_df.style.background_gradient(subset=['Total Confidence %'], cmap='Greens'),
+        display_df,
         height=450, 
         use_container_width=True,
         on_select="rerun",
-        selection_mode="single-row"
+        selection_mode="single-row",
+        column_config={
+            'Total Confidence %': st.column_config.ProgressColumn('Total Confidence %', min_value=0, max_value=100, format="%.2f")
+        }
     )
     
     # Handle selection event
@@ -96,12 +225,41 @@ if not df.empty:
         with c2: st.metric("Stability Score", f"{row.get('Stability_Score', 0)}/100")
         with c3: st.metric("Volatility Score", f"{row.get('Vol_Score', 0)}/100")
         with c4: st.metric("Total Confidence", f"{row.get('Confidence', 0)}%")
+
+        # 20-delta strangle from the option chain (published file, or live on demand)
+        delta_row = row if pd.notna(row.get('Put_Strike')) else None
+        if st.button(f"Check live 20-Delta strikes for {row['Symbol']}"):
+            with st.spinner("Fetching option chain..."):
+                from logic import option_chain
+                live = option_chain.find_delta_strikes([row['Symbol']], {row['Symbol']: row['Close']})
+            if live.empty:
+                st.warning("Option chain unavailable (not in F&O, or NSE did not respond).")
+            else:
+                delta_row = live.iloc[0]
+        if delta_row is not None:
+            d1, d2, d3 = st.columns(3)
+            with d1: st.metric("Sell Put (20Δ)", f"{delta_row['Put_Strike']:g}", f"Δ {delta_row['Put_Delta']}, IV {delta_row['Put_IV']}%", delta_color="off")
+            with d2: st.metric("Sell Call (20Δ)", f"{delta_row['Call_Strike']:g}", f"Δ {delta_row['Call_Delta']}, IV {delta_row['Call_IV']}%", delta_color="off")
+            with d3: st.metric("Credit", f"{delta_row['Credit']}", f"Expiry {pd.Timestamp(delta_row['Expiry']).strftime('%d-%b')}", delta_color="off")
+
+        # Score history from the per-session archive
+        akey = archive_key()
+        trend = load_trend(row['Symbol'], akey)
+        if len(trend) > 1:
+            streak = int(load_streaks(akey).get(row['Symbol'], 0))
+            st.caption(f"Passed the screen {streak} session(s) in a row. Last {len(trend)} archived sessions:")
+            trend_fig = go.Figure()
+            for col, color in [('Confidence', '#00cc96'), ('ADX', '#ffa500'), ('RSI', '#1f77b4')]:
+                if col in trend.columns:
+                    trend_fig.add_trace(go.Scatter(x=trend['date'], y=trend[col], mode='lines', name=col, line={'color': color}))
+            trend_fig.update_layout(height=300, margin={'t': 10, 'b': 10}, paper_bgcolor='rgba(0,0,0,0)', font={'color': "white"})
+            st.plotly_chart(trend_fig, use_container_width=True)
         st.divider()
 
     st.header("🔍 Full Market Scan Results")
     st.write("Browse all processed stocks. Use the search/filter in the table header to find specifics.")
     # Large height for full scan results
-    st.dataframe(df.drop(columns=['Passed'] if 'Passed' in df.columns else []), height=600, use_container_width=True)
+    st.dataframe(full_df, height=600, use_container_width=True)
 else:
     st.info("Scan in progress or no data available. Once the 'Brain' writes the CSV, results will appear here.")
 
@@ -166,6 +324,7 @@ with st.expander("📚 Understanding the Screening Logic", expanded=True):
     #### 5. Strike Calculation
     - **Sell Put Strike**: Current Close - 8%.
     - **Sell Call Strike**: Current Close + 8%.
+    - **Put / Call 20Δ**: Strikes whose option delta is closest to ±0.20 on the nearest expiry, from implied volatilities solved on the live option chain.
     - **Stop Loss**: ± 5% from entry.
     """)
 
@@ -0,0 +1,66 @@
+"""
+Backtest sweep benchmark.
+Builds a synthetic (days x symbols) random-walk panel, checks one configuration
+against a per-cell loop over screener.score_indicators, then times the full
+default grid.
+
+Usage: python -m benchmarks.bench_backtest [--symbols 500] [--days 1250] [--workers N]
+"""
+import argparse
+import time
+import numpy as np
+import pandas as pd
+
+from logic.backtest import DEFAULT_GRID, expand_grid, prepare, evaluate_signals, run_sweep, strangle_outcomes
+from logic.indicators import adx, rsi, hv
+from logic.screener import SCORING_PARAMS, score_indicators
+
+def synthetic_panel(symbols, days, seed=11):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.015, (days, symbols)), axis=0))
+    spread = np.abs(rng.normal(0, 0.01, (days, symbols)))
+    index = pd.bdate_range('2020-01-01', periods=days)
+    columns = [f"S{i:04d}" for i in range(symbols)]
+    frame = lambda a: pd.DataFrame(a, index=index, columns=columns)
+    return {'Open': frame(close), 'High': frame(close * (1 + spread)), 'Low': frame(close * (1 - spread)),
+            'Close': frame(close), 'Volume': frame(np.full((days, symbols), 1e6))}
+
+def check_parity(panel, config):
+    """Loop over every cell with the scan's own scoring function."""
+    high, low, close = (panel[f].to_numpy() for f in ('High', 'Low', 'Close'))
+    adx_m, rsi_m, hv_m = adx(high, low, close), rsi(close), hv(close)
+    valid, inside, _, _ = strangle_outcomes(high, low, close, config['hold'], config['strike_pct'])
+    params = {**SCORING_PARAMS, **{k: config[k] for k in ('adx_max', 'rsi_low', 'rsi_high', 'weights')}}
+    trades = wins = 0
+    for t in range(SCORING_PARAMS['min_bars'] - 1, close.shape[0]):
+        for j in range(close.shape[1]):
+            row = score_indicators('X', close[t, j], 0, adx_m[t, j], rsi_m[t, j], hv_m[t, j], params)
+            # Compare unrounded: the scan rounds Confidence to 2 decimals
+            if row['Passed'] and row['Confidence'] >= config['min_confidence'] + 0.005 and valid[t, j]:
+                trades += 1
+                wins += bool(inside[t, j])
+    return trades, wins
+
+def run(symbols, days, workers):
+    panel = synthetic_panel(symbols, days)
+    config = dict(adx_max=25, rsi_low=40, rsi_high=60, weights=(0.4, 0.4, 0.2), min_confidence=40, strike_pct=0.08, hold=10)
+    small = {k: v.iloc[:300, :40] for k, v in panel.items()}
+    loop_trades, loop_wins = check_parity(small, config)
+    row = evaluate_signals([config], prepare(small, [config]))[0]
+    print(f"parity (300 x 40): loop {loop_trades} trades / {loop_wins} wins, "
+          f"vectorized {row['trades']} trades / {round(row['win_rate'] * row['trades'] / 100) if row['trades'] else 0} wins")
+
+    grid_size = len(expand_grid(DEFAULT_GRID))
+    print(f"{grid_size} configurations over {days} sessions x {symbols} symbols")
+    start = time.perf_counter()
+    results = run_sweep(panel, workers=workers)
+    print(f"  total: {time.perf_counter() - start:.1f}s")
+    print(results.head(5).to_string(index=False))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backtest sweep benchmark")
+    parser.add_argument('--symbols', type=int, default=500)
+    parser.add_argument('--days', type=int, default=1250)
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+    run(args.symbols, args.days, args.workers)
@@ -0,0 +1,102 @@
+"""
+Import-time budget check for the entry points.
+Each entry's imports run in a fresh interpreter under `python -X importtime`;
+the cumulative time of the modules they pull in (best of --repeat runs) is
+compared with a per-entry budget, and modules that entry must not load at
+import time (pandas for the notifier, scipy for the dashboard, ...)
+are reported. The screener's scoring helpers are numpy code, so it may load
+numpy but not pandas. The dashboard entry is app.py's top-level import statements,
+so the check does not need a Streamlit session.
+
+Exits 1 when an entry is over budget or loads a forbidden module, so it can
+run as a CI step. Budgets are generous for slow runners; --scale tightens or
+loosens all of them.
+
+Usage: python -m benchmarks.bench_import [--repeat 5] [--scale 1.0] [--entries logic.notifier app]
+"""
+import argparse
+import ast
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+MARKER = '-- entry imports --'
+HEAVY = ['pandas', 'numpy', 'scipy', 'pyarrow', 'plotly', 'streamlit', 'nselib', 'pandas_ta', 'pandas_ta_classic']
+NO_SCAN_DEPS = ['scipy', 'pyarrow.dataset', 'plotly', 'streamlit', 'nselib', 'pandas_ta', 'pandas_ta_classic']
+
+# entry -> (budget in ms, modules it must not import). pandas itself imports
+# pyarrow; streamlit itself imports plotly.
+ENTRIES = {
+    'logic.delivery': (150, HEAVY),
+    'logic.notifier': (150, HEAVY),
+    'logic.result_sink': (100, HEAVY),
+    'logic.scan_archive': (1000, NO_SCAN_DEPS),
+    'logic.screener': (300, [m for m in HEAVY if m != 'numpy']),
+    'app': (2500, ['scipy', 'pyarrow.dataset', 'nselib', 'pandas_ta', 'pandas_ta_classic']),
+}
+
+def app_imports():
+    """app.py's module-level import statements (imports inside blocks are lazy by design)."""
+    with open(os.path.join(ROOT, 'app.py')) as f:
+        tree = ast.parse(f.read())
+    return "\n".join(ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom)))
+
+def entry_code(entry):
+    return app_imports() if entry == 'app' else f"import {entry}"
+
+def measure(entry):
+    """(cumulative import ms, names of the modules loaded) for one cold import of 'entry'."""
+    code = "\n".join([
+        "import sys, json",
+        f"sys.stderr.write({MARKER!r} + '\\n')",
+        entry_code(entry),
+        "print(json.dumps(sorted(sys.modules)))",
+    ])
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=ROOT,
+                          capture_output=True, text=True, env={**os.environ, 'PYTHONDONTWRITEBYTECODE': '1'})
+    if proc.returncode:
+        raise RuntimeError(f"{entry}: import failed\n{proc.stderr[-2000:]}")
+    lines = proc.stderr.split(MARKER, 1)[1].splitlines()
+    total_us = 0
+    for line in lines:
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Nested imports are indented under their importer; only top-level entries add up
+        if not name[1:].startswith(' '):
+            total_us += int(cumulative)
+    return total_us / 1000, set(json.loads(proc.stdout.strip().splitlines()[-1]))
+
+def run(entries, repeat, scale):
+    failures = []
+    print(f"{'entry':<20} {'best ms':>9} {'budget':>8}  heavy modules loaded")
+    for entry in entries:
+        budget, forbidden = ENTRIES[entry]
+        budget *= scale
+        samples = [measure(entry) for _ in range(repeat)]
+        best = min(ms for ms, _ in samples)
+        modules = samples[0][1]
+        loaded = [m for m in HEAVY if m in modules]
+        bad = [m for m in forbidden if m in modules]
+        status = []
+        if best > budget:
+            status.append("OVER BUDGET")
+        if bad:
+            status.append("forbidden: " + ", ".join(bad))
+        print(f"{entry:<20} {best:>9.1f} {budget:>8.0f}  {', '.join(loaded) or '-'}"
+              + (f"  {'; '.join(status)}" if status else ""))
+        if status:
+            failures.append(entry)
+    if failures:
+        print(f"{len(failures)} entry point(s) failed the import budget: {', '.join(failures)}")
+    return failures
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import-time budget check for the entry points")
+    parser.add_argument('--entries', nargs='+', choices=list(ENTRIES), default=list(ENTRIES))
+    parser.add_argument('--repeat', type=int, default=5, help="Cold imports per entry; the fastest counts")
+    parser.add_argument('--scale', type=float, default=1.0, help="Multiply every budget (e.g. 2 on a slow runner)")
+    args = parser.parse_args()
+    sys.exit(1 if run(args.entries, args.repeat, args.scale) else 0)
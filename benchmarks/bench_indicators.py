@@ -0,0 +1,73 @@
+"""
+Indicator engine benchmark and parity check.
+Compares logic.indicators (one array pass) against per-symbol pandas_ta calls
+on a synthetic (days x symbols) panel.
+
+Usage: python -m benchmarks.bench_indicators [--symbols 500] [--days 60]
+"""
+import argparse
+import time
+import numpy as np
+import pandas as pd
+
+from logic.indicators import latest_indicators
+
+def reference_hv(close, window=20):
+    """Annualized HV the way the per-symbol pandas scan computed it (the parity reference)."""
+    log_returns = np.log(close / close.shift(1))
+    hv = log_returns.rolling(window=window).std() * np.sqrt(252) * 100
+    return 0 if pd.isna(hv.iloc[-1]) else hv.iloc[-1]
+
+def synthetic_panel(days, symbols, seed=7):
+    """Random-walk OHLC arrays, with some symbols given a short history."""
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, (days, symbols)), axis=0))
+    high = close * (1 + rng.uniform(0, 0.03, (days, symbols)))
+    low = close * (1 - rng.uniform(0, 0.03, (days, symbols)))
+    for j in range(0, symbols, 9):
+        k = rng.integers(0, days // 2)
+        close[:k, j] = high[:k, j] = low[:k, j] = np.nan
+    return high, low, close
+
+def run(days, symbols, parity_sample=200):
+    # Only the comparison needs pandas_ta; other benchmarks import synthetic_panel from here
+    try:
+        import pandas_ta as ta
+    except ImportError:
+        import pandas_ta_classic as ta
+    high, low, close = synthetic_panel(days, symbols)
+
+    start = time.perf_counter()
+    batch = latest_indicators(high, low, close)
+    batch_ms = (time.perf_counter() - start) * 1000
+
+    sample = range(0, symbols, max(1, symbols // parity_sample))
+    max_diff = {'ADX': 0.0, 'RSI': 0.0, 'HV': 0.0}
+    start = time.perf_counter()
+    for j in sample:
+        valid = np.isfinite(close[:, j])
+        h, l, c = (pd.Series(a[valid, j]) for a in (high, low, close))
+        if len(c) < 30:
+            continue
+        ref = {
+            'ADX': ta.adx(h, l, c, length=14)['ADX_14'].iloc[-1],
+            'RSI': ta.rsi(c, length=14).iloc[-1],
+            'HV': reference_hv(c),
+        }
+        for key, value in ref.items():
+            max_diff[key] = max(max_diff[key], abs(value - batch[key][j]))
+    loop_ms = (time.perf_counter() - start) * 1000 * symbols / len(sample)
+
+    print(f"{symbols} symbols x {days} days")
+    print(f"  batch engine : {batch_ms:10.1f} ms")
+    print(f"  pandas_ta    : {loop_ms:10.1f} ms (extrapolated from {len(sample)} symbols)")
+    print(f"  max |diff|   : " + ", ".join(f"{k}={v:.2e}" for k, v in max_diff.items()))
+    return max(max_diff.values()) < 1e-6
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Indicator engine benchmark")
+    parser.add_argument('--symbols', type=int, default=500)
+    parser.add_argument('--days', type=int, default=60)
+    args = parser.parse_args()
+    ok = run(args.days, args.symbols)
+    raise SystemExit(0 if ok else 1)
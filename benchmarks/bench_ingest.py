@@ -0,0 +1,97 @@
+"""
+CSV ingest benchmark.
+Writes a large multi-symbol file in NSE history-export format (mojibake BOM,
+padded quoted headers, lakh-grouped numbers) and compares:
+  pandas default : read_csv + pd.to_numeric(errors='coerce')  (old path, loses grouped values)
+  pandas cleaned : read_csv(dtype=str) + per-column str.replace  (correct, slow)
+  ingest         : logic.ingest.read_nse_csv
+
+Usage: python -m benchmarks.bench_ingest [--rows 500000]
+"""
+import argparse
+import os
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+
+from logic.ingest import read_nse_csv
+
+HEADER = ['Symbol  ', 'Series  ', 'Date  ', 'Prev Close  ', 'Open Price  ', 'High Price  ',
+          'Low Price  ', 'Last Price  ', 'Close Price  ', 'Average Price ', 'Total Traded Quantity  ',
+          'Turnover In Rs  ', 'No. of Trades  ', 'Deliverable Qty  ', '% Dly Qt to Traded Qty  ']
+NUMERIC = HEADER[3:]
+
+def indian_format(values, decimals):
+    """Format numbers with Indian digit grouping (12,34,56,789.00)."""
+    out = []
+    for v in values:
+        whole, _, frac = f"{v:.{decimals}f}".partition('.')
+        head, tail = whole[:-3], whole[-3:]
+        groups = []
+        while len(head) > 2:
+            groups.insert(0, head[-2:])
+            head = head[:-2]
+        if head:
+            groups.insert(0, head)
+        text = ','.join(groups + [tail]) if groups else tail
+        out.append(f"{text}.{frac}" if frac else text)
+    return out
+
+def write_fixture(path, rows, seed=3):
+    rng = np.random.default_rng(seed)
+    symbols = np.array([f"SYM{i:04d}" for i in range(max(1, rows // 250))])
+    dates = pd.bdate_range('2024-01-01', periods=250).strftime('%d-%b-%Y')
+    close = rng.uniform(50, 5000, rows)
+    qty = rng.integers(1_000, 50_000_000, rows)
+    cols = {
+        HEADER[0]: np.repeat(symbols, 250)[:rows], HEADER[1]: 'EQ', HEADER[2]: np.tile(dates, len(symbols))[:rows],
+        HEADER[3]: indian_format(close * 0.99, 2), HEADER[4]: indian_format(close * 0.995, 2),
+        HEADER[5]: indian_format(close * 1.02, 2), HEADER[6]: indian_format(close * 0.98, 2),
+        HEADER[7]: indian_format(close, 2), HEADER[8]: indian_format(close, 2), HEADER[9]: indian_format(close, 2),
+        HEADER[10]: indian_format(qty, 0), HEADER[11]: indian_format(qty * close, 2),
+        HEADER[12]: indian_format(qty // 40, 0), HEADER[13]: indian_format(qty // 2, 0), HEADER[14]: '50.00',
+    }
+    df = pd.DataFrame(cols)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('ï»¿')  # NSE exports carry a double-encoded BOM
+        df.to_csv(f, index=False, quoting=1)
+
+def pandas_default(path):
+    df = pd.read_csv(path)
+    for col in df.columns[3:]:
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+    return df
+
+def pandas_cleaned(path):
+    df = pd.read_csv(path, dtype=str)
+    df.columns = [c.replace('ï»¿', '').replace('"', '').strip() for c in df.columns]
+    for col in df.columns[3:]:
+        df[col] = pd.to_numeric(df[col].str.replace(',', ''), errors='coerce')
+    return df
+
+def timed(fn, path, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        df = fn(path)
+        best = min(best, time.perf_counter() - start)
+    return best, df
+
+def run(rows):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'history.csv')
+        write_fixture(path, rows)
+        size_mb = os.path.getsize(path) / 1e6
+        print(f"{rows:,} rows ({size_mb:.1f} MB)")
+        for name, fn in [('pandas default', pandas_default), ('pandas cleaned', pandas_cleaned), ('ingest', read_nse_csv)]:
+            seconds, df = timed(fn, path)
+            numeric = df.select_dtypes('number')
+            lost = int(numeric.isna().sum().sum()) + (len(NUMERIC) - numeric.shape[1]) * len(df)
+            print(f"  {name:<15}: {seconds * 1000:9.1f} ms   numeric values lost: {lost:,}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="NSE CSV ingest benchmark")
+    parser.add_argument('--rows', type=int, default=500_000)
+    args = parser.parse_args()
+    run(args.rows)
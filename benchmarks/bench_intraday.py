@@ -0,0 +1,96 @@
+"""
+Intraday incremental re-scoring benchmark.
+Seeds indicator state from a synthetic daily panel, replays one session of
+minute bars through ReplayFeed / IntradayEngine into a temporary result sink,
+then checks the committed state against the batch engine run over the full
+history including the replayed day.
+
+Usage: python -m benchmarks.bench_intraday [--symbols 2000] [--days 60] [--minutes 375]
+"""
+import argparse
+import os
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_backtest import synthetic_panel
+from logic.indicators import latest_indicators
+from logic.intraday import IndicatorState, IntradayEngine, ReplayFeed
+from logic import result_sink, intraday
+from logic.result_sink import ResultSink
+
+def minute_bars(symbols, last_close, day, minutes, seed=7):
+    """One session of minute bars (09:15 onwards) continuing from last_close."""
+    rng = np.random.default_rng(seed)
+    path = last_close[None, :] * np.exp(np.cumsum(rng.normal(0, 0.0008, (minutes, len(symbols))), axis=0))
+    stamps = pd.Timestamp(day) + pd.Timedelta(hours=9, minutes=15) + pd.to_timedelta(np.arange(minutes), unit='min')
+    jitter = np.abs(rng.normal(0, 0.0004, path.shape))
+    return pd.DataFrame({
+        'Timestamp': np.repeat(stamps, len(symbols)),
+        'Symbol': np.tile(symbols, minutes),
+        'Open': path.ravel(), 'High': (path * (1 + jitter)).ravel(), 'Low': (path * (1 - jitter)).ravel(),
+        'Close': path.ravel(), 'Volume': rng.integers(100, 10_000, path.size),
+    })
+
+def run(symbols, days, minutes):
+    panel = synthetic_panel(symbols, days + 1)
+    names = panel['Close'].columns.tolist()
+    history = {f: panel[f].iloc[:days] for f in panel}
+    high, low, close = (history[f].to_numpy() for f in ('High', 'Low', 'Close'))
+
+    start = time.perf_counter()
+    state = IndicatorState.from_history(names, high, low, close, history['Close'].index,
+                                        volume=history['Volume'].to_numpy())
+    print(f"{symbols} symbols: bootstrap from {days} daily bars in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    day = panel['Close'].index[days]
+    bars = minute_bars(names, close[-1], day, minutes)
+    with tempfile.TemporaryDirectory() as tmp:
+        feed_path = os.path.join(tmp, 'feed.parquet')
+        bars.to_parquet(feed_path, index=False)
+        state_path = os.path.join(tmp, 'state.npz')
+        # Publish into the temp dir, never over the real scan files
+        result_sink.SCAN_FILE = os.path.join(tmp, 'market_scan.csv')
+        result_sink.SCAN_PARQUET = os.path.join(tmp, 'market_scan.parquet')
+        result_sink.FII_FILE = os.path.join(tmp, 'fii_stats.json')
+        intraday.INTRADAY_SCAN_FILE = os.path.join(tmp, 'intraday_scan.csv')
+        intraday.INTRADAY_SCAN_PARQUET = os.path.join(tmp, 'intraday_scan.parquet')
+        sink = ResultSink(os.path.join(tmp, 'scan.db'))
+        engine = IntradayEngine(state, sink, state_path=state_path)
+
+        rescore_ms = []
+        feed = ReplayFeed(feed_path)
+        for minute, frame in feed.minutes():
+            engine.on_bars(frame)
+            t0 = time.perf_counter()
+            engine.rescore()
+            rescore_ms.append((time.perf_counter() - t0) * 1000)
+        engine.close_day()
+        published = pd.read_parquet(intraday.INTRADAY_SCAN_PARQUET)
+        untouched = not any(os.path.exists(p) for p in (result_sink.SCAN_FILE, result_sink.SCAN_PARQUET, result_sink.FII_FILE))
+        sink.close()
+        print(f"  {minutes} minute rescans: median {np.median(rescore_ms):.1f} ms, max {np.max(rescore_ms):.1f} ms; "
+              f"rows pushed {engine.stats['rows_pushed']:,}")
+        print(f"  published {len(published):,} rows to intraday_scan; market_scan / fii_stats "
+              f"{'untouched' if untouched else 'OVERWRITTEN'}")
+
+        start = time.perf_counter()
+        restored = IndicatorState.load(state_path)
+        print(f"  checkpoint {os.path.getsize(state_path) / 1e6:.1f} MB, restart load {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    # Reference: batch engine over history + the aggregated day bar
+    agg = bars.groupby('Symbol').agg(High=('High', 'max'), Low=('Low', 'min'), Close=('Close', 'last')).reindex(names)
+    ref = latest_indicators(np.vstack([high, agg['High'].to_numpy()]), np.vstack([low, agg['Low'].to_numpy()]),
+                            np.vstack([close, agg['Close'].to_numpy()]))
+    got = restored.readings()
+    diffs = {k: float(np.nanmax(np.abs(got[k] - ref[k]))) for k in ('ADX', 'RSI', 'HV')}
+    print("  committed state vs batch: " + ", ".join(f"{k}={v:.1e}" for k, v in diffs.items()))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Intraday incremental re-scoring benchmark")
+    parser.add_argument('--symbols', type=int, default=2000)
+    parser.add_argument('--days', type=int, default=60)
+    parser.add_argument('--minutes', type=int, default=375)
+    args = parser.parse_args()
+    run(args.symbols, args.days, args.minutes)
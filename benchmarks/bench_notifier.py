@@ -0,0 +1,124 @@
+"""
+Notifier delivery benchmark against a local stub HTTP server.
+The stub speaks HTTP/1.1 keep-alive and answers both Discord webhook and
+Telegram sendMessage paths. It injects 429s (with retry_after), 5xx errors
+and one destination that is down for the whole first run. Reports wall time,
+connections opened versus requests made, and what was queued. A second run
+(outage over) drains the retry queue.
+
+Usage: python -m benchmarks.bench_notifier [--webhooks 20] [--chats 60] [--error-rate 0.1]
+"""
+import argparse
+import json
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from logic.delivery import DeliveryEngine, RetryQueue, channels_from_env
+
+class StubState:
+    def __init__(self, error_rate, seed=3):
+        self.rng = random.Random(seed)
+        self.error_rate = error_rate
+        self.down = set()
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.connections = 0
+        self.delivered = {}
+
+def make_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def setup(self):
+            super().setup()
+            with state.lock:
+                state.connections += 1
+
+        def log_message(self, *args):
+            pass
+
+        def _reply(self, status, payload):
+            body = json.dumps(payload).encode('utf-8') if status != 204 else b''
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            chat = re.search(rb'chat_id=([^&]+)', body)
+            key = self.path + (chat.group(1).decode() if chat else '')
+            with state.lock:
+                state.requests += 1
+                roll = state.rng.random()
+            if self.path in state.down:
+                return self._reply(503, {'message': 'unavailable'})
+            if roll < state.error_rate / 2:
+                return self._reply(429, {'retry_after': 0.2, 'parameters': {'retry_after': 0.2}})
+            if roll < state.error_rate:
+                return self._reply(500, {'message': 'internal error'})
+            with state.lock:
+                state.delivered[key] = state.delivered.get(key, 0) + 1
+            self._reply(200 if self.path.startswith('/bot') else 204, {'ok': True})
+    return Handler
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        pass  # clients closing pooled connections at shutdown
+
+def run(webhooks, chats, error_rate):
+    state = StubState(error_rate)
+    server = StubServer(('127.0.0.1', 0), make_handler(state))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+    env = {
+        'DISCORD_WEBHOOK': ",".join(f"{base}/api/webhooks/{i}/token" for i in range(webhooks)),
+        'TELEGRAM_BOT_TOKEN': '123:stub', 'TELEGRAM_CHAT_ID': " ".join(str(-1000 - i) for i in range(chats)),
+        'TELEGRAM_API_BASE': base,
+    }
+    channels = channels_from_env(env)
+    state.down.add('/api/webhooks/0/token')
+    message = "🎯 **Theta Hunter Pro - benchmark**\n```\nRELIANCE  2950.00  72%\n```"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = RetryQueue(db_path=os.path.join(tmp, 'queue.db'))
+        engine = DeliveryEngine(queue=queue)
+        start = time.perf_counter()
+        report = engine.deliver([(c, message, None) for c in channels])
+        elapsed = time.perf_counter() - start
+        ok = sum(r[1] for r in report)
+        print(f"{len(channels)} destinations ({webhooks} webhooks, {chats} chats), error rate {error_rate:.0%}")
+        print(f"  first run : {elapsed:.2f}s  delivered {ok}/{len(channels)}  queued {queue.pending()}  "
+              f"requests {state.requests}  connections {engine.pool.opened} client / {state.connections} server")
+        print(f"  stats     : {engine.stats}")
+
+        # Outage over: the next run picks up the due queue rows
+        state.down.clear()
+        state.error_rate = 0.0
+        requests_before = state.requests
+        jobs = queue.due(channels, now=time.time() + 3600)
+        start = time.perf_counter()
+        report = engine.deliver(jobs)
+        print(f"  drain run : {time.perf_counter() - start:.2f}s  redelivered {sum(r[1] for r in report)}/{len(jobs)}  "
+              f"queued {queue.pending()}  requests {state.requests - requests_before}  connections {engine.pool.opened} client")
+        engine.close()
+        queue.close()
+    duplicates = sum(n - 1 for n in state.delivered.values() if n > 1)
+    print(f"  duplicate deliveries: {duplicates}")
+    server.shutdown()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Notifier delivery benchmark (local stub server)")
+    parser.add_argument('--webhooks', type=int, default=20)
+    parser.add_argument('--chats', type=int, default=60)
+    parser.add_argument('--error-rate', type=float, default=0.1)
+    args = parser.parse_args()
+    run(args.webhooks, args.chats, args.error_rate)
@@ -0,0 +1,84 @@
+"""
+Option-chain / IV solver benchmark.
+Generates nselib-format chains for a synthetic F&O universe from known
+volatility smiles, records them as chain snapshots, reloads them offline and
+runs the full pipeline (forward, IV, delta, 20-delta selection). Reports
+solver time and IV recovery error against the true smile.
+
+Usage: python -m benchmarks.bench_option_chain [--symbols 200] [--strikes 40] [--expiries 3]
+"""
+import argparse
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+
+from logic import option_chain
+from logic.option_chain import RISK_FREE_RATE, black_price, normalize_chain, save_chain, get_chain, analyze_chain, select_delta_strikes
+
+NOW = pd.Timestamp('2026-10-16 11:00')
+
+def smile(forward, strike):
+    return 0.25 + 0.4 * np.log(strike / forward) ** 2 - 0.1 * np.log(strike / forward)
+
+def synthetic_raw_chain(symbol, spot, expiries, strikes, rng):
+    """One nselib-style wide chain (CALLS_* / PUTS_* per strike) across expiries."""
+    rows = []
+    step = max(round(spot * 0.025, -1), 5.0)
+    grid = np.round(spot / step) * step + step * (np.arange(strikes) - strikes // 2)
+    for expiry in expiries:
+        t = float(option_chain.years_to_expiry(expiry, NOW))
+        forward = spot * np.exp(RISK_FREE_RATE * t)
+        vol = smile(forward, grid)
+        call = black_price(forward, grid, t, RISK_FREE_RATE, vol, True)
+        put = black_price(forward, grid, t, RISK_FREE_RATE, vol, False)
+        for k, c, p in zip(grid, call, put):
+            # Quotes on the 0.05 tick, one tick wide around the model price
+            c_bid, p_bid = np.floor(c / 0.05) * 0.05, np.floor(p / 0.05) * 0.05
+            rows.append({
+                'Fetch_Time': NOW.strftime('%d-%b-%Y %H:%M:%S'), 'Symbol': symbol,
+                'Expiry_Date': expiry.strftime('%d-%b-%Y'), 'Strike_Price': k,
+                'CALLS_OI': int(rng.integers(0, 1e6)), 'CALLS_Volume': 100, 'CALLS_IV': 0, 'CALLS_LTP': round(c, 2),
+                'CALLS_Bid_Price': c_bid, 'CALLS_Ask_Price': c_bid + 0.1,
+                'PUTS_OI': int(rng.integers(0, 1e6)), 'PUTS_Volume': 100, 'PUTS_IV': 0, 'PUTS_LTP': round(p, 2),
+                'PUTS_Bid_Price': p_bid, 'PUTS_Ask_Price': p_bid + 0.1,
+            })
+    return pd.DataFrame(rows)
+
+def run(symbols, strikes, expiries):
+    rng = np.random.default_rng(5)
+    expiry_dates = [pd.Timestamp('2026-10-27'), pd.Timestamp('2026-11-24'), pd.Timestamp('2026-12-29')][:expiries]
+    spots = {f"FNO{i:03d}": float(rng.uniform(100, 5000)) for i in range(symbols)}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        option_chain.CHAIN_DIR = tmp
+        for symbol, spot in spots.items():
+            save_chain(normalize_chain(synthetic_raw_chain(symbol, spot, expiry_dates, strikes, rng)))
+        chains = pd.concat([get_chain(s, offline=True) for s in spots], ignore_index=True)
+
+    start = time.perf_counter()
+    analyzed = analyze_chain(chains, now=NOW)
+    solve_ms = (time.perf_counter() - start) * 1000
+    picks = select_delta_strikes(analyzed)
+
+    true_vol = smile(analyzed['Forward'], analyzed['Strike'])
+    # Out-of-the-money options worth a few ticks carry meaningful IV; sub-tick wings are quote noise
+    otm = np.where(analyzed['Type'] == 'CE', analyzed['Strike'] >= analyzed['Forward'], analyzed['Strike'] <= analyzed['Forward'])
+    liquid = otm & (analyzed['Price'] >= 1.0) & analyzed['IV'].notna()
+    error = (analyzed['IV'] - true_vol).abs()[liquid]
+    forward_error = (analyzed['Forward'] / (analyzed['Symbol'].map(spots) * np.exp(RISK_FREE_RATE * analyzed['T'])) - 1).abs()
+    print(f"{len(analyzed):,} options ({symbols} symbols x {expiries} expiries x {strikes} strikes x 2)")
+    print(f"  forward + IV + delta: {solve_ms:.0f} ms   solved: {analyzed['IV'].notna().mean() * 100:.1f}%")
+    print(f"  IV error (OTM, price >= 1): median {error.median():.2e}, p99 {error.quantile(0.99):.2e}; "
+          f"forward error max {forward_error.max():.2e}")
+    print(f"  20-delta picks: {len(picks)} symbols, |delta| range "
+          f"{picks[['Put_Delta', 'Call_Delta']].abs().min().min():.3f}-{picks[['Put_Delta', 'Call_Delta']].abs().max().max():.3f}")
+    print(picks.head(3).to_string(index=False))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Option-chain IV solver benchmark")
+    parser.add_argument('--symbols', type=int, default=200)
+    parser.add_argument('--strikes', type=int, default=40)
+    parser.add_argument('--expiries', type=int, default=3)
+    args = parser.parse_args()
+    run(args.symbols, args.strikes, args.expiries)
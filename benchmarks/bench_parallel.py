@@ -0,0 +1,54 @@
+"""
+Multi-process scoring benchmark and parity check.
+Scores a synthetic (days x symbols) panel with score_panel in one process and
+with the shared-memory process pool (logic.shared_panel) at increasing worker
+counts, checking that every pool run returns exactly the serial rows.
+
+Usage: python -m benchmarks.bench_parallel [--symbols 2000] [--days 1250] [--workers 1 2 4 8]
+"""
+import argparse
+import os
+import time
+import numpy as np
+import pandas as pd
+
+from logic.screener import score_panel
+from logic.shared_panel import score_panel_parallel
+from benchmarks.bench_indicators import synthetic_panel
+
+def make_panel(days, symbols):
+    high, low, close = synthetic_panel(days, symbols)
+    volume = np.where(np.isfinite(close), np.random.default_rng(5).lognormal(12, 1.5, close.shape), np.nan)
+    index = pd.bdate_range('2020-01-01', periods=days)
+    names = [f"SYN{i:05d}" for i in range(symbols)]
+    return {field: pd.DataFrame(arr, index=index, columns=names)
+            for field, arr in zip(['High', 'Low', 'Close', 'Volume'], [high, low, close, volume])}
+
+def run(days, symbols, workers, store='shm'):
+    panel = make_panel(days, symbols)
+    names = list(panel['Close'].columns)
+    print(f"{symbols} symbols x {days} days ({4 * days * symbols * 8 / 2**20:.0f} MiB shared), {os.cpu_count()} CPU(s)")
+
+    start = time.perf_counter()
+    serial = score_panel(panel, names)
+    base = time.perf_counter() - start
+    print(f"  serial       : {base:8.2f} s")
+    ok = True
+    for n in workers:
+        start = time.perf_counter()
+        rows, _ = score_panel_parallel(panel, names, n, store=store)
+        seconds = time.perf_counter() - start
+        same = rows == serial
+        ok &= same
+        print(f"  {n:>2} worker(s) : {seconds:8.2f} s  speed-up {base / seconds:5.2f}x  "
+              f"efficiency {base / seconds / n:4.0%}  {'parity ok' if same else 'MISMATCH'}")
+    return ok
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--symbols', type=int, default=2000)
+    parser.add_argument('--days', type=int, default=1250)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--store', choices=['shm', 'mmap'], default='shm')
+    args = parser.parse_args()
+    raise SystemExit(0 if run(args.days, args.symbols, args.workers, args.store) else 1)
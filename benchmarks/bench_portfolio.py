@@ -0,0 +1,72 @@
+"""
+Correlation cache and diversified-selection benchmark.
+Times a full rebuild of the rolling return statistics against the daily
+incremental update and against adding newly listed symbols as columns
+(checking all give the same correlations), then the
+greedy and clustering selections over the candidate set the dashboard
+re-optimizes on every widget change.
+
+Usage: python -m benchmarks.bench_portfolio [--symbols 2000] [--window 120] [--candidates 500]
+"""
+import argparse
+import time
+import numpy as np
+import pandas as pd
+
+from logic.portfolio import CorrelationCache, select_diversified
+
+def factor_closes(days, symbols, seed=3):
+    """Closes driven by a few sector factors, so correlation clusters exist."""
+    rng = np.random.default_rng(seed)
+    factors = rng.normal(0, 0.01, (days, 20))
+    loadings = rng.normal(0, 1, (20, symbols)) * (rng.random((20, symbols)) < 0.1)
+    returns = factors @ loadings + rng.normal(0, 0.01, (days, symbols))
+    index = pd.bdate_range('2024-01-01', periods=days)
+    return pd.DataFrame(100 * np.exp(np.cumsum(returns, axis=0)), index=index,
+                        columns=[f"SYN{i:05d}" for i in range(symbols)])
+
+def run(symbols, window, candidates, days_ahead=20, listings=10):
+    listed = factor_closes(window + days_ahead + 1, symbols + listings)
+    closes = listed.iloc[:, :symbols]
+    print(f"{symbols} symbols, {window}-session window")
+
+    cache = CorrelationCache(window)
+    start = time.perf_counter()
+    cache.update(closes.iloc[:window + 1])
+    rebuild = time.perf_counter() - start
+    timings = []
+    for d in range(window + 1, len(closes)):
+        start = time.perf_counter()
+        cache.update(closes.iloc[d - 60:d + 1])
+        timings.append(time.perf_counter() - start)
+    start = time.perf_counter()
+    kind = cache.update(listed.iloc[-(window + 1):])
+    added = time.perf_counter() - start
+    fresh = CorrelationCache(window)
+    fresh.update(listed)
+    names = list(closes.columns[:candidates - listings]) + list(listed.columns[symbols:])
+    diff = np.nanmax(np.abs(cache.correlation(names).to_numpy() - fresh.correlation(names).to_numpy()))
+    print(f"  full rebuild      : {rebuild * 1000:8.1f} ms")
+    print(f"  daily update      : {np.median(timings) * 1000:8.1f} ms (median of {len(timings)})")
+    print(f"  {f'{listings} new symbols':<17} : {added * 1000:8.1f} ms ({kind}), max |diff| vs rebuild {diff:.1e}")
+
+    rng = np.random.default_rng(1)
+    pool = pd.DataFrame({'Symbol': names, 'Volume': rng.lognormal(12, 1.5, len(names)),
+                         'Confidence': rng.uniform(40, 100, len(names))})
+    start = time.perf_counter()
+    corr = cache.correlation(names)
+    print(f"  {candidates} x {candidates} matrix : {(time.perf_counter() - start) * 1000:8.1f} ms")
+    for method in ('greedy', 'cluster'):
+        start = time.perf_counter()
+        picks = select_diversified(pool, corr, n=10, max_corr=0.5, method=method)
+        print(f"  {method:<8} top 10   : {(time.perf_counter() - start) * 1000:8.1f} ms, "
+              f"max pair corr {picks['Max_Corr'].max():.2f}")
+    return diff < 1e-9
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--symbols', type=int, default=2000)
+    parser.add_argument('--window', type=int, default=120)
+    parser.add_argument('--candidates', type=int, default=500)
+    args = parser.parse_args()
+    raise SystemExit(0 if run(args.symbols, args.window, args.candidates) else 1)
@@ -0,0 +1,118 @@
+"""
+Scan server benchmark and parity check.
+Publishes a synthetic N-symbol scan and K archived sessions into a temporary
+data directory, serves them with logic.scan_server on a local port and compares:
+  csv parse      : what every consumer does today (read market_scan.csv, filter, sort)
+  server cold    : first request for a query (filter + render)
+  server warm    : the same query again (rendered body reused)
+  revalidate     : the same query with If-None-Match (304, no body)
+  arrow page     : the whole scan as Arrow IPC
+  history lookup : one symbol's archived rows
+  hot reload     : a new scan lands; time until the index is swapped and the ETag changes
+Filtered results are checked against pandas on the CSV.
+
+Usage: python -m benchmarks.bench_scan_server [--symbols 2000] [--sessions 250] [--requests 200]
+"""
+import argparse
+import http.client
+import json
+import tempfile
+import threading
+import time
+import numpy as np
+import pandas as pd
+
+from logic import screener, result_sink, scan_archive
+from logic.scan_server import ScanService, ScanServer, ScanClient
+from benchmarks.fixtures import isolated_data
+
+def synthetic_scan(symbols, seed):
+    rng = np.random.default_rng(seed)
+    return screener.score_rows(
+        [f"SYN{i:05d}" for i in range(symbols)], rng.uniform(50, 4000, symbols), rng.lognormal(12, 1.5, symbols),
+        rng.uniform(5, 45, symbols), rng.uniform(20, 80, symbols), rng.uniform(10, 60, symbols))
+
+def publish(df):
+    result_sink.atomic_write_parquet(df, result_sink.SCAN_PARQUET)
+    result_sink.atomic_write_csv(df, result_sink.SCAN_FILE)
+
+def per_request_ms(conn, path, count, headers=None):
+    """Mean ms per GET over a keep-alive connection; returns (ms, last response)."""
+    start = time.perf_counter()
+    for _ in range(count):
+        conn.request('GET', path, headers=headers or {})
+        response = conn.getresponse()
+        body = response.read()
+    return (time.perf_counter() - start) / count * 1000, (response, body)
+
+def run(symbols, sessions, requests):
+    with tempfile.TemporaryDirectory() as tmp, isolated_data(tmp):
+        for i, day in enumerate(pd.bdate_range(end='2026-01-30', periods=sessions)):
+            scan_archive.append_scan(synthetic_scan(symbols, i), day)
+        publish(synthetic_scan(symbols, sessions))
+
+        service = ScanService(poll=0.05)
+        start = time.perf_counter()
+        service.refresh()
+        print(f"{symbols:,} symbols, {sessions} archived sessions: index built in {time.perf_counter() - start:.2f}s "
+              f"({len(service.history):,} archived rows)")
+        service.start_watcher()
+        server = ScanServer(('127.0.0.1', 0), service)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        conn = http.client.HTTPConnection('127.0.0.1', server.server_port)
+
+        query = '/scan?passed=true&min_confidence=60&sort=-Volume&limit=10'
+        start = time.perf_counter()
+        for _ in range(5):
+            df = pd.read_csv(result_sink.SCAN_FILE)
+            expected = df[(df['Passed'] == True) & (df['Confidence'] >= 60)].sort_values('Volume', ascending=False, kind='stable')
+        csv_ms = (time.perf_counter() - start) / 5 * 1000
+        cold_ms, (response, body) = per_request_ms(conn, query, 1)
+        warm_ms, _ = per_request_ms(conn, query, requests)
+        etag = response.getheader('ETag')
+        revalidate_ms, (not_modified, _) = per_request_ms(conn, query, requests, {'If-None-Match': etag})
+        payload = json.loads(body)
+        got = [row['Symbol'] for row in payload['rows']]
+        print(f"  csv parse      : {csv_ms:8.2f} ms per consumer read")
+        print(f"  server cold    : {cold_ms:8.2f} ms")
+        print(f"  server warm    : {warm_ms:8.3f} ms per request")
+        print(f"  revalidate     : {revalidate_ms:8.3f} ms per request (status {not_modified.status})")
+        print(f"  parity         : {'OK' if got == expected['Symbol'].head(10).tolist() and payload['total'] == len(expected) else 'MISMATCH'}"
+              f" ({payload['total']} matching rows)")
+
+        arrow_ms, (response, body) = per_request_ms(conn, f'/scan?format=arrow&limit={symbols}', 1)
+        print(f"  arrow page     : {arrow_ms:8.2f} ms for {int(response.getheader('X-Total-Count')):,} rows ({len(body) / 1e6:.2f} MB)")
+        history_ms, (response, body) = per_request_ms(conn, '/history?symbol=SYN00007&columns=Confidence,ADX&limit=1000', requests)
+        print(f"  history lookup : {history_ms:8.3f} ms per request ({len(json.loads(body)['rows'])} sessions)")
+        streaks_ms, _ = per_request_ms(conn, '/streaks?sessions=30&min=2', 1)
+        print(f"  streaks        : {streaks_ms:8.2f} ms (30 sessions, cold)")
+
+        client = ScanClient(f"http://127.0.0.1:{server.server_port}")
+        first = client.get('/scan', passed='true', sort='-Volume', limit=50)
+        publish(synthetic_scan(symbols, sessions + 1))
+        start = time.perf_counter()
+        while time.perf_counter() - start < 5:
+            conn.request('GET', query, headers={'If-None-Match': etag})
+            response = conn.getresponse()
+            response.read()
+            if response.status == 200:
+                break
+            time.sleep(0.005)
+        reload_ms = (time.perf_counter() - start) * 1000
+        second = client.get('/scan', passed='true', sort='-Volume', limit=50)
+        third = client.get('/scan', passed='true', sort='-Volume', limit=50)
+        print(f"  hot reload     : {reload_ms:8.1f} ms until the new scan was served (poll every {service.poll:g}s)")
+        print(f"  client         : changed scan {'refetched' if not second.equals(first) else 'NOT refetched'}, "
+              f"{client.not_modified} 304(s), repeat {'reused' if third is second else 'refetched'}")
+        conn.close()
+        service.stop()
+        server.shutdown()
+        server.server_close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scan server benchmark and parity check")
+    parser.add_argument('--symbols', type=int, default=2000)
+    parser.add_argument('--sessions', type=int, default=250)
+    parser.add_argument('--requests', type=int, default=200)
+    args = parser.parse_args()
+    run(args.symbols, args.sessions, args.requests)
@@ -0,0 +1,103 @@
+"""
+Synthetic NSE market fixtures for offline benchmarks.
+write_market() writes a seeded random-walk market of N symbols in the
+ReplaySource layout (per-session Bhavcopy files, per-symbol history exports
+in the file.csv format, F&O ban and underlyings lists, participant OI) for the NSE sessions
+ending today. isolated_data() redirects every data/ path of the pipeline to
+a temporary directory, so benchmark scans never touch the real store.
+"""
+import os
+import contextlib
+import numpy as np
+import pandas as pd
+
+from logic import trading_calendar, history_store, bhavcopy_panel, result_sink, scan_cache, scan_archive, run_report, portfolio
+from benchmarks.bench_ingest import HEADER, indian_format
+
+def fixture_dir(root, symbols, sessions):
+    """Fixture path keyed by size and the latest session (fixtures follow the calendar)."""
+    latest = trading_calendar.latest_session().strftime('%Y%m%d')
+    return os.path.join(root, f"market-{symbols}x{sessions}-{latest}")
+
+def random_market(symbols, sessions, seed=11):
+    """(sessions x symbols) OHLCV arrays; every 25th symbol is a recent listing with a short history."""
+    rng = np.random.default_rng(seed)
+    close = rng.uniform(50, 4000, symbols) * np.exp(np.cumsum(rng.normal(0, 0.02, (sessions, symbols)), axis=0))
+    high = close * (1 + rng.uniform(0, 0.03, close.shape))
+    low = close * (1 - rng.uniform(0, 0.03, close.shape))
+    open_ = low + (high - low) * rng.uniform(0, 1, close.shape)
+    volume = rng.lognormal(12, 1.5, close.shape).round()
+    for j in range(0, symbols, 25):
+        k = int(rng.integers(sessions - 20, sessions - 5))
+        for arr in (open_, high, low, close, volume):
+            arr[:k, j] = np.nan
+    return open_, high, low, close, volume
+
+def write_market(root, symbols, sessions=61, seed=11):
+    """Write (or reuse) the replay fixtures for a synthetic market; returns the fixture directory."""
+    path = fixture_dir(root, symbols, sessions)
+    if os.path.exists(os.path.join(path, 'complete')):
+        return path
+    days = trading_calendar.previous_sessions(sessions)
+    names = np.array([f"SYN{i:05d}" for i in range(symbols)])
+    open_, high, low, close, volume = random_market(symbols, sessions, seed)
+
+    os.makedirs(os.path.join(path, 'bhavcopy'), exist_ok=True)
+    for i, day in enumerate(days):
+        ok = np.isfinite(close[i])
+        pd.DataFrame({
+            'TradDt': day.strftime('%Y-%m-%d'), 'TckrSymb': names[ok], 'SctySrs': 'EQ',
+            'OpnPric': open_[i, ok].round(2), 'HghPric': high[i, ok].round(2), 'LwPric': low[i, ok].round(2),
+            'ClsPric': close[i, ok].round(2), 'TtlTradgVol': volume[i, ok].astype(np.int64),
+            'TtlTrfVal': (volume[i, ok] * close[i, ok]).round(2),
+        }).to_csv(os.path.join(path, 'bhavcopy', f"{day.strftime('%Y%m%d')}.csv"), index=False)
+
+    os.makedirs(os.path.join(path, 'history'), exist_ok=True)
+    dates = np.array(days.strftime('%d-%b-%Y'))
+    for j, name in enumerate(names):
+        ok = np.isfinite(close[:, j])
+        c, q = close[ok, j], volume[ok, j]
+        prev = np.concatenate([[c[0]], c[:-1]])
+        cols = [[name] * ok.sum(), ['EQ'] * ok.sum(), dates[ok]] + [
+            indian_format(v, 2) for v in (prev, open_[ok, j], high[ok, j], low[ok, j], c, c, c)
+        ] + [indian_format(q, 0), indian_format(q * c, 2), indian_format(q // 40, 0), indian_format(q // 2, 0), ['50.00'] * ok.sum()]
+        frame = pd.DataFrame(dict(zip(HEADER, cols)))
+        with open(os.path.join(path, 'history', f"{name}.csv"), 'w', encoding='utf-8') as f:
+            f.write('ï»¿')  # as in NSE exports (file.csv)
+            frame.to_csv(f, index=False, quoting=1)
+
+    pd.DataFrame({'SYMBOL': names[1:symbols:97][:5]}).to_csv(os.path.join(path, 'fno_ban.csv'), index=False)
+    pd.DataFrame({'symbol': names[::5]}).to_csv(os.path.join(path, 'fno_symbols.csv'), index=False)
+    os.makedirs(os.path.join(path, 'participant_oi'), exist_ok=True)
+    pd.DataFrame({'Client Type': ['Client', 'FII'], 'Future Index Long': [150000, 90000], 'Future Index Short': [120000, 80000]}) \
+        .to_csv(os.path.join(path, 'participant_oi', f"{days[-1].strftime('%Y%m%d')}.csv"), index=False)
+    open(os.path.join(path, 'complete'), 'w').close()
+    return path
+
+@contextlib.contextmanager
+def isolated_data(tmp):
+    """Point every data/ path used by a scan at 'tmp' for the duration of the block."""
+    targets = [
+        (history_store, 'HISTORY_DIR', os.path.join(tmp, 'history')),
+        (bhavcopy_panel, 'BHAVCOPY_DIR', os.path.join(tmp, 'bhavcopy')),
+        (bhavcopy_panel, 'PANEL_DIR', os.path.join(tmp, 'panel')),
+        (result_sink, 'SCAN_DB', os.path.join(tmp, 'scan.db')),
+        (result_sink, 'SCAN_FILE', os.path.join(tmp, 'market_scan.csv')),
+        (result_sink, 'SCAN_PARQUET', os.path.join(tmp, 'market_scan.parquet')),
+        (result_sink, 'FII_FILE', os.path.join(tmp, 'fii_stats.json')),
+        (scan_cache, 'CACHE_DB', os.path.join(tmp, 'scan_cache.db')),
+        (scan_archive, 'ARCHIVE_DIR', os.path.join(tmp, 'archive')),
+        (run_report, 'DATA_DIR', tmp),
+        (run_report, 'REPORT_FILE', os.path.join(tmp, 'run_report.json')),
+        (portfolio, 'CACHE_FILE', os.path.join(tmp, 'corr_cache.npz')),
+        (portfolio, 'CORRELATION_FILE', os.path.join(tmp, 'correlation.parquet')),
+    ]
+    saved = [(module, name, getattr(module, name)) for module, name, _ in targets]
+    os.makedirs(tmp, exist_ok=True)
+    for module, name, value in targets:
+        setattr(module, name, value)
+    try:
+        yield tmp
+    finally:
+        for module, name, value in saved:
+            setattr(module, name, value)
@@ -0,0 +1,207 @@
+"""
+Offline benchmark suite with regression tracking.
+Every case runs against synthetic markets of 500 / 2,000 / 10,000 symbols
+served by the replay data source (logic.data_sources.ReplaySource), so no
+network access is needed and runs are reproducible:
+  e2e_history  : run_screener(source='history'), cold (empty store) then warm,
+                 with injected per-request latency and failures
+  e2e_bhavcopy : run_screener(source='bhavcopy'), cold then warm
+  indicators   : per-symbol score_history (sampled, extrapolated) vs one score_panel pass
+  ingest       : read_nse_csv on an NSE-format export of N x 60 rows
+  dashboard    : Streamlit app script run (AppTest) over an N-row scan, cold and warm cache
+
+NSE politeness limits (fetch_scheduler.ENDPOINT_RATES) would dominate the
+end-to-end timings, so they are raised to --rate for the run. Results are
+appended to benchmarks/history.jsonl with the current commit, and each
+metric is compared with the latest record from a different commit.
+
+Usage: python -m benchmarks.suite [--sizes 500 2000 10000] [--cases e2e_history ingest ...]
+                                  [--threshold 0.2] [--fail-on-regression]
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+import numpy as np
+
+from logic import screener, fetch_scheduler, bhavcopy_panel, result_sink
+from logic.data_sources import ReplaySource, set_source
+from logic.ingest import read_nse_csv
+from benchmarks.fixtures import write_market, isolated_data
+from benchmarks.bench_ingest import write_fixture
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+HISTORY_FILE = os.path.join(os.path.dirname(__file__), 'history.jsonl')
+FIXTURE_ROOT = os.path.join(tempfile.gettempdir(), 'theta-hunter-bench')
+CASES = ['e2e_history', 'e2e_bhavcopy', 'indicators', 'ingest', 'dashboard']
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    out = fn(*args, **kwargs)
+    return time.perf_counter() - start, out
+
+def quiet(fn, *args, **kwargs):
+    """Run fn with stdout discarded (the screener prints progress)."""
+    saved = sys.stdout
+    sys.stdout = open(os.devnull, 'w')
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        sys.stdout.close()
+        sys.stdout = saved
+
+def e2e(size, market, args, source):
+    """Cold then warm scan of the replayed market; symbols/second for each."""
+    replay = ReplaySource(market, latency=args.latency, jitter=args.latency,
+                          failure_rate=args.failure_rate, seed=size)
+    previous = set_source(replay)
+    rates = dict(fetch_scheduler.ENDPOINT_RATES)
+    fetch_scheduler.ENDPOINT_RATES.update({k: args.rate for k in rates})
+    metrics = {}
+    try:
+        with tempfile.TemporaryDirectory() as tmp, isolated_data(tmp):
+            for run in ('cold', 'warm'):
+                seconds, results = timed(quiet, screener.run_screener, source=source, top_n=size)
+                metrics[f"{run}_s"] = (seconds, 's')
+                metrics[f"{run}_symbols_per_s"] = (len(results) / seconds, 'symbols/s')
+            metrics['requests'] = (replay.calls, 'count')
+    finally:
+        set_source(previous)
+        fetch_scheduler.ENDPOINT_RATES.update(rates)
+    return metrics
+
+def case_e2e_history(size, market, args):
+    return e2e(size, market, args, 'history')
+
+def case_e2e_bhavcopy(size, market, args):
+    return e2e(size, market, args, 'bhavcopy')
+
+def case_indicators(size, market, args):
+    """Per-symbol scoring cost: the history path (one frame per symbol) vs the panel pass."""
+    with tempfile.TemporaryDirectory() as tmp, isolated_data(tmp):
+        previous = set_source(ReplaySource(market))
+        try:
+            panel = bhavcopy_panel.build_panel(sessions=60, save=False)
+        finally:
+            set_source(previous)
+    symbols = list(panel['Close'].columns)
+    sample = symbols[:min(len(symbols), 500)]
+    frames = {s: bhavcopy_panel.symbol_history(panel, s) for s in sample}
+    per_symbol, _ = timed(lambda: [screener.score_history(s, frames[s]) for s in sample])
+    batch, _ = timed(screener.score_panel, panel, symbols)
+    return {
+        'history_ms_per_symbol': (per_symbol / len(sample) * 1000, 'ms'),
+        'panel_ms_per_symbol': (batch / len(symbols) * 1000, 'ms'),
+        'panel_total_s': (batch, 's'),
+    }
+
+def case_ingest(size, market, args):
+    rows = size * 60
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'history.csv')
+        write_fixture(path, rows)
+        seconds = min(timed(read_nse_csv, path)[0] for _ in range(3))
+    return {'read_s': (seconds, 's'), 'rows_per_s': (rows / seconds, 'rows/s')}
+
+def case_dashboard(size, market, args):
+    """App script run over an N-row scan: first load (cold cache) and rerun (warm)."""
+    try:
+        from streamlit.testing.v1 import AppTest
+        import streamlit as st
+    except ImportError:
+        print("  streamlit not installed; skipping dashboard case.")
+        return {}
+    rng = np.random.default_rng(size)
+    results = screener.score_rows(
+        [f"SYN{i:05d}" for i in range(size)], rng.uniform(50, 4000, size), rng.lognormal(12, 1.5, size),
+        rng.uniform(5, 45, size), rng.uniform(20, 80, size), rng.uniform(10, 60, size))
+    with tempfile.TemporaryDirectory() as tmp:
+        shutil.copy(os.path.join(ROOT, 'app.py'), tmp)
+        os.symlink(os.path.abspath(os.path.join(ROOT, 'logic')), os.path.join(tmp, 'logic'))
+        data_dir = os.path.join(tmp, 'data')
+        os.makedirs(data_dir)
+        result_sink.atomic_write_parquet(results, os.path.join(data_dir, 'market_scan.parquet'))
+        result_sink.atomic_write_csv(results, os.path.join(data_dir, 'market_scan.csv'))
+        result_sink.atomic_write_json({"ratio": 1.0, "status": "Neutral"}, os.path.join(data_dir, 'fii_stats.json'))
+        st.cache_data.clear()
+        app = AppTest.from_file(os.path.join(tmp, 'app.py'), default_timeout=600)
+        cold, _ = timed(app.run)
+        warm, _ = timed(app.run)
+        if app.exception:
+            raise RuntimeError(f"Dashboard raised: {app.exception[0].message}")
+    return {'cold_s': (cold, 's'), 'warm_s': (warm, 's')}
+
+def current_commit():
+    def git(*cmd):
+        return subprocess.run(['git', *cmd], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    return git('rev-parse', '--short', 'HEAD') or 'unknown', bool(git('status', '--porcelain', '--untracked-files=no'))
+
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def baseline(history, commit, case, size, metric):
+    """Latest record of this metric from another commit."""
+    for record in reversed(history):
+        if (record['commit'] != commit and record['case'] == case
+                and record['size'] == size and record['metric'] == metric):
+            return record
+    return None
+
+def higher_is_better(unit):
+    return unit.endswith('/s')
+
+def run(args):
+    history = load_history(args.history)
+    commit, dirty = current_commit()
+    records, regressions = [], []
+    print(f"Benchmark suite at {commit}{' (dirty)' if dirty else ''}")
+    for size in args.sizes:
+        market = write_market(FIXTURE_ROOT, size)
+        for case in args.cases:
+            print(f"{case} @ {size} symbols...")
+            metrics = globals()[f"case_{case}"](size, market, args)
+            for metric, (value, unit) in metrics.items():
+                record = {'commit': commit, 'dirty': dirty, 'date': datetime.now().isoformat(timespec='seconds'),
+                          'case': case, 'size': size, 'metric': metric, 'value': round(value, 6), 'unit': unit}
+                records.append(record)
+                base = baseline(history, commit, case, size, metric)
+                note = ""
+                if base and base['value'] and unit != 'count':
+                    change = value / base['value'] - 1
+                    slower = -change if higher_is_better(unit) else change
+                    note = f"  {change:+.1%} vs {base['commit']}"
+                    if slower > args.threshold:
+                        note += "  REGRESSION"
+                        regressions.append(record)
+                print(f"  {metric:<24} {value:>12.4f} {unit}{note}")
+
+    with open(args.history, 'a') as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+    print(f"{len(records)} measurements appended to {args.history}")
+    if regressions:
+        print(f"{len(regressions)} metric(s) regressed by more than {args.threshold:.0%}: "
+              + ", ".join(f"{r['case']}/{r['size']}/{r['metric']}" for r in regressions))
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline benchmark suite with regression tracking")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[500, 2000, 10000])
+    parser.add_argument('--cases', nargs='+', choices=CASES, default=CASES)
+    parser.add_argument('--latency', type=float, default=0.02, help="Injected seconds per replayed request (+ same jitter)")
+    parser.add_argument('--failure-rate', type=float, default=0.02, help="Share of replayed requests that fail")
+    parser.add_argument('--rate', type=float, default=1000.0, help="Requests/second allowed per endpoint")
+    parser.add_argument('--history', default=HISTORY_FILE, help="Results log (JSON lines)")
+    parser.add_argument('--threshold', type=float, default=0.2, help="Relative slowdown reported as a regression")
+    parser.add_argument('--fail-on-regression', action='store_true', help="Exit 1 when any metric regressed")
+    args = parser.parse_args()
+    regressions = run(args)
+    sys.exit(1 if regressions and args.fail_on_regression else 0)
@@ -0,0 +1,202 @@
+"""
+Event-driven alerts between scans.
+The current scan is joined by Symbol against a snapshot of the previous one,
+and every subscription rule is evaluated as one vectorized mask over the
+joined frame. The cost is one join plus one array expression per rule
+however large the universe, and only symbols whose state changed produce
+events. The snapshot (data/alert_snapshot.parquet, sorted by Symbol) is
+replaced after each evaluation; the first run falls back to the previous
+archived session.
+
+Rules come from data/alert_rules.json when present, else DEFAULT_RULES.
+Each rule is a dict with 'name', 'label' and a 'kind':
+- became / ceased: a boolean column turned True / turned False (an unknown
+  value on either side, e.g. Banned on an offline run, is no transition)
+- cross_above / cross_below: a numeric column crossed 'level'
+- rise / fall: a numeric column moved by at least 'by'
+- expr: 'when' is a pandas expression over the joined frame (current
+  columns, prev_<column> and in_previous)
+An optional 'where' expression restricts any rule to matching rows.
+"""
+import os
+import json
+import numpy as np
+import pandas as pd
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+SNAPSHOT_FILE = os.path.join(DATA_DIR, 'alert_snapshot.parquet')
+RULES_FILE = os.path.join(DATA_DIR, 'alert_rules.json')
+SNAPSHOT_COLUMNS = ['Symbol', 'Close', 'Volume', 'ADX', 'RSI', 'HV', 'Confidence', 'Passed', 'Banned']
+EVENT_COLUMNS = ['Symbol', 'Rule', 'Event', 'Previous', 'Current']
+
+DEFAULT_RULES = [
+    {'name': 'entered_passed', 'kind': 'became', 'column': 'Passed', 'label': "entered Passed"},
+    {'name': 'left_passed', 'kind': 'ceased', 'column': 'Passed', 'label': "left Passed"},
+    {'name': 'adx_above_25', 'kind': 'cross_above', 'column': 'ADX', 'level': 25, 'label': "ADX crossed above 25"},
+    {'name': 'adx_below_25', 'kind': 'cross_below', 'column': 'ADX', 'level': 25, 'label': "ADX crossed below 25"},
+    {'name': 'confidence_jump', 'kind': 'rise', 'column': 'Confidence', 'by': 15, 'label': "Confidence jumped"},
+    {'name': 'fno_ban', 'kind': 'became', 'column': 'Banned', 'label': "went into F&O ban"},
+]
+
+def load_rules(path=None):
+    path = path or RULES_FILE
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return DEFAULT_RULES
+
+def _indexed(df):
+    """Snapshot columns of a scan, one row per Symbol, sorted by Symbol."""
+    if df is None or len(df) == 0 or 'Symbol' not in df.columns:
+        return pd.DataFrame(columns=SNAPSHOT_COLUMNS[1:], index=pd.Index([], name='Symbol'))
+    df = df[[c for c in SNAPSHOT_COLUMNS if c in df.columns]].drop_duplicates('Symbol', keep='last')
+    return df.set_index('Symbol').sort_index()
+
+def current_frame(results, ban_list=None):
+    """
+    Indexed snapshot of a scan. Banned symbols are excluded from the scan
+    universe, so they are added as rows of their own with Banned=True.
+    ban_list=None (unknown) leaves Banned empty.
+    """
+    cur = _indexed(pd.DataFrame(results))
+    if ban_list is None:
+        cur['Banned'] = np.nan
+        return cur
+    banned = pd.Index(sorted(set(ban_list)), name='Symbol')
+    cur = cur.reindex(cur.index.union(banned))
+    cur['Banned'] = cur.index.isin(banned)
+    return cur
+
+def join_scans(current, previous):
+    """Outer join on Symbol: current columns, prev_<column> and in_previous (row in the previous scan)."""
+    joined = current.join(previous.add_prefix('prev_'), how='outer')
+    joined['in_previous'] = joined.index.isin(previous.index)
+    return joined
+
+def _as_bool(series):
+    return series.eq(True).fillna(False).to_numpy(dtype=bool)
+
+def _as_float(series):
+    return pd.to_numeric(series, errors='coerce').to_numpy(dtype=float)
+
+def rule_mask(joined, rule):
+    """Boolean array of symbols that trigger 'rule' (None if its columns are missing)."""
+    kind, col = rule['kind'], rule.get('column')
+    if kind == 'expr':
+        mask = np.asarray(joined.eval(rule['when']), dtype=bool)
+    else:
+        if col not in joined.columns or f"prev_{col}" not in joined.columns:
+            return None
+        cur, prev = joined[col], joined[f"prev_{col}"]
+        if kind == 'became':
+            # A symbol new to the scan had the value False; one that was there with no value is unknown
+            known = prev.notna().to_numpy() | ~joined['in_previous'].to_numpy(dtype=bool)
+            mask = _as_bool(cur) & known & ~_as_bool(prev)
+        elif kind == 'ceased':
+            mask = _as_bool(prev) & cur.notna().to_numpy() & ~_as_bool(cur)
+        else:
+            cur, prev = _as_float(cur), _as_float(prev)
+            with np.errstate(invalid='ignore'):
+                if kind == 'cross_above':
+                    mask = (prev < rule['level']) & (cur >= rule['level'])
+                elif kind == 'cross_below':
+                    mask = (prev >= rule['level']) & (cur < rule['level'])
+                elif kind == 'rise':
+                    mask = cur - prev >= rule['by']
+                elif kind == 'fall':
+                    mask = prev - cur >= rule['by']
+                else:
+                    raise ValueError(f"Unknown alert rule kind: {kind}")
+    if rule.get('where'):
+        mask = mask & np.asarray(joined.eval(rule['where']), dtype=bool)
+    return mask
+
+def evaluate(joined, rules):
+    """Events (Symbol, Rule, Event, Previous, Current) for every rule over the joined frame."""
+    frames = []
+    for rule in rules:
+        mask = rule_mask(joined, rule)
+        if mask is None or not mask.any():
+            continue
+        hit = joined[mask]
+        col = rule.get('column')
+        has_values = col is not None and col in hit.columns and rule['kind'] != 'expr'
+        frames.append(pd.DataFrame({
+            'Symbol': hit.index,
+            'Rule': rule['name'],
+            'Event': rule.get('label', rule['name']),
+            'Previous': hit[f"prev_{col}"].to_numpy() if has_values else np.nan,
+            'Current': hit[col].to_numpy() if has_values else np.nan,
+        }))
+    if not frames:
+        return pd.DataFrame(columns=EVENT_COLUMNS)
+    return pd.concat(frames, ignore_index=True).sort_values(['Symbol', 'Rule'], kind='stable').reset_index(drop=True)
+
+class AlertEngine:
+    """
+    Usage:
+        engine = AlertEngine()                    # rules from alert_rules.json, else DEFAULT_RULES
+        events = engine.run(results, ban_list)    # None when there is no previous scan yet
+    run() diffs against the snapshot and then replaces it with this scan.
+    """
+
+    def __init__(self, rules=None, snapshot_path=None):
+        self.rules = rules if rules is not None else load_rules()
+        self.snapshot_path = snapshot_path or SNAPSHOT_FILE
+
+    def previous(self, scan_date=None):
+        """Last evaluated scan, else the latest archived session before scan_date."""
+        if os.path.exists(self.snapshot_path):
+            return pd.read_parquet(self.snapshot_path)
+        # Only the first run falls back to the archive
+        try:
+            import scan_archive
+            import trading_calendar
+        except ImportError:
+            from logic import scan_archive
+            from logic import trading_calendar
+        before = pd.Timestamp(scan_date or trading_calendar.latest_session()).strftime('%Y-%m-%d')
+        dates = [d for d in scan_archive.archived_dates() if d < before]
+        if not dates:
+            return None
+        columns = [c for c in SNAPSHOT_COLUMNS if c != 'Banned']
+        return _indexed(scan_archive.query(columns=columns, start=dates[-1], end=dates[-1]))
+
+    def save(self, current):
+        os.makedirs(os.path.dirname(self.snapshot_path), exist_ok=True)
+        snapshot = current.copy()
+        snapshot['Banned'] = snapshot['Banned'].astype('boolean')
+        snapshot['Passed'] = snapshot['Passed'].astype('boolean') if 'Passed' in snapshot.columns else pd.NA
+        # Index kept in the file so the next run loads it already keyed by Symbol
+        tmp_path = self.snapshot_path + '.tmp'
+        snapshot.to_parquet(tmp_path)
+        os.replace(tmp_path, self.snapshot_path)
+
+    def run(self, results, ban_list=None, scan_date=None, commit=True):
+        current = current_frame(results, ban_list)
+        previous = self.previous(scan_date)
+        if ban_list is None and previous is not None and 'Banned' in previous.columns:
+            # Unknown ban list: keep the last known statuses instead of overwriting them with NaN
+            still_banned = previous.index[previous['Banned'].eq(True)]
+            current = current.reindex(current.index.union(still_banned))
+            current['Banned'] = previous['Banned'].reindex(current.index)
+        events = None
+        if previous is not None:
+            events = evaluate(join_scans(current, previous), self.rules)
+        if commit:
+            self.save(current)
+        return events
+
+def format_events(events, limit=40):
+    """Alert message: one line per event, grouped by symbol."""
+    lines = ["🔔 **Theta Hunter Pro - Scan Alerts**\n", "```"]
+    for row in events.head(limit).itertuples(index=False):
+        change = ""
+        if pd.notna(row.Previous) and pd.notna(row.Current) and not isinstance(row.Current, (bool, np.bool_)):
+            change = f" ({row.Previous:g} → {row.Current:g})"
+        lines.append(f"{row.Symbol[:12]:<12} {row.Event}{change}")
+    if len(events) > limit:
+        lines.append(f"... and {len(events) - limit} more")
+    lines.append("```")
+    lines.append(f"\n📣 {len(events)} change(s) across {events['Symbol'].nunique()} stock(s) since the previous scan")
+    return "\n".join(lines)
@@ -0,0 +1,204 @@
+"""
+Parameter-sweep backtester for the Confidence score and strangle strikes.
+Replays the screener's scoring over a multi-year (date x symbol) OHLC panel:
+ADX / RSI / HV matrices are computed once with the vectorized indicator
+engine, then every configuration of the grid is evaluated as array operations
+over (param x date x symbol). Each flagged day opens a short strangle at
+close x (1 -/+ strike_pct) that is held for 'hold' sessions; the payoff is the
+intrinsic value owed at the exit close (premium is not modelled here).
+Configurations are spread over a process pool.
+"""
+import os
+import time
+import itertools
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+try:
+    from indicators import adx, rsi, hv
+    from screener import SCORING_PARAMS, score_arrays
+    from bhavcopy_panel import build_panel
+    from result_sink import atomic_write_csv
+except ImportError:
+    from logic.indicators import adx, rsi, hv
+    from logic.screener import SCORING_PARAMS, score_arrays
+    from logic.bhavcopy_panel import build_panel
+    from logic.result_sink import atomic_write_csv
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+RESULTS_FILE = os.path.join(DATA_DIR, 'backtest_results.csv')
+
+# Default sweep: 4 x 3 x 3 x 4 x 3 x 3 x 3 = 3888 configurations
+DEFAULT_GRID = {
+    'adx_max': [15, 20, 25, 30],
+    'rsi_low': [35, 40, 45],
+    'rsi_high': [55, 60, 65],
+    'weights': [(0.4, 0.4, 0.2), (0.5, 0.3, 0.2), (0.3, 0.5, 0.2), (0.34, 0.33, 0.33)],
+    'min_confidence': [0, 40, 60],
+    'strike_pct': [0.05, 0.08, 0.10],
+    'hold': [5, 10, 20],
+}
+
+def expand_grid(grid):
+    """All configurations of a grid dict (invalid RSI bands dropped), grouped by outcome."""
+    keys = list(grid)
+    configs = [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+    configs = [c for c in configs if c['rsi_low'] < c['rsi_high']]
+    return sorted(configs, key=lambda c: (c['hold'], c['strike_pct']))
+
+def score_matrices(high, low, close, params=SCORING_PARAMS):
+    """
+    Per-day sub-scores for every symbol, using the screener's score_arrays
+    (same formulas and NaN defaults). Returns a dict of (days x symbols) arrays.
+    """
+    scores = score_arrays(adx(high, low, close, params['length']), rsi(close, params['length']),
+                          hv(close, params['hv_window']), params)
+    return {
+        'ADX': scores['ADX'],
+        'RSI': scores['RSI'],
+        'Trend': scores['Trend_Score'],
+        'Stability': scores['Stability_Score'],
+        'Vol': scores['Vol_Score'],
+        'Bars': np.cumsum(np.isfinite(close), axis=0),
+    }
+
+def strangle_outcomes(high, low, close, hold, strike_pct):
+    """
+    Outcome of a strangle opened at every (day, symbol) close and held 'hold' sessions.
+    Returns (valid, inside, touched, breach_pct): breach_pct is the intrinsic
+    value at exit as % of the entry close; touched means a strike traded intraday.
+    """
+    T = close.shape[0]
+    exit_close = np.full_like(close, np.nan)
+    exit_close[:T - hold] = close[hold:]
+    put_k, call_k = close * (1 - strike_pct), close * (1 + strike_pct)
+
+    with np.errstate(invalid='ignore'):
+        breach = (np.maximum(put_k - exit_close, 0) + np.maximum(exit_close - call_k, 0)) / close * 100
+        fut_high = np.full_like(close, np.nan)
+        fut_low = np.full_like(close, np.nan)
+        if T > hold:
+            windows_high = np.lib.stride_tricks.sliding_window_view(np.where(np.isfinite(high), high, -np.inf)[1:], hold, axis=0)
+            windows_low = np.lib.stride_tricks.sliding_window_view(np.where(np.isfinite(low), low, np.inf)[1:], hold, axis=0)
+            fut_high[:T - hold] = windows_high.max(axis=-1)
+            fut_low[:T - hold] = windows_low.min(axis=-1)
+        touched = (fut_high >= call_k) | (fut_low <= put_k)
+    valid = np.isfinite(close) & np.isfinite(exit_close)
+    return valid, breach == 0, touched, np.where(valid, breach, 0.0)
+
+SIGNAL_KEYS = ('adx_max', 'rsi_low', 'rsi_high', 'weights', 'min_confidence')
+OUTCOME_KEYS = ('hold', 'strike_pct')
+
+def prepare(panel, configs, params=SCORING_PARAMS):
+    """
+    Shared state for the sweep: sub-scores flattened to the (day, symbol) cells
+    that pass the loosest thresholds of the grid, and one (cells x 4) block of
+    outcome columns [valid, inside, touched, breach_pct] per (hold, strike_pct).
+    """
+    high, low, close = (panel[f].to_numpy(dtype=float) for f in ('High', 'Low', 'Close'))
+    scores = score_matrices(high, low, close, params)
+
+    loose = (
+        (scores['Bars'] >= params['min_bars'])
+        & np.isfinite(close)
+        & (scores['ADX'] < max(c['adx_max'] for c in configs))
+        & (scores['RSI'] > min(c['rsi_low'] for c in configs))
+        & (scores['RSI'] < max(c['rsi_high'] for c in configs))
+    )
+    cells = np.flatnonzero(loose)
+    state = {key: scores[key].ravel()[cells] for key in ('ADX', 'RSI', 'Trend', 'Stability', 'Vol')}
+    state['outcome_keys'] = sorted({tuple(c[k] for k in OUTCOME_KEYS) for c in configs})
+    blocks = []
+    for hold, strike in state['outcome_keys']:
+        valid, inside, touched, breach = (a.ravel()[cells] for a in strangle_outcomes(high, low, close, hold, strike))
+        blocks.append(np.stack([valid, inside & valid, touched & valid, breach], axis=1))
+    # float32 keeps trade counts exact (< 2**24 cells) and halves matmul cost
+    state['outcomes'] = np.hstack(blocks).astype(np.float32) if blocks else np.zeros((len(cells), 0), np.float32)
+    state['days'] = close.shape[0]
+    return state
+
+_STATE = {}
+
+def _init_worker(state):
+    global _STATE
+    _STATE = state
+
+def evaluate_signals(signals, state=None):
+    """
+    Evaluate a chunk of signal configurations against every outcome.
+    Flags are built as one (signal x cell) array pass; all counts and breach
+    sums then come from a single matrix product with the outcome columns.
+    Returns one row per (signal, hold, strike_pct).
+    """
+    state = state or _STATE
+    column = lambda key: np.array([c[key] for c in signals], dtype=float)[:, None]
+    weights = np.array([c['weights'] for c in signals], dtype=float)
+    confidence = (weights[:, 0:1] * state['Trend'] + weights[:, 1:2] * state['Stability']
+                  + weights[:, 2:3] * state['Vol'])
+    flagged = ((state['ADX'] < column('adx_max'))
+               & (state['RSI'] > column('rsi_low')) & (state['RSI'] < column('rsi_high'))
+               & (confidence >= column('min_confidence')))
+    stats = flagged.astype(np.float32) @ state['outcomes']
+
+    rows = []
+    for i, signal in enumerate(signals):
+        for k, (hold, strike) in enumerate(state['outcome_keys']):
+            n, wins, touches, breach_sum = (float(v) for v in stats[i, 4 * k:4 * k + 4])
+            rows.append({
+                **signal,
+                'weights': '/'.join(f"{w:g}" for w in signal['weights']),
+                'strike_pct': strike,
+                'hold': hold,
+                'trades': int(n),
+                'win_rate': round(wins / n * 100, 2) if n else np.nan,
+                'touch_rate': round(touches / n * 100, 2) if n else np.nan,
+                'avg_breach_pct': round(breach_sum / n, 3) if n else np.nan,
+            })
+    return rows
+
+def run_sweep(panel, grid=None, workers=None, chunk_size=16, params=SCORING_PARAMS):
+    """
+    Evaluate every configuration of 'grid' over the panel.
+    Returns a DataFrame with one row per configuration, best win rate first.
+    """
+    configs = expand_grid(grid or DEFAULT_GRID)
+    start = time.perf_counter()
+    state = prepare(panel, configs, params)
+    print(f"Prepared {state['days']} sessions x {panel['Close'].shape[1]} symbols "
+          f"({len(state['ADX'])} candidate cells) in {time.perf_counter() - start:.1f}s.")
+
+    # Configurations differing only in hold / strike share one signal pass
+    signals = list({tuple(c[k] for k in SIGNAL_KEYS): {k: c[k] for k in SIGNAL_KEYS} for c in configs}.values())
+    chunks = [signals[i:i + chunk_size] for i in range(0, len(signals), chunk_size)]
+    rows = []
+    if workers == 1:
+        for chunk in chunks:
+            rows.extend(evaluate_signals(chunk, state))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(state,)) as pool:
+            for chunk_rows in pool.map(evaluate_signals, chunks):
+                rows.extend(chunk_rows)
+    print(f"Evaluated {len(configs)} configurations ({len(signals)} signals) in {time.perf_counter() - start:.1f}s.")
+
+    # The grid is a full product, so every (signal, outcome) pair is a requested configuration
+    results = pd.DataFrame(rows)
+    return results.sort_values(['win_rate', 'trades'], ascending=False).reset_index(drop=True)
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Theta Hunter parameter-sweep backtest")
+    parser.add_argument('--sessions', type=int, default=1250, help="Panel length in NSE sessions (~250 per year)")
+    parser.add_argument('--offline', action='store_true', help="Use cached Bhavcopy files only")
+    parser.add_argument('--workers', type=int, default=None, help="Process pool size (default: CPU count)")
+    parser.add_argument('--top', type=int, default=20)
+    args = parser.parse_args()
+
+    panel = build_panel(sessions=args.sessions, offline=args.offline, save=False)
+    if not panel:
+        print("No panel data available.")
+    else:
+        results = run_sweep(panel, workers=args.workers)
+        os.makedirs(DATA_DIR, exist_ok=True)
+        atomic_write_csv(results, RESULTS_FILE)
+        print(results.head(args.top).to_string(index=False))
+        print(f"Saved {len(results)} configurations to backtest_results.csv.")
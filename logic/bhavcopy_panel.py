@@ -0,0 +1,115 @@
+"""
+Bulk OHLCV panel built from daily full-market Bhavcopy files.
+One request per trading day (instead of one per symbol). Each day is cached
+under data/bhavcopy and the stacked result is stored as wide (date x symbol)
+matrices under data/panel.
+"""
+import os
+import pandas as pd
+try:
+    from nse_fetcher import get_bhavcopy
+    from ingest import normalize_frame
+    import trading_calendar
+except ImportError:
+    from logic.nse_fetcher import get_bhavcopy
+    from logic.ingest import normalize_frame
+    from logic import trading_calendar
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+BHAVCOPY_DIR = os.path.join(DATA_DIR, 'bhavcopy')
+PANEL_DIR = os.path.join(DATA_DIR, 'panel')
+PANEL_FIELDS = ['Open', 'High', 'Low', 'Close', 'Volume', 'Turnover']
+
+def _cache_path(trade_date):
+    return os.path.join(BHAVCOPY_DIR, f"{trade_date.strftime('%Y%m%d')}.parquet")
+
+def normalize_bhavcopy(df, series='EQ'):
+    """Reduce a raw Bhavcopy to Symbol + OHLCV/Turnover rows for one series."""
+    df = normalize_frame(df)
+    required = ['Symbol', 'Series'] + PANEL_FIELDS
+    if df.empty or not set(required).issubset(df.columns):
+        return pd.DataFrame(columns=['Symbol'] + PANEL_FIELDS)
+
+    out = df.loc[df['Series'] == series, ['Symbol'] + PANEL_FIELDS]
+    out['Volume'] = out['Volume'].astype('float64')
+    return out.dropna(subset=['Close']).reset_index(drop=True)
+
+def load_bhavcopy(trade_date, offline=False):
+    """
+    Normalized EQ Bhavcopy for one date, served from the local cache when present.
+    Returns an empty frame for holidays / unpublished days.
+    """
+    path = _cache_path(trade_date)
+    if os.path.exists(path):
+        return pd.read_parquet(path)
+    if offline:
+        return pd.DataFrame(columns=['Symbol'] + PANEL_FIELDS)
+
+    day = normalize_bhavcopy(get_bhavcopy(trade_date.strftime('%d-%m-%Y')))
+    if not day.empty:
+        os.makedirs(BHAVCOPY_DIR, exist_ok=True)
+        tmp_path = path + '.tmp'
+        day.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+    return day
+
+def build_panel(sessions=60, end_date=None, offline=False, save=True):
+    """
+    Build wide (date x symbol) OHLCV matrices for the last 'sessions' NSE sessions.
+    Only real trading sessions are requested. If the latest session's file is
+    not published yet, one older session is used so the panel stays full.
+    Returns a dict of field -> DataFrame and persists it under data/panel
+    (unless save=False, e.g. for multi-year backtest panels).
+    """
+    frames = []
+    for session in reversed(trading_calendar.previous_sessions(sessions + 1, end_date)):
+        if len(frames) == sessions:
+            break
+        day = load_bhavcopy(session, offline=offline)
+        if not day.empty:
+            frames.append(day.assign(Date=session))
+
+    if not frames:
+        return {}
+
+    long_df = pd.concat(frames, ignore_index=True)
+    panel = {
+        field: long_df.pivot_table(index='Date', columns='Symbol', values=field, aggfunc='last').sort_index()
+        for field in PANEL_FIELDS
+    }
+    print(f"Panel built: {len(frames)} sessions x {panel['Close'].shape[1]} symbols.")
+    if save:
+        save_panel(panel)
+    return panel
+
+def save_panel(panel):
+    os.makedirs(PANEL_DIR, exist_ok=True)
+    for field, matrix in panel.items():
+        path = os.path.join(PANEL_DIR, f"{field.lower()}.parquet")
+        matrix.to_parquet(path + '.tmp')
+        os.replace(path + '.tmp', path)
+
+def load_panel():
+    """Load the last persisted panel (empty dict if none)."""
+    panel = {}
+    for field in PANEL_FIELDS:
+        path = os.path.join(PANEL_DIR, f"{field.lower()}.parquet")
+        if not os.path.exists(path):
+            return {}
+        panel[field] = pd.read_parquet(path)
+    return panel
+
+def top_symbols_by_turnover(panel, n=500):
+    """Top-N symbols by turnover on the latest session in the panel."""
+    if not panel:
+        return []
+    latest = panel['Turnover'].iloc[-1].dropna()
+    return latest.sort_values(ascending=False).head(n).index.tolist()
+
+def symbol_history(panel, symbol):
+    """Extract one symbol's Date/OHLC/Volume frame from the panel."""
+    if not panel or symbol not in panel['Close'].columns:
+        return pd.DataFrame(columns=['Date', 'Open', 'High', 'Low', 'Close', 'Volume'])
+    df = pd.DataFrame({field: panel[field][symbol] for field in ['Open', 'High', 'Low', 'Close', 'Volume']})
+    df = df.dropna(subset=['Close']).rename_axis('Date').reset_index()
+    return df
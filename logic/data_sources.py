@@ -0,0 +1,240 @@
+"""
+Pluggable NSE data sources behind nse_fetcher.
+- NSELiveSource: nselib against the live NSE endpoints (the default).
+- ReplaySource: serves recorded responses from a fixture directory, with
+  optional injected latency and failures, so scans and benchmarks run offline
+  and reproducibly.
+- RecordingSource: wraps another source and saves every response in the
+  replay layout.
+
+Fixture layout (raw NSE CSV exports, e.g. file.csv for history):
+    bhavcopy/<YYYYMMDD>.csv         full-market equities Bhavcopy
+    history/<SYMBOL>.csv            price/volume history (any date range; filtered per request)
+    fno_ban/<YYYYMMDD>.csv          SYMBOL column (fno_ban.csv applies to every date)
+    fno_symbols.csv                 F&O underlyings (symbol column)
+    participant_oi/<YYYYMMDD>.csv   participant-wise open interest
+    option_chain/<SYMBOL>.csv       nselib-format live chain
+
+The active source is process-wide: set_source(), or THETA_DATA_SOURCE=replay:<dir>.
+"""
+import os
+import time
+import random
+import threading
+from datetime import datetime
+import pandas as pd
+try:
+    from ingest import normalize_frame, resolve_columns
+except ImportError:
+    from logic.ingest import normalize_frame, resolve_columns
+
+class NSELiveSource:
+    """Live NSE data through nselib (imported on first use)."""
+    name = 'live'
+
+    def bhavcopy(self, date_str):
+        from nselib import capital_market
+        return capital_market.bhav_copy_equities(trade_date=date_str)
+
+    def history(self, symbol, from_date, to_date):
+        from nselib import capital_market
+        return capital_market.price_volume_and_deliverable_position_data(symbol=symbol, from_date=from_date, to_date=to_date)
+
+    def fno_ban(self, date_str):
+        from nselib import derivatives
+        return derivatives.fno_security_in_ban_period(trade_date=date_str)
+
+    def fno_symbols(self):
+        from nselib import capital_market
+        return capital_market.fno_equity_list()
+
+    def participant_oi(self, date_str):
+        from nselib import derivatives
+        return derivatives.participant_wise_open_interest(trade_date=date_str)
+
+    def option_chain(self, symbol, expiry_date=None):
+        from nselib import derivatives
+        return derivatives.nse_live_option_chain(symbol, expiry_date=expiry_date)
+
+def _day_key(date_str):
+    return datetime.strptime(date_str, '%d-%m-%Y').strftime('%Y%m%d')
+
+class ReplaySource:
+    """
+    Recorded NSE responses from a fixture directory.
+    latency (+ uniform jitter) seconds are slept per call, and failure_rate of
+    calls raise ConnectionError, like a flaky NSE. A missing fixture behaves
+    like an unpublished file: history returns an empty frame, bhavcopy and
+    participant data raise. Parsed fixtures are cached in memory.
+    """
+    name = 'replay'
+
+    def __init__(self, root, latency=0.0, jitter=0.0, failure_rate=0.0, seed=None):
+        self.root = root
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.files = {}
+        self.calls = 0
+        self.failures = 0
+
+    def _network(self):
+        """Injected latency and failures."""
+        with self.lock:
+            self.calls += 1
+            delay = self.latency + (self.rng.uniform(0, self.jitter) if self.jitter else 0.0)
+            fail = self.failure_rate and self.rng.random() < self.failure_rate
+            if fail:
+                self.failures += 1
+        if delay:
+            time.sleep(delay)
+        if fail:
+            raise ConnectionError("Injected replay failure")
+
+    def _read(self, *parts):
+        path = os.path.join(self.root, *parts)
+        with self.lock:
+            if path in self.files:
+                return self.files[path]
+        df = pd.read_csv(path, dtype=str, encoding='utf-8-sig', keep_default_na=False) if os.path.exists(path) else None
+        with self.lock:
+            self.files[path] = df
+        return df
+
+    def bhavcopy(self, date_str):
+        self._network()
+        df = self._read('bhavcopy', f"{_day_key(date_str)}.csv")
+        if df is None:
+            raise FileNotFoundError(f"No replayed Bhavcopy for {date_str}")
+        return df.copy()
+
+    def _history_dates(self, symbol, df):
+        key = ('dates', symbol)
+        with self.lock:
+            if key in self.files:
+                return self.files[key]
+        date_col = next(raw for raw, canonical in resolve_columns(tuple(df.columns)).items() if canonical == 'Date')
+        dates = normalize_frame(df[[date_col]])['Date']
+        with self.lock:
+            self.files[key] = dates
+        return dates
+
+    def history(self, symbol, from_date, to_date):
+        self._network()
+        df = self._read('history', f"{symbol.replace('/', '_')}.csv")
+        if df is None or df.empty:
+            return pd.DataFrame()
+        dates = self._history_dates(symbol, df)
+        start, end = pd.to_datetime(from_date, format='%d-%m-%Y'), pd.to_datetime(to_date, format='%d-%m-%Y')
+        return df[((dates >= start) & (dates <= end)).to_numpy()].reset_index(drop=True)
+
+    def fno_ban(self, date_str):
+        self._network()
+        df = self._read('fno_ban', f"{_day_key(date_str)}.csv")
+        if df is None:
+            df = self._read('fno_ban.csv')
+        return df['SYMBOL'].tolist() if df is not None and 'SYMBOL' in df.columns else []
+
+    def fno_symbols(self):
+        self._network()
+        df = self._read('fno_symbols.csv')
+        if df is None:
+            raise FileNotFoundError("No replayed F&O underlyings list")
+        return df.copy()
+
+    def participant_oi(self, date_str):
+        self._network()
+        df = self._read('participant_oi', f"{_day_key(date_str)}.csv")
+        if df is None:
+            raise FileNotFoundError(f"No replayed participant OI for {date_str}")
+        return df.copy()
+
+    def option_chain(self, symbol, expiry_date=None):
+        self._network()
+        df = self._read('option_chain', f"{symbol}.csv")
+        if df is None:
+            raise FileNotFoundError(f"No replayed option chain for {symbol}")
+        return df.copy()
+
+class RecordingSource:
+    """Pass-through to another source that saves each response as a replay fixture."""
+
+    def __init__(self, inner, root):
+        self.inner = inner
+        self.root = root
+        self.name = f"record:{inner.name}"
+
+    def _save(self, df, *parts):
+        if isinstance(df, list):
+            df = pd.DataFrame({'SYMBOL': df})
+        if not isinstance(df, pd.DataFrame) or df.empty:
+            return
+        path = os.path.join(self.root, *parts)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        df.to_csv(path + '.tmp', index=False)
+        os.replace(path + '.tmp', path)
+
+    def bhavcopy(self, date_str):
+        df = self.inner.bhavcopy(date_str)
+        self._save(df, 'bhavcopy', f"{_day_key(date_str)}.csv")
+        return df
+
+    def history(self, symbol, from_date, to_date):
+        df = self.inner.history(symbol, from_date, to_date)
+        if isinstance(df, pd.DataFrame) and not df.empty:
+            # Extend the recorded range instead of replacing it
+            path = os.path.join(self.root, 'history', f"{symbol.replace('/', '_')}.csv")
+            if os.path.exists(path):
+                df_all = pd.concat([pd.read_csv(path, dtype=str), df.astype(str)], ignore_index=True).drop_duplicates()
+            else:
+                df_all = df
+            self._save(df_all, 'history', f"{symbol.replace('/', '_')}.csv")
+        return df
+
+    def fno_ban(self, date_str):
+        ban = self.inner.fno_ban(date_str)
+        self._save(ban if isinstance(ban, list) else pd.DataFrame(ban), 'fno_ban', f"{_day_key(date_str)}.csv")
+        return ban
+
+    def fno_symbols(self):
+        df = self.inner.fno_symbols()
+        self._save(df, 'fno_symbols.csv')
+        return df
+
+    def participant_oi(self, date_str):
+        df = self.inner.participant_oi(date_str)
+        self._save(df, 'participant_oi', f"{_day_key(date_str)}.csv")
+        return df
+
+    def option_chain(self, symbol, expiry_date=None):
+        df = self.inner.option_chain(symbol, expiry_date)
+        self._save(df, 'option_chain', f"{symbol}.csv")
+        return df
+
+def source_from_spec(spec):
+    """'live', 'replay:<dir>' or 'record:<dir>' -> a source instance."""
+    kind, _, root = (spec or 'live').partition(':')
+    if kind == 'live':
+        return NSELiveSource()
+    if kind == 'replay' and root:
+        return ReplaySource(root)
+    if kind == 'record' and root:
+        return RecordingSource(NSELiveSource(), root)
+    raise ValueError(f"Unknown data source: {spec!r} (expected live, replay:<dir> or record:<dir>)")
+
+_source = None
+
+def get_source():
+    global _source
+    if _source is None:
+        _source = source_from_spec(os.environ.get('THETA_DATA_SOURCE'))
+    return _source
+
+def set_source(source):
+    """Install a source (instance or spec string); returns the previous one."""
+    global _source
+    previous = _source
+    _source = source_from_spec(source) if isinstance(source, str) else source
+    return previous
@@ -0,0 +1,332 @@
+"""
+Notification delivery engine.
+A message fans out to every configured Discord webhook and Telegram chat at
+once. Sends run concurrently over pooled keep-alive HTTP connections, one set
+per host, reused across messages. Each destination has a token bucket sized
+to the platform's limits, and 429 replies are honoured with their
+retry_after. Messages that still fail go to a SQLite retry queue
+(data/notify_queue.db) and are re-sent with exponential backoff by later runs.
+"""
+import os
+import re
+import json
+import time
+import random
+import asyncio
+import hashlib
+import sqlite3
+import threading
+import http.client
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+try:
+    from fetch_scheduler import TokenBucket
+except ImportError:
+    from logic.fetch_scheduler import TokenBucket
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+QUEUE_DB = os.path.join(DATA_DIR, 'notify_queue.db')
+TELEGRAM_API = 'https://api.telegram.org'
+USER_AGENT = 'ThetaHunterBot/1.0'
+REQUEST_TIMEOUT = 10
+MAX_ATTEMPTS = 3               # in-run attempts per delivery
+MAX_RETRY_AFTER = 30           # longest 429 wait honoured in-run (seconds); longer goes to the queue
+QUEUE_MAX_ATTEMPTS = 8
+QUEUE_BACKOFF = 60             # seconds before the first queued retry, doubled per attempt
+QUEUE_MAX_BACKOFF = 6 * 3600
+QUEUE_MAX_AGE = 24 * 3600      # a day-old scan alert is no longer worth sending
+QUEUE_DEAD_TTL = 7 * 24 * 3600 # dead rows are kept this long for inspection, then purged
+
+# (requests/second, burst) per destination and per platform account
+PLATFORM_LIMITS = {
+    'discord': {'destination': (2.5, 5), 'platform': (50.0, 50)},    # 5 per 2s per webhook, 50/s global
+    'telegram': {'destination': (1.0, 1), 'platform': (30.0, 30)},   # 1/s per chat, 30/s per bot
+}
+
+def _short_hash(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:12]
+
+class DiscordChannel:
+    """One Discord webhook."""
+    platform = 'discord'
+
+    def __init__(self, webhook_url):
+        self.url = webhook_url
+        self.id = f"discord:{_short_hash(webhook_url)}"
+        self.platform_key = 'discord'
+
+    def request(self, message):
+        body = json.dumps({"content": message}).encode('utf-8')
+        return 'POST', self.url, body, {'Content-Type': 'application/json', 'User-Agent': USER_AGENT}
+
+class TelegramChannel:
+    """One Telegram chat of one bot."""
+    platform = 'telegram'
+
+    def __init__(self, bot_token, chat_id, api_base=TELEGRAM_API):
+        self.url = f"{api_base.rstrip('/')}/bot{bot_token}/sendMessage"
+        self.chat_id = chat_id
+        self.id = f"telegram:{_short_hash(f'{bot_token}|{chat_id}')}"
+        self.platform_key = f"telegram:{_short_hash(bot_token)}"
+
+    def request(self, message):
+        body = urllib.parse.urlencode({
+            'chat_id': self.chat_id,
+            'text': message.replace("**", "*"),   # Telegram Markdown uses single asterisks
+            'parse_mode': 'Markdown',
+        }).encode('utf-8')
+        return 'POST', self.url, body, {'Content-Type': 'application/x-www-form-urlencoded', 'User-Agent': USER_AGENT}
+
+def channels_from_env(env=None):
+    """
+    Destinations from DISCORD_WEBHOOK (one or more webhook URLs) and
+    TELEGRAM_BOT_TOKEN + TELEGRAM_CHAT_ID (one or more chat ids). Lists may be
+    comma-, space- or newline-separated. TELEGRAM_API_BASE points Telegram at
+    another server (e.g. a local stub).
+    """
+    env = os.environ if env is None else env
+    split = lambda value: [v for v in re.split(r'[\s,]+', value or '') if v]
+    channels = [DiscordChannel(url) for url in split(env.get('DISCORD_WEBHOOK'))]
+    token = env.get('TELEGRAM_BOT_TOKEN')
+    if token:
+        api_base = env.get('TELEGRAM_API_BASE') or TELEGRAM_API
+        channels += [TelegramChannel(token, chat, api_base) for chat in split(env.get('TELEGRAM_CHAT_ID'))]
+    return channels
+
+def retry_after(headers, body):
+    """Seconds to wait from a 429 reply (Discord / Telegram JSON, else Retry-After header)."""
+    try:
+        payload = json.loads(body)
+        wait = payload.get('retry_after') or (payload.get('parameters') or {}).get('retry_after')
+        if wait is not None:
+            return float(wait)
+    except (ValueError, AttributeError):
+        pass
+    try:
+        return float(headers.get('retry-after', 1))
+    except ValueError:
+        return 1.0
+
+class ConnectionPool:
+    """Idle keep-alive connections per (scheme, host, port), shared by worker threads."""
+
+    def __init__(self, timeout=REQUEST_TIMEOUT, max_idle=8):
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.idle = {}
+        self.lock = threading.Lock()
+        self.opened = 0
+
+    def _acquire(self, origin):
+        with self.lock:
+            if self.idle.get(origin):
+                return self.idle[origin].pop(), True
+            self.opened += 1
+        scheme, host, port = origin
+        cls = http.client.HTTPSConnection if scheme == 'https' else http.client.HTTPConnection
+        return cls(host, port, timeout=self.timeout), False
+
+    def _release(self, origin, conn):
+        with self.lock:
+            idle = self.idle.setdefault(origin, [])
+            if len(idle) < self.max_idle:
+                idle.append(conn)
+                return
+        conn.close()
+
+    def request(self, method, url, body=None, headers=None):
+        """Send one request; returns (status, lower-cased headers, body bytes)."""
+        parts = urllib.parse.urlsplit(url)
+        origin = (parts.scheme, parts.hostname, parts.port)
+        path = (parts.path or '/') + (f"?{parts.query}" if parts.query else '')
+        for attempt in range(2):
+            conn, reused = self._acquire(origin)
+            try:
+                conn.request(method, path, body=body, headers=headers or {})
+                response = conn.getresponse()
+                data = response.read()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                conn.close()
+                # The server dropped an idle pooled connection: resend once on a fresh one
+                if reused and attempt == 0:
+                    continue
+                raise
+            except Exception:
+                conn.close()
+                raise
+            if response.will_close:
+                conn.close()
+            else:
+                self._release(origin, conn)
+            return response.status, {k.lower(): v for k, v in response.getheaders()}, data
+
+    def close(self):
+        with self.lock:
+            for conns in self.idle.values():
+                for conn in conns:
+                    conn.close()
+            self.idle = {}
+
+_QUEUE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS queue (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    channel TEXT NOT NULL,
+    message TEXT NOT NULL,
+    created REAL NOT NULL,
+    attempts INTEGER NOT NULL,
+    next_attempt REAL NOT NULL,
+    last_error TEXT,
+    status TEXT NOT NULL
+);
+"""
+
+class RetryQueue:
+    """
+    Durable queue of undelivered messages.
+    Rows are keyed by channel id (a hash of the destination), so no webhook
+    URL or bot token is written to disk; due() resolves them against the
+    channels configured for the current run. Rows that exhaust their attempts,
+    fail permanently (4xx other than 429) or outlive QUEUE_MAX_AGE are kept
+    as 'dead' for inspection, and purged by due() once older than QUEUE_DEAD_TTL.
+    """
+
+    def __init__(self, db_path=None, max_attempts=QUEUE_MAX_ATTEMPTS, backoff=QUEUE_BACKOFF,
+                 max_backoff=QUEUE_MAX_BACKOFF, max_age=QUEUE_MAX_AGE, dead_ttl=QUEUE_DEAD_TTL):
+        self.db_path = db_path or QUEUE_DB
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_age = max_age
+        self.dead_ttl = dead_ttl
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self.conn = sqlite3.connect(self.db_path, timeout=10, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(_QUEUE_SCHEMA)
+        self.lock = threading.Lock()
+
+    def _next_attempt(self, attempts, now):
+        delay = min(self.max_backoff, self.backoff * 2 ** (attempts - 1))
+        return now + delay * random.uniform(0.8, 1.2)
+
+    def push(self, channel, message, error=None, permanent=False, now=None):
+        now = time.time() if now is None else now
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT INTO queue (channel, message, created, attempts, next_attempt, last_error, status) "
+                "VALUES (?, ?, ?, 1, ?, ?, ?)",
+                (channel.id, message, now, self._next_attempt(1, now), error, 'dead' if permanent else 'pending'))
+
+    def due(self, channels, now=None):
+        """(channel, message, queue_id) jobs ready for another attempt."""
+        now = time.time() if now is None else now
+        by_id = {c.id: c for c in channels}
+        with self.lock, self.conn:
+            self.conn.execute("UPDATE queue SET status = 'dead' WHERE status = 'pending' AND created < ?",
+                              (now - self.max_age,))
+            self.conn.execute("DELETE FROM queue WHERE status = 'dead' AND created < ?", (now - self.dead_ttl,))
+            rows = self.conn.execute(
+                "SELECT id, channel, message FROM queue WHERE status = 'pending' AND next_attempt <= ? ORDER BY id",
+                (now,)).fetchall()
+        return [(by_id[channel], message, row_id) for row_id, channel, message in rows if channel in by_id]
+
+    def done(self, queue_id):
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM queue WHERE id = ?", (queue_id,))
+
+    def failed(self, queue_id, error=None, permanent=False, now=None):
+        now = time.time() if now is None else now
+        with self.lock, self.conn:
+            row = self.conn.execute("SELECT attempts FROM queue WHERE id = ?", (queue_id,)).fetchone()
+            if row is None:
+                return
+            attempts = row[0] + 1
+            dead = permanent or attempts >= self.max_attempts
+            self.conn.execute("UPDATE queue SET attempts = ?, next_attempt = ?, last_error = ?, status = ? WHERE id = ?",
+                              (attempts, self._next_attempt(attempts, now), error, 'dead' if dead else 'pending', queue_id))
+
+    def pending(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM queue WHERE status = 'pending'").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+
+class DeliveryEngine:
+    """
+    Usage:
+        engine = DeliveryEngine(queue=RetryQueue())
+        report = engine.deliver([(channel, message, None), ...] + queue.due(channels))
+        engine.close()
+    Returns one (channel, ok, reason) per job. Transport errors and 5xx are
+    retried in-run with backoff, 429s after their retry_after; whatever is
+    still undelivered is queued (or its queue row rescheduled).
+    """
+
+    def __init__(self, queue=None, max_workers=8, max_attempts=MAX_ATTEMPTS, limits=None):
+        self.queue = queue
+        self.max_workers = max_workers
+        self.max_attempts = max_attempts
+        self.limits = dict(PLATFORM_LIMITS, **(limits or {}))
+        self.pool = ConnectionPool()
+        self.stats = {'sent': 0, 'failed': 0, 'retries': 0, 'rate_limited': 0}
+
+    def deliver(self, jobs):
+        if not jobs:
+            return []
+        return asyncio.run(self._deliver(jobs))
+
+    async def _deliver(self, jobs):
+        loop = asyncio.get_running_loop()
+        loop.set_default_executor(ThreadPoolExecutor(max_workers=self.max_workers))
+        buckets = {}
+
+        def bucket(key, rate, burst):
+            if key not in buckets:
+                buckets[key] = TokenBucket(rate, burst)
+            return buckets[key]
+
+        async def send(channel, message, queue_id):
+            limits = self.limits[channel.platform]
+            status = error = None
+            for attempt in range(1, self.max_attempts + 1):
+                await bucket(channel.platform_key, *limits['platform']).acquire()
+                await bucket(channel.id, *limits['destination']).acquire()
+                headers, body = {}, b''
+                try:
+                    status, headers, body = await asyncio.to_thread(self.pool.request, *channel.request(message))
+                except Exception as e:
+                    status, error = None, f"{type(e).__name__}: {e}"
+                if status is not None and 200 <= status < 300:
+                    self.stats['sent'] += 1
+                    if queue_id is not None and self.queue is not None:
+                        self.queue.done(queue_id)
+                    return channel, True, None
+                if status is not None:
+                    error = f"HTTP {status}: {body[:200].decode('utf-8', errors='ignore')}"
+                    if status != 429 and 400 <= status < 500:
+                        break  # bad payload or revoked destination: retrying will not help
+                if attempt == self.max_attempts:
+                    break
+                if status == 429:
+                    self.stats['rate_limited'] += 1
+                    wait = retry_after(headers, body)
+                    if wait > MAX_RETRY_AFTER:
+                        break
+                else:
+                    wait = 0.5 * 2 ** (attempt - 1) + random.uniform(0, 0.5)
+                self.stats['retries'] += 1
+                await asyncio.sleep(wait)
+
+            self.stats['failed'] += 1
+            permanent = status is not None and status != 429 and 400 <= status < 500
+            if self.queue is not None:
+                if queue_id is None:
+                    self.queue.push(channel, message, error, permanent)
+                else:
+                    self.queue.failed(queue_id, error, permanent)
+            return channel, False, error
+
+        return await asyncio.gather(*(send(*job) for job in jobs))
+
+    def close(self):
+        self.pool.close()
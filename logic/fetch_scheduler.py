@@ -0,0 +1,178 @@
+"""
+Adaptive fetch scheduler for NSE requests.
+nselib is synchronous, so each call runs in a worker thread driven by an
+asyncio loop that enforces:
+- AIMD concurrency: +1/limit per fast success, halved on errors or slow replies.
+  Latency is timed inside the worker thread around fetch_fn alone, so time
+  the loop spends elsewhere (e.g. scoring in on_result) never counts as slow.
+- A token bucket per NSE endpoint (requests/second).
+- A global retry budget; symbols that still fail are retried in a slower
+  second pass and reported instead of being silently dropped.
+"""
+import asyncio
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Sustained requests/second allowed per NSE endpoint (burst = 2x rate)
+ENDPOINT_RATES = {
+    'history': 4.0,    # www.nseindia.com/api historical reports
+    'archives': 2.0,   # nsearchives.nseindia.com Bhavcopy files
+    'derivatives': 1.0,
+}
+
+class TokenBucket:
+    """Classic token bucket: 'rate' tokens/second, at most 'capacity' banked."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate * 2)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+class AIMDLimiter:
+    """
+    Additive-increase / multiplicative-decrease concurrency limit.
+    Fast successes grow the limit by ~1 per 'limit' completions; an error or a
+    reply slower than 'latency_target' halves it (at most once per cooldown).
+    """
+
+    def __init__(self, initial=3, minimum=1, maximum=16, latency_target=3.0):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.latency_target = latency_target
+        self.in_flight = 0
+        self.last_decrease = 0.0
+        self.condition = asyncio.Condition()
+
+    async def acquire(self):
+        async with self.condition:
+            await self.condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+
+    async def release(self, ok, latency):
+        async with self.condition:
+            self.in_flight -= 1
+            if ok and latency <= self.latency_target:
+                self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+            else:
+                now = time.monotonic()
+                if now - self.last_decrease >= self.latency_target:
+                    self.limit = max(self.minimum, self.limit / 2)
+                    self.last_decrease = now
+            self.condition.notify_all()
+
+class RetryBudget:
+    """Global cap on retries: 'minimum' plus 'ratio' of all first attempts."""
+
+    def __init__(self, ratio=0.2, minimum=10):
+        self.ratio = ratio
+        self.minimum = minimum
+        self.requests = 0
+        self.retries = 0
+
+    def record_request(self):
+        self.requests += 1
+
+    def try_spend(self):
+        if self.retries < self.minimum + self.ratio * self.requests:
+            self.retries += 1
+            return True
+        return False
+
+class FetchScheduler:
+    """
+    Run blocking fetch functions with adaptive concurrency.
+
+    Usage:
+        scheduler = FetchScheduler()
+        results, failed = scheduler.run(symbols, fetch_fn, endpoint='history',
+                                        on_result=callback)
+    fetch_fn(key) must raise on transport errors; its return value is passed
+    to on_result(key, value) as soon as it completes. Every call is rate
+    limited, so fetch_fn should be only the network request: do local work
+    (cache hits, parsing, scoring) outside it.
+    """
+
+    def __init__(self, initial_concurrency=3, max_concurrency=16, max_attempts=3,
+                 latency_target=3.0, retry_ratio=0.2, retry_minimum=10, rates=None):
+        self.initial_concurrency = initial_concurrency
+        self.max_concurrency = max_concurrency
+        self.max_attempts = max_attempts
+        self.latency_target = latency_target
+        self.rates = dict(ENDPOINT_RATES, **(rates or {}))
+        self.budget = RetryBudget(ratio=retry_ratio, minimum=retry_minimum)
+        self.stats = {'requests': 0, 'errors': 0, 'retries': 0, 'peak_concurrency': 0, 'wait_s': 0.0}
+        self.attempts = {}  # key -> attempts across both passes
+
+    def run(self, keys, fetch_fn, endpoint='history', on_result=None, second_pass=True):
+        """Fetch every key; returns (results dict, failed dict of key -> reason)."""
+        results, failed = asyncio.run(self._run_pass(keys, fetch_fn, endpoint, on_result, self.initial_concurrency))
+        if failed and second_pass:
+            print(f"Second pass for {len(failed)} failed keys at minimum concurrency...")
+            retry_results, failed = asyncio.run(self._run_pass(list(failed), fetch_fn, endpoint, on_result, 1))
+            results.update(retry_results)
+        return results, failed
+
+    async def _run_pass(self, keys, fetch_fn, endpoint, on_result, concurrency):
+        loop = asyncio.get_running_loop()
+        loop.set_default_executor(ThreadPoolExecutor(max_workers=self.max_concurrency))
+        limiter = AIMDLimiter(initial=concurrency, maximum=self.max_concurrency, latency_target=self.latency_target)
+        bucket = TokenBucket(self.rates.get(endpoint, 1.0))
+        results, failed = {}, {}
+
+        def timed(key):
+            # Runs in the worker thread: the latency AIMD sees is the request's own
+            start = time.monotonic()
+            try:
+                return fetch_fn(key), None, time.monotonic() - start
+            except Exception as e:
+                return None, e, time.monotonic() - start
+
+        async def worker(key):
+            attempt = 0
+            while True:
+                attempt += 1
+                queued = time.monotonic()
+                await limiter.acquire()
+                self.stats['peak_concurrency'] = max(self.stats['peak_concurrency'], limiter.in_flight)
+                await bucket.acquire()
+                # Time spent waiting on the concurrency limit and rate limit
+                self.stats['wait_s'] += time.monotonic() - queued
+                if attempt == 1:
+                    self.budget.record_request()
+                self.stats['requests'] += 1
+                self.attempts[key] = self.attempts.get(key, 0) + 1
+                value, error, latency = await asyncio.to_thread(timed, key)
+                if error is not None:
+                    await limiter.release(False, latency)
+                    self.stats['errors'] += 1
+                    if attempt < self.max_attempts and self.budget.try_spend():
+                        self.stats['retries'] += 1
+                        await asyncio.sleep(0.5 * 2 ** (attempt - 1) + random.uniform(0, 0.5))
+                        continue
+                    failed[key] = f"{type(error).__name__}: {error}"
+                    return
+                await limiter.release(True, latency)
+                results[key] = value
+                if on_result:
+                    on_result(key, value)
+                return
+
+        await asyncio.gather(*(worker(k) for k in keys))
+        print(f"Fetch pass done: {len(results)} ok, {len(failed)} failed, "
+              f"final concurrency {int(limiter.limit)}, retries used {self.budget.retries}.")
+        return results, failed
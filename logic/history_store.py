@@ -0,0 +1,83 @@
+"""
+Local OHLC history store.
+Keeps one Parquet file per symbol under data/history so that daily scans only
+download the bars after the last stored date instead of the full window.
+Each file records the earliest date a download was requested from
+(attrs['covered_from'], kept in the Parquet metadata), so a symbol listed
+after that date is not backfilled again on every run.
+"""
+import os
+import pandas as pd
+try:
+    from ingest import normalize_frame, select_series
+except ImportError:
+    from logic.ingest import normalize_frame, select_series
+
+HISTORY_DIR = os.path.join(os.path.dirname(__file__), '..', 'data', 'history')
+OHLC_COLUMNS = ['Date', 'Open', 'High', 'Low', 'Close', 'Volume']
+
+def _path(symbol):
+    return os.path.join(HISTORY_DIR, f"{symbol.replace('/', '_')}.parquet")
+
+def normalize_history(df):
+    """Convert a raw NSE history frame into the stored Date/OHLC/Volume schema."""
+    df = select_series(normalize_frame(df))
+    if df.empty or not {'Date', 'High', 'Low', 'Close'}.issubset(df.columns):
+        return pd.DataFrame(columns=OHLC_COLUMNS)
+
+    if 'Open' not in df.columns:
+        df['Open'] = df['Close']
+    df['Volume'] = df['Volume'].astype('float64') if 'Volume' in df.columns else 0.0
+    out = df[OHLC_COLUMNS].dropna(subset=['Date', 'Close'])
+    return out.sort_values('Date').drop_duplicates(subset='Date', keep='last').reset_index(drop=True)
+
+def load_history(symbol):
+    """Load the stored history for a symbol (empty frame if none)."""
+    path = _path(symbol)
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=OHLC_COLUMNS)
+    try:
+        return pd.read_parquet(path)
+    except Exception as e:
+        print(f"Warning: Corrupt history for {symbol} ({e}). Rebuilding.")
+        return pd.DataFrame(columns=OHLC_COLUMNS)
+
+def last_stored_date(symbol):
+    """Date of the newest stored bar, or None for an empty store."""
+    df = load_history(symbol)
+    if df.empty:
+        return None
+    return df['Date'].max()
+
+def covered_from(history):
+    """Earliest date the stored bars were requested from (the first bar for older files; None if empty)."""
+    if 'covered_from' in history.attrs:
+        return pd.Timestamp(history.attrs['covered_from'])
+    return pd.Timestamp(history['Date'].min()) if not history.empty else None
+
+def merge_history(symbol, new_bars, requested_from=None):
+    """
+    Merge freshly fetched (normalized) bars into the stored history and persist it.
+    'requested_from' is the start date of the download that returned them.
+    """
+    stored = load_history(symbol)
+    if new_bars.empty:
+        return stored
+
+    starts = [d for d in (covered_from(stored), requested_from, new_bars['Date'].min()) if d is not None]
+    frames = [f for f in (stored, new_bars[OHLC_COLUMNS]) if not f.empty]
+    merged = pd.concat(frames, ignore_index=True)
+    merged = merged.sort_values('Date').drop_duplicates(subset='Date', keep='last').reset_index(drop=True)
+    merged.attrs['covered_from'] = min(pd.Timestamp(d) for d in starts).strftime('%Y-%m-%d')
+
+    os.makedirs(HISTORY_DIR, exist_ok=True)
+    tmp_path = _path(symbol) + '.tmp'
+    merged.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, _path(symbol))
+    return merged
+
+def stored_symbols():
+    """List every symbol with a stored history file."""
+    if not os.path.isdir(HISTORY_DIR):
+        return []
+    return sorted(f[:-len('.parquet')] for f in os.listdir(HISTORY_DIR) if f.endswith('.parquet'))
@@ -0,0 +1,213 @@
+"""
+Vectorized cross-sectional indicator engine.
+Computes ADX, RSI and Historical Volatility for every symbol at once on
+(days x symbols) NumPy arrays. Wilder smoothing runs as an array recurrence
+over the time axis, so the cost is O(days) vector operations regardless of
+universe size. Seeding follows pandas_ta (TA-Lib convention) so results match
+ta.adx / ta.rsi / the pandas rolling HV to floating-point tolerance.
+"""
+import sys
+import numpy as np
+
+EPSILON = sys.float_info.epsilon
+PERIODS_PER_YEAR = 252   # daily bars; weekly panels pass 52, intraday sessions x bars per session
+
+def right_align(*arrays, valid=None):
+    """
+    Move each column's valid rows to the bottom of the array, keeping their order.
+    Symbols with short or gappy history then line up on the latest bar, exactly
+    as if each history had been compacted with dropna().
+    Returns (aligned_arrays, bars_per_symbol).
+    """
+    if valid is None:
+        valid = np.isfinite(arrays[-1])
+    T = valid.shape[0]
+    order = np.argsort(valid, axis=0, kind='stable')
+    bars = valid.sum(axis=0)
+    empty_rows = np.arange(T)[:, None] < (T - bars)[None, :]
+
+    aligned = []
+    for arr in arrays:
+        out = np.take_along_axis(np.asarray(arr, dtype=float), order, axis=0)
+        out[empty_rows] = np.nan
+        aligned.append(out)
+    return aligned, bars
+
+def _shift(arr, n=1):
+    out = np.full_like(arr, np.nan)
+    out[n:] = arr[:-n]
+    return out
+
+def _first_finite(arr):
+    finite = np.isfinite(arr)
+    return np.where(finite.any(axis=0), finite.argmax(axis=0), arr.shape[0])
+
+def wilder_smooth(raw, length):
+    """
+    Wilder's cumulative smoothing (TA-Lib seeding): the seed is the sum of the
+    first length-1 values (row 0 is always skipped), then
+    value[t] = value[t-1] * (1 - 1/length) + raw[t]. NaN input carries forward.
+    """
+    T, N = raw.shape
+    out = np.full((T, N), np.nan)
+    start = np.maximum(_first_finite(raw), 1)
+    seed_row = start + length - 2
+    ok = start + length - 1 <= T
+
+    csum = np.vstack([np.zeros((1, N)), np.nancumsum(raw, axis=0)])
+    cols = np.arange(N)
+    seed = csum[np.minimum(start + length - 1, T), cols] - csum[np.minimum(start, T), cols]
+
+    value = np.full(N, np.nan)
+    first = int(seed_row[ok].min()) if ok.any() else T
+    for t in range(first, T):
+        value = np.where(ok & (t == seed_row), seed, value)
+        step = ok & (t > seed_row) & np.isfinite(raw[t])
+        value = np.where(step, value - value / length + raw[t], value)
+        out[t] = np.where(ok & (t >= seed_row), value, np.nan)
+    return out
+
+def rma(raw, length):
+    """
+    Wilder's moving average (SMA-seeded EMA, alpha = 1/length) as in pandas_ta.rma:
+    the first 'length' values after each column's leading NaN run seed the average.
+    """
+    T, N = raw.shape
+    alpha = 1.0 / length
+    out = np.full((T, N), np.nan)
+    start = _first_finite(raw)
+    seed_row = start + length - 1
+    ok = seed_row < T
+
+    finite = np.isfinite(raw)
+    zero = np.zeros((1, N))
+    csum = np.vstack([zero, np.cumsum(np.where(finite, raw, 0.0), axis=0)])
+    ccount = np.vstack([zero, np.cumsum(finite, axis=0)])
+    cols = np.arange(N)
+    lo, hi = np.minimum(start, T), np.minimum(start + length, T)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        seed = (csum[hi, cols] - csum[lo, cols]) / (ccount[hi, cols] - ccount[lo, cols])
+
+    value = np.full(N, np.nan)
+    first = int(seed_row[ok].min()) if ok.any() else T
+    for t in range(first, T):
+        value = np.where(ok & (t == seed_row), seed, value)
+        step = ok & (t > seed_row) & np.isfinite(raw[t])
+        value = np.where(step, (1 - alpha) * value + alpha * raw[t], value)
+        out[t] = np.where(ok & (t >= seed_row), value, np.nan)
+    return out
+
+def directional_movement(high, low, close):
+    """+DM, -DM and True Range arrays (TA-Lib conventions, as used by adx)."""
+    high, low, close = (np.asarray(a, dtype=float) for a in (high, low, close))
+    prev_high, prev_low, prev_close = _shift(high), _shift(low), _shift(close)
+
+    up = high - prev_high
+    dn = prev_low - low
+    with np.errstate(invalid='ignore'):
+        pos = np.where((up > dn) & (up > 0), up, 0.0)
+        neg = np.where((dn > up) & (dn > 0), dn, 0.0)
+    pos[np.isnan(up)] = np.nan
+    neg[np.isnan(dn)] = np.nan
+    pos[np.abs(pos) < EPSILON] = 0.0
+    neg[np.abs(neg) < EPSILON] = 0.0
+
+    hl = high - low
+    hl = np.where(hl != 0, hl, EPSILON)
+    tr = np.maximum(np.abs(hl), np.maximum(np.abs(high - prev_close), np.abs(prev_close - low)))
+    return pos, neg, tr
+
+def _adx_parts(high, low, close, length):
+    pos, neg, tr = directional_movement(high, low, close)
+    tr_s = wilder_smooth(tr, length)
+    pos_s = wilder_smooth(pos, length)
+    neg_s = wilder_smooth(neg, length)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        dmp = 100 * pos_s / tr_s
+        dmn = 100 * neg_s / tr_s
+        # The seed bar itself is not reported (TA-Lib DI lookback is 'length')
+        seed_row = _first_finite(tr_s)
+        has_seed = seed_row < tr_s.shape[0]
+        dmp[seed_row[has_seed], np.flatnonzero(has_seed)] = np.nan
+        dmn[seed_row[has_seed], np.flatnonzero(has_seed)] = np.nan
+        dx = 100 * np.abs(dmp - dmn) / (dmp + dmn)
+    return tr_s, pos_s, neg_s, rma(dx, length)
+
+def adx(high, low, close, length=14):
+    """ADX matrix, matching ta.adx(...)['ADX_14'] column by column."""
+    return _adx_parts(high, low, close, length)[-1]
+
+def _rsi_parts(close, length):
+    close = np.asarray(close, dtype=float)
+    change = close - _shift(close)
+    with np.errstate(invalid='ignore'):
+        gains = np.where(change < 0, 0.0, change)
+        losses = np.where(change > 0, 0.0, change)
+    return rma(gains, length), rma(losses, length)
+
+def rsi(close, length=14):
+    """RSI matrix, matching ta.rsi(close, length) column by column."""
+    avg_gain, avg_loss = _rsi_parts(close, length)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return 100 * avg_gain / (avg_gain + np.abs(avg_loss))
+
+def hv(close, window=20, periods_per_year=PERIODS_PER_YEAR):
+    """Annualized rolling Historical Volatility (%), matching bench_indicators.reference_hv on daily bars."""
+    close = np.asarray(close, dtype=float)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        log_returns = np.log(close / _shift(close))
+
+    valid = np.isfinite(log_returns)
+    r = np.where(valid, log_returns, 0.0)
+    zero = np.zeros((1, r.shape[1]))
+    n = np.vstack([zero, np.cumsum(valid, axis=0)])
+    s1 = np.vstack([zero, np.cumsum(r, axis=0)])
+    s2 = np.vstack([zero, np.cumsum(r * r, axis=0)])
+
+    out = np.full(close.shape, np.nan)
+    if close.shape[0] < window:
+        return out
+    count = n[window:] - n[:-window]
+    sum1 = s1[window:] - s1[:-window]
+    sum2 = s2[window:] - s2[:-window]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        var = (sum2 - sum1 * sum1 / window) / (window - 1)
+    var = np.where(count == window, np.maximum(var, 0.0), np.nan)
+    out[window - 1:] = np.sqrt(var) * np.sqrt(periods_per_year) * 100
+    return out
+
+def latest_indicators(high, low, close, length=14, hv_window=20, periods_per_year=PERIODS_PER_YEAR):
+    """
+    ADX / RSI / HV on the latest bar for every column of (bars x symbols) arrays;
+    periods_per_year annualizes HV for the bar size.
+    Histories are right-aligned first so short or gappy symbols are handled
+    the same way as a per-symbol dropna() history.
+    Returns a dict of 1-D arrays: ADX, RSI, HV, Close and Bars.
+    """
+    (high, low, close), bars = right_align(high, low, close)
+    return {
+        'ADX': adx(high, low, close, length)[-1],
+        'RSI': rsi(close, length)[-1],
+        'HV': hv(close, hv_window, periods_per_year)[-1],
+        'Close': close[-1],
+        'Bars': bars,
+    }
+
+def indicator_state(high, low, close, length=14, hv_window=20):
+    """
+    Final smoothing state on the latest bar of right-aligned (days x symbols)
+    arrays: Wilder TR / +DM / -DM sums, the ADX average, RSI average gain /
+    loss and the last hv_window log returns. Continuing these recurrences one
+    bar at a time reproduces adx / rsi / hv exactly (see logic.intraday).
+    """
+    high, low, close = (np.asarray(a, dtype=float) for a in (high, low, close))
+    tr_s, pos_s, neg_s, adx_m = _adx_parts(high, low, close, length)
+    avg_gain, avg_loss = _rsi_parts(close, length)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        returns = np.log(close / _shift(close))
+    return {
+        'tr_s': tr_s[-1], 'pos_s': pos_s[-1], 'neg_s': neg_s[-1], 'adx': adx_m[-1],
+        'avg_gain': avg_gain[-1], 'avg_loss': avg_loss[-1],
+        'returns': returns[-hv_window:],
+        'high': high[-1], 'low': low[-1], 'close': close[-1],
+    }
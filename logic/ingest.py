@@ -0,0 +1,124 @@
+"""
+Tolerant ingest for NSE CSV exports and nselib frames.
+- Headers: strips BOMs (real and mojibake 'ï»¿'), quotes and padding, then maps
+  old/new NSE names (ClosePrice / ClsPric / CLOSE ...) onto one canonical
+  schema through a cached alias lookup.
+- Numbers: Indian digit grouping ("6,30,334", "65,87,29,427.20") is parsed in
+  one vectorized pass (C parser 'thousands' for files, str.replace for frames)
+  instead of silently becoming NaN.
+- Output: typed frame (prices float64 by default, quantities Int64, Date
+  datetime64) with canonical column names.
+"""
+import functools
+import re
+import pandas as pd
+
+# Canonical column -> every known NSE spelling (compared after header cleanup)
+COLUMN_ALIASES = {
+    'Symbol': ['Symbol', 'TckrSymb', 'SYMBOL'],
+    'Series': ['Series', 'SctySrs', 'SERIES'],
+    'Date': ['Date', 'TradDt', 'TIMESTAMP', 'Timestamp'],
+    'PrevClose': ['PrevClose', 'PrvsClsgPric', 'PREVCLOSE'],
+    'Open': ['Open', 'OpenPrice', 'OpnPric', 'OPEN'],
+    'High': ['High', 'HighPrice', 'HghPric', 'HIGH'],
+    'Low': ['Low', 'LowPrice', 'LwPric', 'LOW'],
+    'Last': ['Last', 'LastPrice', 'LastPric', 'LAST'],
+    'Close': ['Close', 'ClosePrice', 'ClsPric', 'ClsgPric', 'CLOSE'],
+    'AvgPrice': ['AvgPrice', 'AveragePrice'],
+    'Volume': ['Volume', 'TotalTradedQuantity', 'TtlTradgVol', 'TOTTRDQTY'],
+    'Turnover': ['Turnover', 'TurnoverInRs', 'TtlTrfVal', 'TOTTRDVAL', 'TURNOVER'],
+    'Trades': ['Trades', 'No.ofTrades', 'TtlNbOfTxsExctd', 'TOTALTRADES'],
+    'DeliverableQty': ['DeliverableQty'],
+    'DeliveryPct': ['DeliveryPct', '%DlyQttoTradedQty'],
+}
+
+PRICE_COLUMNS = ['PrevClose', 'Open', 'High', 'Low', 'Last', 'Close', 'AvgPrice']
+QUANTITY_COLUMNS = ['Volume', 'Trades', 'DeliverableQty']
+VALUE_COLUMNS = ['Turnover', 'DeliveryPct']
+TEXT_COLUMNS = ['Symbol', 'Series']
+NA_VALUES = ['-', '', ' ', 'NA', 'nan']
+
+_ALIAS_LOOKUP = {alias.lower(): canonical for canonical, aliases in COLUMN_ALIASES.items() for alias in aliases}
+_DATE_FORMATS = ['%d-%b-%Y', '%Y-%m-%d', '%d-%m-%Y', '%d-%b-%y', '%d/%m/%Y']
+
+def clean_header(name):
+    """Strip BOM remnants, quotes and all whitespace from a header."""
+    name = str(name).replace('\ufeff', '').replace('ï»¿', '').replace('"', '')
+    return re.sub(r'\s+', '', name)
+
+@functools.lru_cache(maxsize=256)
+def resolve_columns(columns):
+    """
+    Map a tuple of raw headers to canonical names (cached per header layout).
+    Unknown headers keep their cleaned name.
+    """
+    mapping = {}
+    taken = set()
+    for raw in columns:
+        cleaned = clean_header(raw)
+        canonical = _ALIAS_LOOKUP.get(cleaned.lower(), cleaned)
+        if canonical in taken:
+            canonical = cleaned
+        taken.add(canonical)
+        mapping[raw] = canonical
+    return mapping
+
+def _parse_dates(series):
+    """Detect the date format from the first value, then parse the column in one pass."""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series
+    text = series.astype(str).str.strip()
+    sample = text.dropna()
+    sample = sample.iloc[0] if not sample.empty else ''
+    for fmt in _DATE_FORMATS:
+        try:
+            pd.to_datetime(sample, format=fmt)
+        except (ValueError, TypeError):
+            continue
+        return pd.to_datetime(text, format=fmt, errors='coerce')
+    return pd.to_datetime(text, format='mixed', dayfirst=True, errors='coerce')
+
+def _to_number(series):
+    """Grouped-number text -> float in a single vectorized pass."""
+    if pd.api.types.is_numeric_dtype(series):
+        return series.astype('float64')
+    text = series.astype(str).str.replace(',', '', regex=False).str.strip()
+    return pd.to_numeric(text.where(~text.isin(NA_VALUES)), errors='coerce')
+
+def _apply_types(df, price_dtype):
+    for col in df.columns:
+        if col in PRICE_COLUMNS:
+            df[col] = _to_number(df[col]).astype(price_dtype)
+        elif col in VALUE_COLUMNS:
+            df[col] = _to_number(df[col]).astype('float64')
+        elif col in QUANTITY_COLUMNS:
+            df[col] = _to_number(df[col]).round().astype('Int64')
+        elif col in TEXT_COLUMNS:
+            df[col] = df[col].astype(str).str.strip()
+        elif col == 'Date':
+            df[col] = _parse_dates(df[col])
+    return df
+
+def normalize_frame(df, price_dtype='float64'):
+    """Canonical, typed copy of a raw NSE frame (e.g. straight from nselib)."""
+    if df is None or df.empty:
+        return pd.DataFrame()
+    df = df.rename(columns=resolve_columns(tuple(df.columns)))
+    return _apply_types(df.copy(), price_dtype)
+
+def read_nse_csv(path, price_dtype='float64'):
+    """
+    Read an NSE CSV export (history or Bhavcopy, any format) into a canonical
+    typed frame. Grouped numbers are handled by the C parser directly.
+    """
+    df = pd.read_csv(path, encoding='utf-8-sig', thousands=',', na_values=NA_VALUES,
+                     skipinitialspace=True, low_memory=False)
+    df = df.rename(columns=resolve_columns(tuple(df.columns)))
+    return _apply_types(df, price_dtype)
+
+def select_series(df, series='EQ'):
+    """Keep one trading series when the frame carries several (EQ, BE, ...)."""
+    if 'Series' not in df.columns:
+        return df
+    mask = df['Series'] == series
+    return df[mask] if mask.any() else df
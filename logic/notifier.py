@@ -1,41 +1,77 @@
 """
 Notifier module for Discord and Telegram notifications.
-Sends Top 10 Sideways Opportunities (Confidence >= 60, sorted by Volume).
+Sends alerts only for state changes since the previous scan (logic.alerts);
+the Top 10 Sideways Opportunities digest (Confidence >= 60, sorted by Volume,
+skipping names correlated with a pick, see logic.portfolio) goes out on the
+first run or with --digest. Delivery (fan-out, keep-alive connections, rate
+limits, retry queue) is handled by logic.delivery.
+
+pandas, the alert engine and the correlation picks are imported inside the
+functions that use them, so the CLI starts without loading them. The alert
+snapshot advances on every run, with or without a configured channel, so
+the first run after channels are added diffs against the latest scan.
 """
 import os
-import json
-import pandas as pd
-import urllib.request
-import urllib.parse
-import urllib.error
-
-def get_top_opportunities():
-    """Load market scan and filter for top opportunities."""
-    data_dir = os.path.join(os.path.dirname(__file__), '..', 'data')
-    csv_path = os.path.join(data_dir, 'market_scan.csv')
-    
-    if not os.path.exists(csv_path):
-        print("No market_scan.csv found. Skipping notifications.")
+try:
+    from delivery import DeliveryEngine, RetryQueue, channels_from_env
+    from result_sink import SCAN_FILE, SCAN_PARQUET
+except ImportError:
+    from logic.delivery import DeliveryEngine, RetryQueue, channels_from_env
+    from logic.result_sink import SCAN_FILE, SCAN_PARQUET
+
+TOP_N = 10
+MIN_CONFIDENCE = 60
+
+def load_scan():
+    """Published scan, reading only the columns alerts and messages need (Parquet, else CSV)."""
+    import pandas as pd
+    try:
+        from alerts import SNAPSHOT_COLUMNS
+    except ImportError:
+        from logic.alerts import SNAPSHOT_COLUMNS
+    columns = [c for c in SNAPSHOT_COLUMNS if c != 'Banned']
+    if os.path.exists(SCAN_PARQUET):
+        try:
+            return pd.read_parquet(SCAN_PARQUET, columns=columns)
+        except Exception:
+            pass
+    if os.path.exists(SCAN_FILE):
+        return pd.read_csv(SCAN_FILE, usecols=lambda c: c in columns)
+    return None
+
+def get_top_opportunities(results=None, n=TOP_N):
+    """
+    Filter a scan for top opportunities. 'results' is the in-memory scan
+    (DataFrame or list of rows); without it the published scan is loaded.
+    """
+    import pandas as pd
+    try:
+        from portfolio import select_diversified, load_correlation, MAX_CORR
+    except ImportError:
+        from logic.portfolio import select_diversified, load_correlation, MAX_CORR
+    df = load_scan() if results is None else pd.DataFrame(results)
+    if df is None:
+        print("No market scan found. Skipping notifications.")
         return None
-    
-    df = pd.read_csv(csv_path)
-    
+
     # Filter: Passed stocks with Confidence >= 60
     if 'Passed' not in df.columns or 'Confidence' not in df.columns:
         print("Required columns missing. Skipping notifications.")
         return None
-    
-    filtered = df[(df['Passed'] == True) & (df['Confidence'] >= 60)]
-    
+
+    filtered = df[(df['Passed'] == True) & (df['Confidence'] >= MIN_CONFIDENCE)]
+
     if filtered.empty:
         print("No opportunities meeting criteria. Skipping notifications.")
         return None
-    
-    # Sort by Volume and get top 10
+
+    # Top n by Volume, skipping names too correlated with a higher-volume pick
+    corr = load_correlation()
+    if corr is not None and 'Volume' in filtered.columns:
+        return select_diversified(filtered, corr, n=n, max_corr=MAX_CORR, rank_by='Volume')
     if 'Volume' in filtered.columns:
-        filtered = filtered.sort_values(by='Volume', ascending=False)
-    
-    return filtered.head(10)
+        return filtered.nlargest(n, 'Volume')
+    return filtered.head(n)
 
 def format_message(df):
     """Format the opportunities into a readable message."""
@@ -43,86 +79,109 @@ def format_message(df):
     lines.append("```")
     lines.append(f"{'Symbol':<12} {'Close':>8} {'Conf':>6} {'Volume':>12}")
     lines.append("-" * 42)
-    
+
     for _, row in df.iterrows():
         symbol = row.get('Symbol', 'N/A')[:12]
         close = f"{row.get('Close', 0):.2f}"
         conf = f"{row.get('Confidence', 0):.0f}%"
         vol = f"{int(row.get('Volume', 0)):,}"
         lines.append(f"{symbol:<12} {close:>8} {conf:>6} {vol:>12}")
-    
+
     lines.append("```")
-    lines.append(f"\n📊 Top {len(df)} Sideways Opportunities | Confidence ≥ 60%")
+    lines.append(f"\n📊 Top {len(df)} Sideways Opportunities | Confidence ≥ {MIN_CONFIDENCE}%")
     return "\n".join(lines)
 
+def deliver(message, channels, queue=None):
+    """Send one message to every channel (plus any due queued retries); returns the report."""
+    engine = DeliveryEngine(queue=queue)
+    try:
+        jobs = queue.due(channels) if queue is not None else []
+        if jobs:
+            print(f"Retrying {len(jobs)} queued notification(s)...")
+        if message is not None:
+            jobs += [(channel, message, None) for channel in channels]
+        report = engine.deliver(jobs)
+    finally:
+        engine.close()
+    for channel, ok, reason in report:
+        if ok:
+            print(f"{channel.platform.title()} notification sent ({channel.id}).")
+        else:
+            print(f"{channel.platform.title()} notification failed ({channel.id}): {reason}")
+    print(f"Delivery stats: {engine.stats}, {engine.pool.opened} connection(s) opened.")
+    return report
+
 def send_discord(message):
-    """Send message to Discord via webhook."""
-    webhook_url = os.environ.get('DISCORD_WEBHOOK')
-    if not webhook_url:
+    """Send message to every Discord webhook in DISCORD_WEBHOOK."""
+    channels = [c for c in channels_from_env() if c.platform == 'discord']
+    if not channels:
         print("DISCORD_WEBHOOK not set. Skipping Discord notification.")
         return False
-    
-    payload = json.dumps({"content": message}).encode('utf-8')
-    headers = {
-        'Content-Type': 'application/json',
-        'User-Agent': 'ThetaHunterBot/1.0'
-    }
-    req = urllib.request.Request(webhook_url, data=payload, headers=headers, method='POST')
-    
-    try:
-        with urllib.request.urlopen(req, timeout=10) as response:
-            print(f"Discord notification sent. Status: {response.status}")
-            return True
-    except urllib.error.HTTPError as e:
-        print(f"Discord notification failed: HTTP Error {e.code}: {e.reason}")
-        print(f"Response: {e.read().decode('utf-8', errors='ignore')}")
-        return False
-    except Exception as e:
-        print(f"Discord notification failed: {e}")
-        return False
+    return all(ok for _, ok, _ in deliver(message, channels))
 
 def send_telegram(message):
-    """Send message to Telegram via Bot API."""
-    bot_token = os.environ.get('TELEGRAM_BOT_TOKEN')
-    chat_id = os.environ.get('TELEGRAM_CHAT_ID')
-    
-    if not bot_token or not chat_id:
+    """Send message to every chat in TELEGRAM_CHAT_ID via the Bot API."""
+    channels = [c for c in channels_from_env() if c.platform == 'telegram']
+    if not channels:
         print("TELEGRAM_BOT_TOKEN or TELEGRAM_CHAT_ID not set. Skipping Telegram notification.")
         return False
-    
-    # Convert markdown to Telegram-compatible format
-    telegram_message = message.replace("**", "*")
-    
-    url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
-    params = urllib.parse.urlencode({
-        'chat_id': chat_id,
-        'text': telegram_message,
-        'parse_mode': 'Markdown'
-    }).encode('utf-8')
-    
-    try:
-        with urllib.request.urlopen(url, data=params) as response:
-            print(f"Telegram notification sent. Status: {response.status}")
-            return True
-    except Exception as e:
-        print(f"Telegram notification failed: {e}")
-        return False
+    return all(ok for _, ok, _ in deliver(message, channels))
 
-def run_notifier():
-    """Main function to send notifications."""
+def run_notifier(results=None, ban_list=None, scan_date=None, digest=False):
+    """
+    Main function to send notifications. 'results' is the in-memory scan from
+    run_screener and 'ban_list' today's F&O ban list (None when unknown).
+    Only state changes since the previous scan are sent, unless digest=True
+    or there is no previous scan to compare with. Undelivered messages are
+    queued and retried on later runs.
+    """
     print("Starting notification process...")
-    
-    top_opps = get_top_opportunities()
-    if top_opps is None:
+    import pandas as pd
+    try:
+        from alerts import AlertEngine, format_events
+    except ImportError:
+        from logic.alerts import AlertEngine, format_events
+    scan = load_scan() if results is None else pd.DataFrame(results)
+    events = AlertEngine().run(scan, ban_list, scan_date) if scan is not None else None
+    channels = channels_from_env()
+    if not channels:
+        print("No Discord webhook or Telegram chat configured. Skipping notifications.")
         return
-    
-    message = format_message(top_opps)
-    print(f"Sending notifications for {len(top_opps)} opportunities...")
-    
-    send_discord(message)
-    send_telegram(message)
-    
+
+    message = None
+    if digest or events is None:
+        top_opps = get_top_opportunities(scan)
+        if top_opps is not None:
+            message = format_message(top_opps)
+            print(f"Sending digest of {len(top_opps)} opportunities to {len(channels)} destination(s)...")
+    elif events.empty:
+        print("No state changes since the previous scan. Nothing to send.")
+    else:
+        message = format_events(events)
+        print(f"Sending {len(events)} alert(s) to {len(channels)} destination(s)...")
+
+    queue = RetryQueue()
+    try:
+        deliver(message, channels, queue)
+        if queue.pending():
+            print(f"{queue.pending()} notification(s) queued for retry.")
+    finally:
+        queue.close()
+
     print("Notification process complete.")
 
 if __name__ == "__main__":
-    run_notifier()
+    import argparse
+    parser = argparse.ArgumentParser(description="Theta Hunter notifications")
+    parser.add_argument('--digest', action='store_true', help="Send the Top 10 table instead of change alerts")
+    parser.add_argument('--ban-list', action='store_true',
+                        help="Fetch today's F&O ban list for ban alerts (otherwise ban status is unknown)")
+    args = parser.parse_args()
+    ban_list = None
+    if args.ban_list:
+        try:
+            from nse_fetcher import get_fno_ban_list
+        except ImportError:
+            from logic.nse_fetcher import get_fno_ban_list
+        ban_list = get_fno_ban_list()
+    run_notifier(ban_list=ban_list, digest=args.digest)
@@ -1,25 +1,32 @@
 import pandas as pd
-from nselib import capital_market, derivatives
-from datetime import datetime, timedelta
+from datetime import timedelta
+try:
+    import history_store
+    import trading_calendar
+    import run_report
+    from data_sources import get_source
+except ImportError:
+    from logic import history_store
+    from logic import trading_calendar
+    from logic import run_report
+    from logic.data_sources import get_source
 
 def get_last_working_day(offset=0):
-    dt = datetime.now() - timedelta(days=offset)
-    # If today is weekend, go back to Friday
-    if dt.weekday() == 5: # Sat
-        dt = dt - timedelta(days=1)
-    elif dt.weekday() == 6: # Sun
-        dt = dt - timedelta(days=2)
-    return dt.strftime('%d-%m-%Y')
+    """
+    NSE session 'offset' sessions before the latest one, as 'dd-mm-YYYY'.
+    Weekends and exchange holidays are skipped via the trading calendar.
+    """
+    return trading_calendar.session_offset(offset).strftime('%d-%m-%Y')
 
-def get_top_500_active_stocks():
+def get_top_500_active_stocks(n=500):
     """
-    Fetch the Top 500 stocks by Value (Turnover) from the latest available Bhavcopy.
+    Fetch the Top 500 (or n) stocks by Value (Turnover) from the latest available Bhavcopy.
     """
-    # Try last 5 days to find a working Bhavcopy (handling holidays)
+    # Try the last 5 sessions (today's file may not be published yet)
     for i in range(5):
         date_str = get_last_working_day(i)
         try:
-            data = capital_market.bhav_copy_equities(trade_date=date_str)
+            data = get_source().bhavcopy(date_str)
             if isinstance(data, pd.DataFrame) and not data.empty:
                 sym_col = 'TckrSymb' if 'TckrSymb' in data.columns else 'SYMBOL'
                 series_col = 'SctySrs' if 'SctySrs' in data.columns else 'SERIES'
@@ -29,15 +36,28 @@ def get_top_500_active_stocks():
                     eq_data = data[data[series_col] == 'EQ']
                     if val_col in eq_data.columns:
                         eq_data[val_col] = pd.to_numeric(eq_data[val_col], errors='coerce')
-                        top_500 = eq_data.sort_values(by=val_col, ascending=False).head(500)
+                        top_500 = eq_data.sort_values(by=val_col, ascending=False).head(n)
                         print(f"Success: Found {len(top_500)} stocks from Bhavcopy dated {date_str}")
                         return top_500[sym_col].tolist()
         except:
             continue
     
-    print("Warning: Could not fetch Bhavcopy from last 5 days. Using fallback list.")
+    print("Warning: Could not fetch Bhavcopy from last 5 sessions. Using fallback list.")
     return ['RELIANCE', 'TCS', 'HDFCBANK', 'ICICIBANK', 'INFY', 'BHARTIARTL', 'SBIN', 'LICI', 'ITC', 'HINDUNILVR']
 
+def get_bhavcopy(date_str):
+    """
+    Fetch the full-market equities Bhavcopy for one trade date ('dd-mm-YYYY').
+    Returns an empty frame when the file is not available (holiday / not yet published).
+    """
+    try:
+        data = get_source().bhavcopy(date_str)
+        if isinstance(data, pd.DataFrame):
+            return data
+    except Exception as e:
+        print(f"Bhavcopy for {date_str} unavailable: {e}")
+    return pd.DataFrame()
+
 def get_top_20_active_stocks():
     # Keep this for backward compatibility or simple scans
     return get_top_500_active_stocks()[:20]
@@ -48,41 +68,134 @@ def get_fno_ban_list():
     """
     date_str = get_last_working_day()
     try:
-        ban_list = derivatives.fno_security_in_ban_period(trade_date=date_str)
+        ban_list = get_source().fno_ban(date_str)
         if isinstance(ban_list, pd.DataFrame) and not ban_list.empty:
             return ban_list['SYMBOL'].tolist()
-        return []
+        # nselib returns a plain list of symbols
+        return list(ban_list) if isinstance(ban_list, list) else []
     except Exception as e:
         print(f"Error fetching F&O ban list: {e}")
         return []
 
-def get_ohlc_history(symbol, days=60, max_retries=3):
+def get_fno_symbols():
     """
-    Fetch OHLC history for a symbol for the last 'days' days.
-    Includes retry logic for reliability on cloud runners.
+    Equities with listed futures & options (NSE underlyings list).
+    Returns an empty list when the list cannot be fetched.
+    """
+    try:
+        data = get_source().fno_symbols()
+        if isinstance(data, pd.DataFrame) and not data.empty:
+            col = next((c for c in data.columns if str(c).lower() == 'symbol'), None)
+            if col is not None:
+                return data[col].dropna().astype(str).str.strip().tolist()
+        return []
+    except Exception as e:
+        print(f"Error fetching F&O underlyings: {e}")
+        return []
+
+def _fetch_ohlc_range(symbol, from_dt, to_dt, max_retries=3, raise_errors=False):
+    """
+    Download raw history for a symbol between two datetimes (inclusive).
+    With raise_errors=True the last failure is raised instead of returning an
+    empty frame, so a caller-side scheduler can count and retry it.
     """
     import time
-    end_date = datetime.now().strftime('%d-%m-%Y')
-    start_date = (datetime.now() - timedelta(days=days)).strftime('%d-%m-%Y')
-    
+    start_date = from_dt.strftime('%d-%m-%Y')
+    end_date = to_dt.strftime('%d-%m-%Y')
+
     for attempt in range(max_retries):
         try:
-            data = capital_market.price_volume_and_deliverable_position_data(symbol=symbol, from_date=start_date, to_date=end_date)
+            data = get_source().history(symbol, start_date, end_date)
             if isinstance(data, pd.DataFrame) and not data.empty:
                 return data
         except Exception as e:
             if attempt < max_retries - 1:
                 time.sleep(0.5 * (attempt + 1))  # Exponential backoff: 0.5s, 1s, 1.5s
                 continue
+            if raise_errors:
+                raise
     return pd.DataFrame()
 
+def stored_ohlc_history(symbol, sessions=60):
+    """
+    The stored bars for a symbol plus the date a download should start from
+    (None when the store already covers the last 'sessions' sessions).
+    Reads only the local store: no network request.
+    """
+    last_session = trading_calendar.latest_session()
+    window_start = trading_calendar.window_start(sessions)
+
+    with run_report.stage('store'):
+        history = history_store.load_history(symbol)
+    covered = history_store.covered_from(history)
+    last_bar = history['Date'].max() if not history.empty else None
+
+    # Backfill when the store is empty, stale, or shorter than the requested window. A symbol
+    # listed inside the window was already requested from before its listing: no backfill again
+    if last_bar is None or last_bar < window_start or covered > window_start + timedelta(days=7):
+        fetch_from = window_start
+    elif last_bar < last_session:
+        # First session after the stored bar: never starts a request on a holiday
+        fetch_from = trading_calendar.sessions_between(last_bar + timedelta(days=1), last_session)[0]
+    else:
+        fetch_from = None
+    return history, fetch_from
+
+def download_ohlc_history(symbol, history, fetch_from, max_retries=3, raise_errors=False):
+    """
+    The network step of get_ohlc_history: download bars from 'fetch_from' to
+    the latest session and merge them into the stored 'history'. Returns the
+    history afterwards (unchanged when nothing new was downloaded).
+    """
+    with run_report.stage('fetch'):
+        raw = _fetch_ohlc_range(symbol, fetch_from, trading_calendar.latest_session(),
+                                max_retries=max_retries, raise_errors=raise_errors)
+    with run_report.stage('parse'):
+        bars = history_store.normalize_history(raw)
+    if bars.empty:
+        return history
+    with run_report.stage('store'):
+        return history_store.merge_history(symbol, bars, requested_from=fetch_from)
+
+def history_window(history, sessions=60):
+    """The bars of a stored history that fall in the last 'sessions' sessions."""
+    if history.empty:
+        return pd.DataFrame()
+    return history[history['Date'] >= trading_calendar.window_start(sessions)].reset_index(drop=True)
+
+def get_ohlc_history(symbol, sessions=60, max_retries=3, offline=False, raise_errors=False):
+    """
+    Fetch OHLC history for a symbol covering the last 'sessions' NSE sessions.
+    Served from the local history store; only bars after the last stored
+    date are downloaded (a fresh store backfills the full window once).
+    With offline=True no network request is made at all.
+    """
+    history, fetch_from = stored_ohlc_history(symbol, sessions)
+    if not offline and fetch_from is not None:
+        history = download_ohlc_history(symbol, history, fetch_from, max_retries=max_retries, raise_errors=raise_errors)
+    return history_window(history, sessions)
+
+def get_option_chain(symbol, expiry_date=None, raise_errors=False):
+    """
+    Live NSE option chain for a symbol ('CALLS_*' / 'PUTS_*' columns per strike).
+    All listed expiries are returned unless expiry_date ('dd-mm-YYYY') is given.
+    """
+    try:
+        chain = get_source().option_chain(symbol, expiry_date=expiry_date)
+        return chain if isinstance(chain, pd.DataFrame) else pd.DataFrame()
+    except Exception as e:
+        if raise_errors:
+            raise
+        print(f"Error fetching option chain for {symbol}: {e}")
+        return pd.DataFrame()
+
 def get_fii_sentiment():
     """
     Fetch Participant Wise Open Interest and return FII data.
     """
     date_str = get_last_working_day()
     try:
-        data = derivatives.participant_wise_open_interest(trade_date=date_str)
+        data = get_source().participant_oi(date_str)
         # Filter for FII row
         if isinstance(data, pd.DataFrame) and 'Client Type' in data.columns:
             fii_data = data[data['Client Type'] == 'FII'].iloc[0]
@@ -0,0 +1,307 @@
+"""
+Option chains, implied volatility and 20-delta strike selection.
+Chains are fetched through nse_fetcher (or loaded from recorded snapshots),
+reshaped to one row per option and cached per expiry under
+data/chains/<YYYYMMDD>/<SYMBOL>.parquet. Pricing uses Black-76 on the
+put-call-parity forward, so no dividend or carry assumption is needed; IV for
+every option of every chain is solved in one vectorized, bracketed Newton
+iteration (bisection whenever a Newton step leaves the bracket).
+"""
+import os
+import time
+import numpy as np
+import pandas as pd
+from scipy.special import ndtr
+try:
+    from nse_fetcher import get_option_chain
+    from fetch_scheduler import FetchScheduler
+    from result_sink import atomic_write_csv
+except ImportError:
+    from logic.nse_fetcher import get_option_chain
+    from logic.fetch_scheduler import FetchScheduler
+    from logic.result_sink import atomic_write_csv
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+CHAIN_DIR = os.path.join(DATA_DIR, 'chains')
+STRIKES_FILE = os.path.join(DATA_DIR, 'delta_strikes.csv')
+RISK_FREE_RATE = 0.065
+TARGET_DELTA = 0.20
+CHAIN_MAX_AGE = 15 * 60        # seconds a live snapshot is reused
+MIN_DAYS_TO_EXPIRY = 2         # roll to the next expiry inside this window
+EXCHANGE_TZ = 'Asia/Kolkata'   # expiries close at 15:30 exchange time
+CHAIN_COLUMNS = ['Symbol', 'Expiry', 'Strike', 'Type', 'Price', 'LTP', 'Bid', 'Ask', 'NSE_IV', 'OI', 'Volume', 'Fetch_Time']
+
+# --- Black-76 ---
+
+def _d1(forward, strike, t, sigma):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (np.log(forward / strike) + 0.5 * sigma * sigma * t) / (sigma * np.sqrt(t))
+
+def black_price(forward, strike, t, r, sigma, is_call):
+    """Discounted Black-76 price (vectorized; is_call is a boolean array)."""
+    d1 = _d1(forward, strike, t, sigma)
+    d2 = d1 - sigma * np.sqrt(t)
+    df = np.exp(-r * t)
+    call = df * (forward * ndtr(d1) - strike * ndtr(d2))
+    put = df * (strike * ndtr(-d2) - forward * ndtr(-d1))
+    return np.where(is_call, call, put)
+
+def black_vega(forward, strike, t, r, sigma):
+    d1 = _d1(forward, strike, t, sigma)
+    return np.exp(-r * t) * forward * np.exp(-0.5 * d1 * d1) / np.sqrt(2 * np.pi) * np.sqrt(t)
+
+def black_delta(forward, strike, t, sigma, is_call):
+    """Forward delta: N(d1) for calls, N(d1) - 1 for puts."""
+    n1 = ndtr(_d1(forward, strike, t, sigma))
+    return np.where(is_call, n1, n1 - 1.0)
+
+def implied_vol(price, forward, strike, t, r, is_call, tol=1e-7, max_iter=60, lo=1e-4, hi=5.0):
+    """
+    Implied volatility for arrays of option prices. In-the-money options are
+    solved on their out-of-the-money parity twin (same time value, better
+    vega). Prices outside the no-arbitrage bounds (or t <= 0) return NaN.
+    """
+    price, forward, strike, t = (np.asarray(a, dtype=float) for a in (price, forward, strike, t))
+    is_call = np.asarray(is_call, dtype=bool)
+    price, forward, strike, t, is_call = np.broadcast_arrays(price, forward, strike, t, is_call)
+    df = np.exp(-r * t)
+    itm = np.where(is_call, forward > strike, forward < strike)
+    price = np.where(itm, price - np.where(is_call, 1, -1) * df * (forward - strike), price)
+    is_call = is_call ^ itm
+    upper = df * np.where(is_call, forward, strike)
+    valid = np.isfinite(price) & np.isfinite(forward) & (t > 0) & (price > 0) & (price < upper)
+
+    low = np.full(price.shape, lo)
+    high = np.full(price.shape, hi)
+    # Brenner-Subrahmanyam starting point, kept inside the bracket
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sigma = np.clip(np.sqrt(2 * np.pi / t) * price / (df * forward), lo * 2, hi / 2)
+    sigma = np.where(valid, sigma, np.nan)
+    active = valid.copy()
+    for _ in range(max_iter):
+        if not active.any():
+            break
+        idx = np.flatnonzero(active)
+        s, f, k, tt, c = sigma[idx], forward[idx], strike[idx], t[idx], is_call[idx]
+        diff = black_price(f, k, tt, r, s, c) - price[idx]
+        low[idx] = np.where(diff < 0, s, low[idx])
+        high[idx] = np.where(diff > 0, s, high[idx])
+        done = (np.abs(diff) < tol * f) | (high[idx] - low[idx] < tol)
+        vega = black_vega(f, k, tt, r, s)
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            step = s - diff / vega
+        inside = np.isfinite(step) & (step > low[idx]) & (step < high[idx])
+        sigma[idx] = np.where(done, s, np.where(inside, step, 0.5 * (low[idx] + high[idx])))
+        active[idx[done]] = False
+    sigma[active] = np.nan   # did not converge
+    return sigma
+
+# --- Chains ---
+
+def normalize_chain(raw, symbol=None, fetch_time=None):
+    """
+    Reshape an nselib option chain (CALLS_* / PUTS_* per strike) into one row
+    per option. Price is the bid/ask mid when both sides quote, else the LTP.
+    """
+    if raw is None or raw.empty or 'Strike_Price' not in raw.columns:
+        return pd.DataFrame(columns=CHAIN_COLUMNS)
+    frames = []
+    for side, kind in (('CALLS', 'CE'), ('PUTS', 'PE')):
+        col = lambda name: pd.to_numeric(raw.get(f"{side}_{name}", np.nan), errors='coerce')
+        bid, ask, ltp = col('Bid_Price'), col('Ask_Price'), col('LTP')
+        mid = (bid + ask) / 2
+        frames.append(pd.DataFrame({
+            'Symbol': raw['Symbol'] if 'Symbol' in raw.columns else symbol,
+            'Expiry': pd.to_datetime(raw['Expiry_Date'], format='%d-%b-%Y', errors='coerce'),
+            'Strike': pd.to_numeric(raw['Strike_Price'], errors='coerce'),
+            'Type': kind,
+            'Price': mid.where((bid > 0) & (ask > 0), ltp),
+            'LTP': ltp, 'Bid': bid, 'Ask': ask,
+            'NSE_IV': col('IV'), 'OI': col('OI'), 'Volume': col('Volume'),
+            'Fetch_Time': fetch_time or (raw['Fetch_Time'].iloc[0] if 'Fetch_Time' in raw.columns else None),
+        }))
+    chain = pd.concat(frames, ignore_index=True)
+    if symbol is not None:
+        chain['Symbol'] = symbol
+    chain = chain[(chain['Price'] > 0) & chain['Expiry'].notna()]
+    return chain.sort_values(['Expiry', 'Strike', 'Type']).reset_index(drop=True)
+
+def _chain_path(symbol, expiry):
+    return os.path.join(CHAIN_DIR, pd.Timestamp(expiry).strftime('%Y%m%d'), f"{symbol}.parquet")
+
+def save_chain(chain):
+    """Cache a normalized chain, one snapshot file per (expiry, symbol)."""
+    for (symbol, expiry), part in chain.groupby(['Symbol', 'Expiry']):
+        path = _chain_path(symbol, expiry)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        part.to_parquet(path + '.tmp', index=False)
+        os.replace(path + '.tmp', path)
+
+def cached_expiries(symbol, now=None):
+    """Cached expiries for a symbol that have not expired yet (all when now=False)."""
+    if not os.path.isdir(CHAIN_DIR):
+        return []
+    expiries = sorted(pd.Timestamp(d) for d in os.listdir(CHAIN_DIR)
+                      if os.path.exists(os.path.join(CHAIN_DIR, d, f"{symbol}.parquet")))
+    if now is not False:
+        today = to_exchange_time(now).tz_localize(None).normalize()
+        expiries = [e for e in expiries if e >= today]
+    return expiries
+
+def load_chain(symbol, expiries=None, now=None):
+    """Recorded chain snapshots for a symbol (all cached live expiries by default)."""
+    expiries = cached_expiries(symbol, now) if expiries is None else expiries
+    frames = [pd.read_parquet(_chain_path(symbol, e)) for e in expiries if os.path.exists(_chain_path(symbol, e))]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=CHAIN_COLUMNS)
+
+def cached_chain(symbol, offline=False, max_age=CHAIN_MAX_AGE, now=None):
+    """
+    The cached snapshot when it is fresher than max_age seconds (or any
+    snapshot, offline); None when a live fetch is needed. No network request.
+    """
+    expiries = cached_expiries(symbol, False if offline else now)
+    if expiries:
+        age = time.time() - os.path.getmtime(_chain_path(symbol, expiries[0]))
+        if offline or age < max_age:
+            return load_chain(symbol, expiries)
+    return pd.DataFrame(columns=CHAIN_COLUMNS) if offline else None
+
+def download_chain(symbol, raise_errors=False):
+    """The network step of get_chain: fetch, normalize and cache a live chain."""
+    chain = normalize_chain(get_option_chain(symbol, raise_errors=raise_errors), symbol)
+    if not chain.empty:
+        save_chain(chain)
+    return chain
+
+def get_chain(symbol, offline=False, max_age=CHAIN_MAX_AGE, now=None, raise_errors=False):
+    """
+    Option chain for one symbol: the cached snapshot when it is fresher than
+    max_age seconds (or always, offline), otherwise a live fetch that is cached.
+    """
+    chain = cached_chain(symbol, offline, max_age, now)
+    return chain if chain is not None else download_chain(symbol, raise_errors=raise_errors)
+
+def to_exchange_time(value=None):
+    """
+    Timestamp(s) in IST; None is the current time. Naive values are read as
+    IST wall-clock time, aware ones are converted.
+    """
+    if value is None:
+        return pd.Timestamp.now(tz=EXCHANGE_TZ)
+    value = pd.to_datetime(value)
+    times = value.dt if isinstance(value, pd.Series) else value
+    return times.tz_localize(EXCHANGE_TZ) if times.tz is None else times.tz_convert(EXCHANGE_TZ)
+
+def years_to_expiry(expiry, now=None):
+    """Calendar-time to the 15:30 IST expiry close, in years."""
+    now = to_exchange_time(now)
+    close = to_exchange_time(expiry) + pd.Timedelta(hours=15, minutes=30)
+    return np.maximum((close - now) / pd.Timedelta(days=365), 0.0)
+
+def implied_forwards(chain, now=None, r=RISK_FREE_RATE):
+    """
+    Put-call-parity forward per (Symbol, Expiry) from the strike where the call
+    and put prices are closest. Returns a Series aligned with the chain rows.
+    """
+    pairs = chain.pivot_table(index=['Symbol', 'Expiry', 'Strike'], columns='Type', values='Price', aggfunc='last')
+    if not {'CE', 'PE'}.issubset(pairs.columns):
+        return pd.Series(np.nan, index=chain.index)
+    pairs = pairs.dropna(subset=['CE', 'PE'])
+    gap = (pairs['CE'] - pairs['PE']).rename('gap').reset_index()
+    gap['abs_gap'] = gap['gap'].abs()
+    atm = gap.loc[gap.groupby(['Symbol', 'Expiry'])['abs_gap'].idxmin()]
+    t_atm = years_to_expiry(atm['Expiry'], now)
+    atm = atm.assign(Forward=atm['Strike'] + atm['gap'] * np.exp(r * t_atm))
+    keys = pd.MultiIndex.from_frame(chain[['Symbol', 'Expiry']])
+    return pd.Series(atm.set_index(['Symbol', 'Expiry'])['Forward'].reindex(keys).to_numpy(), index=chain.index)
+
+def analyze_chain(chain, spots=None, now=None, r=RISK_FREE_RATE):
+    """
+    Add T, Forward, IV and Delta to every row of one or many chains at once.
+    spots: optional {symbol: price} used when a chain has no call/put pair.
+    """
+    if chain.empty:
+        return chain.assign(T=[], Forward=[], IV=[], Delta=[])
+    chain = chain.reset_index(drop=True)
+    t = np.asarray(years_to_expiry(chain['Expiry'], now), dtype=float)
+    forward = implied_forwards(chain, now, r)
+    if spots is not None:
+        carry = chain['Symbol'].map(spots) * np.exp(r * t)
+        forward = forward.fillna(carry)
+    forward = forward.to_numpy(dtype=float)
+    is_call = (chain['Type'] == 'CE').to_numpy()
+    strike = chain['Strike'].to_numpy(dtype=float)
+    iv = implied_vol(chain['Price'].to_numpy(dtype=float), forward, strike, t, r, is_call)
+    # In-the-money quotes carry little time value, so each strike takes the IV
+    # of its out-of-the-money option when that side is quoted
+    otm = np.where(is_call, strike >= forward, strike <= forward)
+    keys = pd.MultiIndex.from_frame(chain[['Symbol', 'Expiry', 'Strike']])
+    otm_iv = pd.Series(iv[otm], index=keys[otm])
+    otm_iv = otm_iv[~otm_iv.index.duplicated()]
+    twin = otm_iv.reindex(keys).to_numpy()
+    iv = np.where(~otm & np.isfinite(twin), twin, iv)
+    delta = black_delta(forward, strike, t, iv, is_call)
+    return chain.assign(T=t, Forward=forward, IV=iv, Delta=delta)
+
+def select_delta_strikes(analyzed, target=TARGET_DELTA, min_days=MIN_DAYS_TO_EXPIRY):
+    """
+    The put and call whose deltas are closest to -target / +target, on the
+    nearest expiry at least min_days away, for every symbol in the frame.
+    """
+    columns = ['Symbol', 'Expiry', 'Forward', 'Put_Strike', 'Put_Delta', 'Put_IV', 'Put_Price',
+               'Call_Strike', 'Call_Delta', 'Call_IV', 'Call_Price', 'Credit']
+    df = analyzed[analyzed['IV'].notna() & (analyzed['T'] * 365 >= min_days)]
+    if df.empty:
+        return pd.DataFrame(columns=columns)
+    nearest = df.groupby('Symbol')['Expiry'].transform('min')
+    df = df[df['Expiry'] == nearest].assign(Distance=lambda d: (d['Delta'].abs() - target).abs())
+    best = df.loc[df.groupby(['Symbol', 'Type'])['Distance'].idxmin()].set_index(['Symbol', 'Type'])
+
+    out = pd.DataFrame(index=best.index.get_level_values('Symbol').unique())
+    for kind, prefix in (('PE', 'Put'), ('CE', 'Call')):
+        side = best.xs(kind, level='Type') if kind in best.index.get_level_values('Type') else pd.DataFrame()
+        for field in ('Strike', 'Delta', 'IV', 'Price'):
+            out[f"{prefix}_{field}"] = side[field] if field in side else np.nan
+    first = best.groupby(level='Symbol').first()
+    out['Expiry'] = first['Expiry']
+    out['Forward'] = first['Forward'].round(2)
+    out['Credit'] = (out['Put_Price'] + out['Call_Price']).round(2)
+    for col in ('Put_Delta', 'Call_Delta'):
+        out[col] = out[col].round(3)
+    for col in ('Put_IV', 'Call_IV'):
+        out[col] = (out[col] * 100).round(2)
+    return out.rename_axis('Symbol').reset_index()[columns]
+
+def find_delta_strikes(symbols, spots=None, offline=False, target=TARGET_DELTA, now=None):
+    """Fetch (or load) chains for 'symbols' and pick their target-delta strangles."""
+    # Fresh snapshots are read straight away; only live fetches go through the rate-limited scheduler
+    cached = {s: cached_chain(s, offline=offline, now=now) for s in symbols}
+    chains = [c for c in cached.values() if c is not None]
+    stale = [s for s, c in cached.items() if c is None]
+    if stale:
+        results, failed = FetchScheduler().run(stale, lambda s: download_chain(s, raise_errors=True), endpoint='derivatives')
+        if failed:
+            print(f"Warning: option chains unavailable for {len(failed)} symbols: {', '.join(sorted(failed)[:20])}")
+        chains += list(results.values())
+    chains = [c for c in chains if c is not None and not c.empty]
+    if not chains:
+        return select_delta_strikes(pd.DataFrame(columns=CHAIN_COLUMNS + ['T', 'Forward', 'IV', 'Delta']), target)
+    start = time.perf_counter()
+    analyzed = analyze_chain(pd.concat(chains, ignore_index=True), spots, now)
+    print(f"Solved IV for {len(analyzed)} options in {(time.perf_counter() - start) * 1000:.0f} ms.")
+    return select_delta_strikes(analyzed, target)
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="20-delta strangle strikes for passing symbols")
+    parser.add_argument('--offline', action='store_true', help="Use recorded chain snapshots only")
+    parser.add_argument('--target', type=float, default=TARGET_DELTA)
+    args = parser.parse_args()
+
+    scan_parquet = os.path.join(DATA_DIR, 'market_scan.parquet')
+    scan = pd.read_parquet(scan_parquet) if os.path.exists(scan_parquet) else pd.read_csv(os.path.join(DATA_DIR, 'market_scan.csv'))
+    passing = scan[scan['Passed'] == True]
+    strikes = find_delta_strikes(passing['Symbol'].tolist(), dict(zip(passing['Symbol'], passing['Close'])),
+                                 offline=args.offline, target=args.target)
+    atomic_write_csv(strikes, STRIKES_FILE)
+    print(f"Saved {len(strikes)} delta-strike rows to delta_strikes.csv.")
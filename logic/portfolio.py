@@ -0,0 +1,267 @@
+"""
+Correlation-aware selection of strangle candidates.
+Picking the passing stocks with the highest volume often picks several names
+that move together, which concentrates the risk. select_diversified() picks
+a top-N in rank order (Volume or Confidence) while keeping every pair of picks
+under a correlation cap (greedy), or one name per correlated cluster
+(hierarchical clustering).
+
+Correlations come from daily log returns over a rolling window kept by
+CorrelationCache (data/corr_cache.npz). It holds the window's return rows
+plus their running sums and cross-product matrix, so each new session is a
+rank-1 add (and drop of the oldest row) rather than a recomputation. After
+each scan the screener updates the cache and publishes the correlation matrix
+of the passing candidates to data/correlation.parquet, which the dashboard and
+notifier read.
+"""
+import os
+import numpy as np
+import pandas as pd
+try:
+    import history_store
+except ImportError:
+    from logic import history_store
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+CACHE_FILE = os.path.join(DATA_DIR, 'corr_cache.npz')
+CORRELATION_FILE = os.path.join(DATA_DIR, 'correlation.parquet')
+CORR_WINDOW = 120     # sessions of returns kept (grows daily past the 60-session fetch window)
+MIN_OBS = 20          # fewer valid returns than this: correlation unknown
+MAX_CORR = 0.7
+TOP_N = 10
+
+class CorrelationCache:
+    """
+    Rolling-window return statistics for a set of symbols.
+    Missing returns count as 0 (no move); a symbol's correlations are only
+    reported once it has MIN_OBS valid returns in the window.
+    Usage:
+        cache = CorrelationCache.load()
+        cache.update(close_panel)          # (date x symbol) closes; only new sessions are added
+        cache.save()
+        corr = cache.correlation(symbols)
+    """
+
+    def __init__(self, window=CORR_WINDOW):
+        self.window = window
+        self.symbols = []
+        self.dates = pd.DatetimeIndex([])
+        self.returns = np.zeros((0, 0))
+        self.valid = np.zeros((0, 0), dtype=bool)
+        self.sums = np.zeros(0)
+        self.cross = np.zeros((0, 0))
+        self.counts = np.zeros(0)
+        self.updates = 0          # incremental updates since the last full rebuild
+
+    @classmethod
+    def load(cls, path=None, window=CORR_WINDOW):
+        path = path or CACHE_FILE
+        cache = cls(window)
+        if os.path.exists(path):
+            with np.load(path, allow_pickle=False) as f:
+                cache.symbols = f['symbols'].tolist()
+                cache.dates = pd.DatetimeIndex(f['dates'])
+                cache.returns, cache.valid = f['returns'], f['valid']
+                cache.sums, cache.cross, cache.counts = f['sums'], f['cross'], f['counts']
+                cache.updates = int(f['updates'])
+        return cache
+
+    def save(self, path=None):
+        path = path or CACHE_FILE
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + '.tmp.npz'
+        np.savez(tmp_path, symbols=np.array(self.symbols, dtype=str), dates=self.dates.to_numpy(dtype='datetime64[ns]'),
+                 returns=self.returns, valid=self.valid, sums=self.sums, cross=self.cross, counts=self.counts,
+                 updates=self.updates)
+        os.replace(tmp_path, path)
+
+    def frame(self):
+        """The window's returns as a (date x symbol) frame, NaN where missing."""
+        return pd.DataFrame(np.where(self.valid, self.returns, np.nan), index=self.dates, columns=self.symbols)
+
+    def _rebuild(self, returns):
+        """Recompute every statistic from a (date x symbol) returns frame (last 'window' rows)."""
+        returns = returns.sort_index().iloc[-self.window:]
+        returns = returns.loc[:, returns.notna().any()]
+        self.symbols = list(returns.columns)
+        self.dates = pd.DatetimeIndex(returns.index)
+        self.valid = returns.notna().to_numpy()
+        self.returns = np.where(self.valid, returns.to_numpy(dtype=float), 0.0)
+        self.sums = self.returns.sum(axis=0)
+        self.cross = self.returns.T @ self.returns
+        self.counts = self.valid.sum(axis=0).astype(float)
+        self.updates = 0
+
+    def update(self, close):
+        """
+        Fold a (date x symbol) close panel into the window. New symbols are
+        added as columns and sessions after the last cached date as rows, both
+        incrementally; an empty cache, a gap longer than the window or
+        'window' incremental updates since the last rebuild (drift reset)
+        trigger a full rebuild from cached plus new returns.
+        Returns 'incremental', 'rebuild' or 'unchanged'.
+        """
+        returns = np.log(close.sort_index().astype(float)).diff().iloc[1:]
+        returns = returns.replace([np.inf, -np.inf], np.nan)
+        known = set(self.symbols)
+        new_symbols = [s for s in returns.columns[returns.notna().any()] if s not in known]
+        new_dates = returns.index[returns.index > self.dates[-1]] if len(self.dates) else returns.index
+        if not len(new_dates) and not new_symbols:
+            return 'unchanged'
+        if not len(self.dates) or len(new_dates) >= self.window or self.updates >= self.window:
+            # Cached history first, newer panel values win; drift from repeated rank-1 updates is reset here
+            combined = returns.combine_first(self.frame()) if len(self.dates) else returns
+            self._rebuild(combined)
+            return 'rebuild'
+        if new_symbols:
+            self._add_symbols(returns.reindex(index=self.dates, columns=new_symbols))
+        if not len(new_dates):
+            return 'incremental'
+
+        rows = returns.loc[new_dates].reindex(columns=self.symbols)
+        valid = rows.notna().to_numpy()
+        rows = np.where(valid, rows.to_numpy(dtype=float), 0.0)
+        self.returns = np.vstack([self.returns, rows])
+        self.valid = np.vstack([self.valid, valid])
+        self.dates = self.dates.append(pd.DatetimeIndex(new_dates))
+        extra = max(0, len(self.dates) - self.window)
+        old, old_valid = self.returns[:extra], self.valid[:extra]
+
+        self.sums += rows.sum(axis=0) - old.sum(axis=0)
+        self.counts += valid.sum(axis=0) - old_valid.sum(axis=0)
+        self._rank_update(rows, old)
+        self.returns, self.valid, self.dates = self.returns[extra:], self.valid[extra:], self.dates[extra:]
+        self.updates += 1
+        return 'incremental'
+
+    def _add_symbols(self, returns):
+        """Append symbols as columns: their returns over the cached dates extend the sums and the cross products."""
+        valid = returns.notna().to_numpy()
+        added = np.where(valid, returns.to_numpy(dtype=float), 0.0)
+        between = self.returns.T @ added
+        self.cross = np.ascontiguousarray(np.block([[self.cross, between], [between.T, added.T @ added]]))
+        self.sums = np.concatenate([self.sums, added.sum(axis=0)])
+        self.counts = np.concatenate([self.counts, valid.sum(axis=0).astype(float)])
+        self.returns = np.hstack([self.returns, added])
+        self.valid = np.hstack([self.valid, valid])
+        self.symbols = self.symbols + list(returns.columns)
+
+    def _rank_update(self, add, remove):
+        """cross += add'add - remove'remove, in place: one BLAS call and no N x N temporaries."""
+        from scipy.linalg.blas import dgemm
+        a = np.ascontiguousarray(np.vstack([add, remove]))
+        b = np.ascontiguousarray(np.vstack([add, -remove]))
+        if self.cross.flags.c_contiguous:
+            # The update is symmetric, so the C-ordered matrix can be handed to BLAS as its (Fortran) transpose
+            dgemm(1.0, a, b, beta=1.0, c=self.cross.T, trans_a=1, overwrite_c=1)
+        else:
+            self.cross += a.T @ b
+
+    def correlation(self, symbols=None):
+        """Correlation matrix (DataFrame) of 'symbols'; NaN for unknown symbols or short histories."""
+        symbols = list(self.symbols if symbols is None else symbols)
+        position = {s: i for i, s in enumerate(self.symbols)}
+        known = np.array([s in position for s in symbols], dtype=bool)
+        idx = np.array([position.get(s, 0) for s in symbols], dtype=int)
+        n = len(self.dates)
+        out = np.full((len(symbols), len(symbols)), np.nan)
+        if n > 1 and known.any():
+            mean = self.sums[idx] / n
+            cov = self.cross[np.ix_(idx, idx)] / n - np.outer(mean, mean)
+            std = np.sqrt(np.clip(np.diag(cov), 0, None))
+            with np.errstate(invalid='ignore', divide='ignore'):
+                corr = cov / np.outer(std, std)
+            ok = known & (self.counts[idx] >= MIN_OBS) & (std > 0)
+            corr[~ok, :] = np.nan
+            corr[:, ~ok] = np.nan
+            out = np.clip(corr, -1, 1)
+            np.fill_diagonal(out, 1.0)
+        return pd.DataFrame(out, index=symbols, columns=symbols)
+
+def history_closes(symbols):
+    """(date x symbol) closes from the per-symbol history store."""
+    frames = {s: history_store.load_history(s) for s in symbols}
+    closes = {s: df.set_index('Date')['Close'] for s, df in frames.items() if not df.empty}
+    return pd.DataFrame(closes).sort_index() if closes else pd.DataFrame()
+
+def update_correlations(close, passed, cache_path=None, out_path=None):
+    """
+    After a scan: fold today's closes into the cache and publish the
+    correlation matrix of the passing symbols. Returns the update kind.
+    """
+    cache = CorrelationCache.load(cache_path)
+    kind = cache.update(close) if not close.empty else 'unchanged'
+    cache.save(cache_path)
+    corr = cache.correlation(passed).astype(np.float32)
+    out_path = out_path or CORRELATION_FILE
+    tmp_path = out_path + '.tmp'
+    corr.rename_axis('Symbol').to_parquet(tmp_path)
+    os.replace(tmp_path, out_path)
+    return kind
+
+def load_correlation(path=None):
+    """Published correlation matrix of the passing candidates (None if absent)."""
+    path = path or CORRELATION_FILE
+    if not os.path.exists(path):
+        return None
+    return pd.read_parquet(path)
+
+def select_diversified(candidates, corr, n=TOP_N, max_corr=MAX_CORR, rank_by='Volume', method='greedy'):
+    """
+    Up to n rows of 'candidates' in descending 'rank_by' order, diversified by 'corr'.
+    greedy : take the next-ranked name unless its |correlation| with a pick so
+             far exceeds max_corr (the cap holds for every pair of picks).
+    cluster: average-linkage clusters cut at distance 1 - max_corr; the
+             best-ranked name of each cluster, clusters in rank order.
+    Unknown correlations (short history, not in the matrix) count as 0.
+    Adds Max_Corr: highest |correlation| with the picks ranked above.
+    """
+    ranked = candidates.sort_values(rank_by, ascending=False, kind='stable') if rank_by in candidates.columns else candidates
+    symbols = ranked['Symbol'].tolist()
+    if corr is None or not len(symbols):
+        return ranked.head(n).assign(Max_Corr=np.nan)
+    c = np.abs(corr.reindex(index=symbols, columns=symbols).to_numpy(dtype=float))
+    c = np.nan_to_num(c, nan=0.0)
+    np.fill_diagonal(c, 0.0)
+
+    if method == 'cluster' and len(symbols) > 1:
+        from scipy.cluster.hierarchy import linkage, fcluster
+        from scipy.spatial.distance import squareform
+        distance = squareform(1 - c, checks=False)
+        labels = fcluster(linkage(distance, method='average'), t=1 - max_corr, criterion='distance')
+        _, first = np.unique(labels, return_index=True)
+        picks = np.sort(first)[:n]
+    else:
+        picks, worst = [], np.zeros(len(symbols))
+        for i in range(len(symbols)):
+            if worst[i] <= max_corr:
+                picks.append(i)
+                if len(picks) == n:
+                    break
+                worst = np.maximum(worst, c[i])
+        picks = np.array(picks, dtype=int)
+
+    selected = ranked.iloc[picks].copy()
+    sub = c[np.ix_(picks, picks)]
+    selected['Max_Corr'] = [round(float(sub[k, :k].max()), 3) if k else np.nan for k in range(len(picks))]
+    return selected
+
+if __name__ == "__main__":
+    import argparse
+    try:
+        from notifier import load_scan
+    except ImportError:
+        from logic.notifier import load_scan
+    parser = argparse.ArgumentParser(description="Diversified picks from the published scan")
+    parser.add_argument('--n', type=int, default=TOP_N)
+    parser.add_argument('--max-corr', type=float, default=MAX_CORR)
+    parser.add_argument('--rank-by', default='Volume', choices=['Volume', 'Confidence'])
+    parser.add_argument('--method', default='greedy', choices=['greedy', 'cluster'])
+    args = parser.parse_args()
+    scan = load_scan()
+    if scan is None:
+        print("No market scan found.")
+    else:
+        passing = scan[scan['Passed'] == True]
+        picks = select_diversified(passing, load_correlation(), args.n, args.max_corr, args.rank_by, args.method)
+        print(picks[['Symbol', 'Close', 'Volume', 'Confidence', 'Max_Corr']].to_string(index=False))
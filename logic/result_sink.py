@@ -0,0 +1,165 @@
+"""
+Streaming result sink for market scans.
+Rows are appended to a SQLite table (WAL mode) as each symbol completes, so
+readers always see a consistent snapshot of the scan in progress. When the
+scan finishes the compact market_scan.csv (plus a typed market_scan.parquet)
+and fii_stats.json are published with an atomic rename, so no reader ever
+parses a half-written file.
+"""
+import os
+import json
+import sqlite3
+import threading
+from datetime import datetime
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+SCAN_DB = os.path.join(DATA_DIR, 'scan.db')
+SCAN_FILE = os.path.join(DATA_DIR, 'market_scan.csv')
+SCAN_PARQUET = os.path.join(DATA_DIR, 'market_scan.parquet')
+FII_FILE = os.path.join(DATA_DIR, 'fii_stats.json')
+KEEP_SCANS = 5
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS scans (
+    scan_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started TEXT NOT NULL,
+    finished TEXT,
+    total INTEGER,
+    status TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS results (
+    scan_id INTEGER NOT NULL,
+    symbol TEXT NOT NULL,
+    row TEXT NOT NULL,
+    PRIMARY KEY (scan_id, symbol)
+);
+"""
+
+def _connect(db_path):
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=10, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(_SCHEMA)
+    return conn
+
+def _jsonable(value):
+    """Plain Python scalars for numpy / pandas values."""
+    if hasattr(value, 'item'):
+        return value.item()
+    return value
+
+def atomic_write_csv(df, path):
+    tmp_path = path + '.tmp'
+    df.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+def atomic_write_parquet(df, path):
+    tmp_path = path + '.tmp'
+    df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+def atomic_write_json(obj, path):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(obj, f)
+    os.replace(tmp_path, path)
+
+class ResultSink:
+    """Append-only store for one scan's result rows."""
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or SCAN_DB
+        self.conn = _connect(self.db_path)
+        self.lock = threading.Lock()
+        self.scan_id = None
+
+    def start(self, total):
+        """Open a new scan and return its id."""
+        with self.lock, self.conn:
+            cur = self.conn.execute(
+                "INSERT INTO scans (started, total, status) VALUES (?, ?, 'running')",
+                (datetime.now().isoformat(timespec='seconds'), total))
+            self.scan_id = cur.lastrowid
+        return self.scan_id
+
+    def write(self, row):
+        """Append one completed result row (committed immediately)."""
+        payload = json.dumps({k: _jsonable(v) for k, v in row.items()})
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO results (scan_id, symbol, row) VALUES (?, ?, ?)",
+                (self.scan_id, row['Symbol'], payload))
+
+    def write_many(self, rows):
+        """Append or replace several rows in one transaction."""
+        payloads = [(self.scan_id, row['Symbol'], json.dumps({k: _jsonable(v) for k, v in row.items()})) for row in rows]
+        with self.lock, self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO results (scan_id, symbol, row) VALUES (?, ?, ?)", payloads)
+
+    def rows(self):
+        with self.lock:
+            cur = self.conn.execute("SELECT row FROM results WHERE scan_id = ? ORDER BY rowid", (self.scan_id,))
+            return [json.loads(r[0]) for r in cur.fetchall()]
+
+    def publish(self, fii_stats, scan_file=None, fii_file=None, parquet_file=None):
+        """
+        Write the compact CSV / Parquet / JSON atomically and mark the scan
+        complete. fii_stats=None leaves the FII file as it is.
+        """
+        import pandas as pd
+        df = pd.DataFrame(self.rows())
+        atomic_write_parquet(df, parquet_file or SCAN_PARQUET)
+        atomic_write_csv(df, scan_file or SCAN_FILE)
+        if fii_stats is not None:
+            atomic_write_json(fii_stats, fii_file or FII_FILE)
+        with self.lock, self.conn:
+            self.conn.execute("UPDATE scans SET finished = ?, status = 'complete' WHERE scan_id = ?",
+                              (datetime.now().isoformat(timespec='seconds'), self.scan_id))
+            # Keep only the most recent scans in the live table
+            self.conn.execute("DELETE FROM results WHERE scan_id <= ?", (self.scan_id - KEEP_SCANS,))
+            self.conn.execute("DELETE FROM scans WHERE scan_id <= ?", (self.scan_id - KEEP_SCANS,))
+        return df
+
+    def fail(self):
+        """Mark the open scan 'failed' (it stopped before publish), so it no longer reads as running."""
+        with self.lock, self.conn:
+            self.conn.execute("UPDATE scans SET finished = ?, status = 'failed' WHERE scan_id = ? AND status = 'running'",
+                              (datetime.now().isoformat(timespec='seconds'), self.scan_id))
+
+    def close(self):
+        self.conn.close()
+
+def read_progress(db_path=None):
+    """
+    Snapshot of the latest scan: dict with scan_id, status, started, total
+    and done (rows written so far). None if no scan has been recorded.
+    """
+    db_path = db_path or SCAN_DB
+    if not os.path.exists(db_path):
+        return None
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, timeout=5)
+    try:
+        row = conn.execute("SELECT scan_id, status, started, total FROM scans ORDER BY scan_id DESC LIMIT 1").fetchone()
+        if row is None:
+            return None
+        done = conn.execute("SELECT COUNT(*) FROM results WHERE scan_id = ?", (row[0],)).fetchone()[0]
+        return {'scan_id': row[0], 'status': row[1], 'started': row[2], 'total': row[3], 'done': done}
+    except sqlite3.Error:
+        return None
+    finally:
+        conn.close()
+
+def read_partial_results(db_path=None):
+    """Rows written so far by the latest scan (consistent snapshot)."""
+    import pandas as pd
+    db_path = db_path or SCAN_DB
+    progress = read_progress(db_path)
+    if progress is None:
+        return pd.DataFrame()
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, timeout=5)
+    try:
+        rows = conn.execute("SELECT row FROM results WHERE scan_id = ? ORDER BY rowid", (progress['scan_id'],)).fetchall()
+    finally:
+        conn.close()
+    return pd.DataFrame([json.loads(r[0]) for r in rows])
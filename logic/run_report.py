@@ -0,0 +1,297 @@
+"""
+Per-run instrumentation for the screener.
+A RunRecorder is made active for the duration of a scan. Code anywhere in the
+pipeline marks work with run_report.stage('fetch') or run_report.drop(reason).
+These are no-ops when no recorder is active. The active recorder and the
+current symbol live in context variables, which asyncio.to_thread copies
+into the fetch workers, so timings attribute to the right symbol without
+threading arguments through every call.
+
+The report (data/run_report.json) holds per-stage totals and percentiles,
+per-symbol timings, retry counts, drop reasons and the drop-out funnel.
+A cProfile (per worker thread and merged before Python 3.12, process-wide
+from 3.12) or pyinstrument capture can be taken behind a flag.
+"""
+import os
+import io
+import sys
+import json
+import time
+import threading
+import contextlib
+import contextvars
+from datetime import datetime
+try:
+    from result_sink import atomic_write_json
+except ImportError:
+    from logic.result_sink import atomic_write_json
+
+# cProfile hooks one thread at a time before Python 3.12 (sys.setprofile), all threads after (sys.monitoring)
+THREAD_PROFILES = sys.version_info < (3, 12)
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+REPORT_FILE = os.path.join(DATA_DIR, 'run_report.json')
+PROFILE_FILE = os.path.join(DATA_DIR, 'run_profile')
+STAGES = ['fetch', 'store', 'parse', 'indicators', 'scoring', 'save']
+# Drop reasons in pipeline order, each with the funnel step left after it
+DROP_REASONS = ['fetch_failed', 'empty_history', 'missing_columns', 'too_few_bars', 'error']
+FUNNEL_STEPS = ['fetched', 'with history', 'with OHLC columns', 'enough bars', 'scored']
+
+_recorder = contextvars.ContextVar('run_recorder', default=None)
+_symbol = contextvars.ContextVar('run_symbol', default=None)
+
+@contextlib.contextmanager
+def stage(name):
+    """Time a block as stage 'name' for the current symbol (no-op without a recorder)."""
+    recorder = _recorder.get()
+    if recorder is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        recorder.add_time(name, time.perf_counter() - start, _symbol.get())
+
+def drop(reason, detail=None, symbol=None):
+    """Record why a symbol (default: the current one) produced no result row."""
+    recorder = _recorder.get()
+    if recorder is not None:
+        recorder.mark(symbol or _symbol.get(), reason, detail)
+
+def mark(status, detail=None, symbol=None):
+    """Record a non-drop status for a symbol (e.g. 'cached')."""
+    drop(status, detail, symbol)
+
+def merge(durations):
+    """Fold stage timings recorded elsewhere (e.g. a worker process's recorder) into the active one."""
+    recorder = _recorder.get()
+    if recorder is not None:
+        for name, values in durations.items():
+            for seconds in values:
+                recorder.add_time(name, seconds)
+
+class RunRecorder:
+    """
+    Usage:
+        recorder = RunRecorder(source='history')
+        with recorder.activate(profile='cprofile'):
+            scheduler.run(universe, recorder.task(fetch_fn), ...)
+        recorder.finish(universe, results, scheduler=scheduler, failed=failed)
+        recorder.save(); print(recorder.summary())
+    """
+
+    def __init__(self, **meta):
+        self.meta = meta
+        self.lock = threading.Lock()
+        self.started = datetime.now()
+        self.start_clock = time.perf_counter()
+        self.durations = {}      # stage -> list of seconds
+        self.symbols = {}        # symbol -> {stage: seconds, 'status': ..., 'detail': ...}
+        self.profile_mode = None
+        self.profiles = []
+        self.thread_profiles = threading.local()
+        self.profiled_thread = None   # thread whose cProfile runs for the whole scan
+        self.report = None
+
+    def add_time(self, name, seconds, symbol=None):
+        with self.lock:
+            self.durations.setdefault(name, []).append(seconds)
+            if symbol is not None:
+                entry = self.symbols.setdefault(symbol, {})
+                entry[name] = entry.get(name, 0.0) + seconds
+
+    def mark(self, symbol, status, detail=None):
+        if symbol is None:
+            return
+        with self.lock:
+            entry = self.symbols.setdefault(symbol, {})
+            entry['status'] = status
+            if detail:
+                entry['detail'] = str(detail)[:200]
+
+    @contextlib.contextmanager
+    def activate(self, profile=None):
+        """Make this the active recorder; profile='cprofile' | 'pyinstrument' also captures a profile."""
+        token = _recorder.set(self)
+        self.profile_mode = profile
+        profiler = self._start_profile(profile)
+        try:
+            yield self
+        finally:
+            self._stop_profile(profiler)
+            _recorder.reset(token)
+
+    def task(self, fn):
+        """
+        Wrap a per-symbol scheduler task: sets the current symbol (and, on a
+        worker thread before Python 3.12, that thread's profile). Tasks on the
+        thread that started the scan are already under its profiler: a nested
+        cProfile would unhook it. From 3.12 cProfile is process-wide (one per
+        process; a second raises), so the scan's profiler covers the workers.
+        """
+        def run(symbol):
+            token = _symbol.set(symbol)
+            try:
+                if (self.profile_mode == 'cprofile' and THREAD_PROFILES
+                        and threading.get_ident() != self.profiled_thread):
+                    return self._thread_profile().runcall(fn, symbol)
+                return fn(symbol)
+            finally:
+                _symbol.reset(token)
+        return run
+
+    # --- profiling ---
+
+    def _thread_profile(self):
+        import cProfile
+        prof = getattr(self.thread_profiles, 'profile', None)
+        if prof is None:
+            prof = self.thread_profiles.profile = cProfile.Profile()
+            with self.lock:
+                self.profiles.append(prof)
+        return prof
+
+    def _start_profile(self, mode):
+        if mode == 'cprofile':
+            import cProfile
+            prof = cProfile.Profile()
+            self.profiles.append(prof)
+            self.profiled_thread = threading.get_ident()
+            prof.enable()
+            return prof
+        if mode == 'pyinstrument':
+            try:
+                from pyinstrument import Profiler
+            except ImportError:
+                print("pyinstrument not installed (pip install pyinstrument). Profiling disabled.")
+                self.profile_mode = None
+                return None
+            # Samples the main thread: the bhavcopy path and scheduling; worker threads need cprofile
+            prof = Profiler(async_mode='disabled')
+            prof.start()
+            return prof
+        return None
+
+    def _stop_profile(self, profiler):
+        if profiler is None:
+            return
+        os.makedirs(DATA_DIR, exist_ok=True)
+        if self.profile_mode == 'cprofile':
+            import pstats
+            profiler.disable()
+            stats = pstats.Stats(self.profiles[0])
+            for prof in self.profiles[1:]:
+                stats.add(prof)
+            path = PROFILE_FILE + '.pstats'
+            stats.dump_stats(path)
+            out = io.StringIO()
+            pstats.Stats(path, stream=out).sort_stats('cumulative').print_stats(25)
+            print(out.getvalue())
+        else:
+            profiler.stop()
+            path = PROFILE_FILE + '.html'
+            with open(path, 'w') as f:
+                f.write(profiler.output_html())
+            print(profiler.output_text(unicode=True, color=False))
+        self.meta['profile'] = os.path.relpath(path, os.path.join(DATA_DIR, '..'))
+        print(f"Profile saved to {path}")
+
+    # --- report ---
+
+    def finish(self, universe, results, scheduler=None, failed=None):
+        """Assemble the run report from the recorded timings and the scan outcome."""
+        import numpy as np
+        failed = failed or {}
+        attempts = getattr(scheduler, 'attempts', {}) if scheduler is not None else {}
+        scored = set(results['Symbol']) if results is not None and len(results) else set()
+        with self.lock:
+            for symbol, reason in failed.items():
+                entry = self.symbols.setdefault(symbol, {})
+                entry['status'], entry['detail'] = 'fetch_failed', reason[:200]
+            for symbol in universe:
+                entry = self.symbols.setdefault(symbol, {})
+                if symbol in scored:
+                    entry['status'] = 'cached' if entry.get('status') == 'cached' else 'ok'
+                elif entry.get('status') in (None, 'ok', 'cached'):
+                    entry['status'] = 'error'
+                    entry.setdefault('detail', 'no result row')
+                if attempts.get(symbol, 1) > 1:
+                    entry['retries'] = attempts[symbol] - 1
+
+            stages = {}
+            for name in STAGES + sorted(set(self.durations) - set(STAGES)):
+                values = np.asarray(self.durations.get(name, []))
+                if values.size:
+                    stages[name] = {
+                        'total': round(float(values.sum()), 4), 'count': int(values.size),
+                        'mean_ms': round(float(values.mean()) * 1000, 3),
+                        'p50_ms': round(float(np.percentile(values, 50)) * 1000, 3),
+                        'p95_ms': round(float(np.percentile(values, 95)) * 1000, 3),
+                        'max_ms': round(float(values.max()) * 1000, 3),
+                    }
+
+            statuses = [self.symbols.get(s, {}).get('status') for s in universe]
+            drops = {r: statuses.count(r) for r in DROP_REASONS if statuses.count(r)}
+            funnel, remaining = [{'step': 'universe', 'count': len(universe)}], len(universe)
+            for reason, step in zip(DROP_REASONS, FUNNEL_STEPS):
+                remaining -= drops.get(reason, 0)
+                funnel.append({'step': step, 'count': remaining})
+            funnel.append({'step': 'saved', 'count': len(scored)})
+
+            per_symbol = {
+                s: {k: (round(v * 1000, 2) if isinstance(v, float) else v) for k, v in entry.items()}
+                for s, entry in sorted(self.symbols.items())
+            }
+            totals = {s: sum(v for k, v in entry.items() if k in self.durations and isinstance(v, float))
+                      for s, entry in self.symbols.items()}
+
+        self.report = {
+            'started': self.started.isoformat(timespec='seconds'),
+            'finished': datetime.now().isoformat(timespec='seconds'),
+            'duration_s': round(time.perf_counter() - self.start_clock, 3),
+            **self.meta,
+            'universe': len(universe),
+            'saved': len(scored),
+            'cached': statuses.count('cached'),
+            'stages': stages,
+            'fetch': {k: round(v, 3) if isinstance(v, float) else v for k, v in scheduler.stats.items()} if scheduler is not None else {},
+            'retried_symbols': sum(1 for s in universe if attempts.get(s, 1) > 1),
+            'drops': drops,
+            'funnel': funnel,
+            'failures': {s: e.get('detail', e['status']) for s, e in sorted(self.symbols.items())
+                         if e.get('status') in DROP_REASONS},
+            'slowest': [{'symbol': s, 'ms': round(t * 1000, 1)}
+                        for s, t in sorted(totals.items(), key=lambda kv: -kv[1])[:10]],
+            'symbols': per_symbol,   # per-symbol stage timings in ms
+        }
+        return self.report
+
+    def save(self, path=None):
+        atomic_write_json(self.report, path or REPORT_FILE)
+
+    def summary(self):
+        """Plain-text summary table of the report."""
+        r = self.report
+        lines = [f"Run report: {r['duration_s']:.1f}s, {r['saved']}/{r['universe']} symbols saved "
+                 f"({r['cached']} from cache), {r['retried_symbols']} retried",
+                 f"{'stage':<12} {'total s':>9} {'count':>7} {'mean ms':>9} {'p95 ms':>9} {'max ms':>9}"]
+        for name, s in r['stages'].items():
+            lines.append(f"{name:<12} {s['total']:>9.2f} {s['count']:>7} {s['mean_ms']:>9.1f} {s['p95_ms']:>9.1f} {s['max_ms']:>9.1f}")
+        if r['fetch']:
+            f = r['fetch']
+            lines.append(f"Fetch: {f['requests']} requests, {f['errors']} errors, {f['retries']} retries, "
+                         f"{f.get('wait_s', 0):.1f}s waiting on concurrency / rate limits")
+        lines.append("Funnel: " + " -> ".join(f"{f['step']} {f['count']}" for f in r['funnel']))
+        if r['drops']:
+            lines.append("Drops: " + ", ".join(f"{k} {v}" for k, v in r['drops'].items()))
+            for symbol, detail in list(r['failures'].items())[:5]:
+                lines.append(f"  {symbol}: {detail}")
+        return "\n".join(lines)
+
+def load_report(path=None):
+    """Last saved run report (None if no scan has written one)."""
+    path = path or REPORT_FILE
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
@@ -0,0 +1,94 @@
+"""
+Historical scan archive.
+Every published scan is appended as one Parquet partition per trading date
+(data/archive/date=YYYY-MM-DD/scan.parquet, rows sorted by Symbol). Queries go
+through pyarrow.dataset, so date filters prune whole partitions, symbol filters
+use row-group statistics and only the requested columns are read. pyarrow is
+imported on the first read or write; listing archived dates needs only os.
+"""
+import os
+import pandas as pd
+
+ARCHIVE_DIR = os.path.join(os.path.dirname(__file__), '..', 'data', 'archive')
+
+def _day(value):
+    return pd.Timestamp(value).strftime('%Y-%m-%d')
+
+def append_scan(df, session_date):
+    """Store one scan as the partition for 'session_date' (re-runs replace it)."""
+    if df is None or df.empty:
+        return None
+    part_dir = os.path.join(ARCHIVE_DIR, f"date={_day(session_date)}")
+    os.makedirs(part_dir, exist_ok=True)
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    table = pa.Table.from_pandas(df.sort_values('Symbol').reset_index(drop=True), preserve_index=False)
+    path = os.path.join(part_dir, 'scan.parquet')
+    pq.write_table(table, path + '.tmp', row_group_size=128)
+    os.replace(path + '.tmp', path)
+    return path
+
+def archived_dates():
+    """All archived session dates, oldest first."""
+    if not os.path.isdir(ARCHIVE_DIR):
+        return []
+    return sorted(d[len('date='):] for d in os.listdir(ARCHIVE_DIR) if d.startswith('date='))
+
+def _dataset():
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    return ds.dataset(ARCHIVE_DIR, format='parquet', partitioning=ds.partitioning(pa.schema([('date', pa.string())]), flavor='hive'))
+
+def query(columns=None, symbols=None, start=None, end=None, where=None):
+    """
+    Generic archive query returning a DataFrame with a 'date' column.
+    columns: subset to read (pruned at the file level); symbols: list filter;
+    start / end: inclusive session-date bounds; where: extra pyarrow expression.
+    """
+    if not archived_dates():
+        return pd.DataFrame()
+    import pyarrow.dataset as ds
+    expr = None
+    for clause in (
+        ds.field('date') >= _day(start) if start is not None else None,
+        ds.field('date') <= _day(end) if end is not None else None,
+        ds.field('Symbol').isin(list(symbols)) if symbols is not None else None,
+        where,
+    ):
+        if clause is not None:
+            expr = clause if expr is None else expr & clause
+    if columns is not None:
+        columns = ['date'] + [c for c in columns if c != 'date']
+    table = _dataset().to_table(columns=columns, filter=expr)
+    df = table.to_pandas()
+    if 'date' in df.columns:
+        df['date'] = pd.to_datetime(df['date'])
+        df = df.sort_values('date').reset_index(drop=True)
+    return df
+
+def symbol_series(symbol, columns=('Confidence', 'ADX'), sessions=90):
+    """Per-session values of 'columns' for one symbol over the last N archived sessions."""
+    dates = archived_dates()[-sessions:]
+    if not dates:
+        return pd.DataFrame()
+    return query(columns=['Symbol'] + list(columns), symbols=[symbol], start=dates[0])
+
+def pass_streaks(sessions=30):
+    """
+    Current consecutive-session 'Passed' streak per symbol, looking back at
+    most 'sessions' archived sessions. Returns a Series indexed by Symbol.
+    """
+    dates = archived_dates()[-sessions:]
+    if not dates:
+        return pd.Series(dtype=int)
+    df = query(columns=['Symbol', 'Passed'], start=dates[0])
+    passed = df.pivot_table(index='date', columns='Symbol', values='Passed', aggfunc='last')
+    passed = passed.reindex(pd.to_datetime(dates)).fillna(False).astype(bool)
+    # Count trailing True values per column
+    failed_since = (~passed).iloc[::-1].cumsum()
+    return (failed_since == 0).sum().astype(int).sort_values(ascending=False)
+
+def passed_in_a_row(n):
+    """Symbols that passed in each of the last n archived sessions."""
+    streaks = pass_streaks(sessions=n)
+    return streaks[streaks >= n].index.tolist()
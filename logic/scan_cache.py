@@ -0,0 +1,86 @@
+"""
+Content-addressed cache for per-symbol scan results.
+A result row is keyed by (symbol, last bar date, scoring version), so a re-run
+on the same trading day only recomputes symbols whose inputs or scoring
+parameters changed. Entries are evicted by age and by total count.
+"""
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+import pandas as pd
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+CACHE_DB = os.path.join(DATA_DIR, 'scan_cache.db')
+MAX_AGE_DAYS = 14
+MAX_ENTRIES = 20000
+
+def scoring_version(params):
+    """Short stable hash of the scoring parameters."""
+    payload = json.dumps(params, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:12]
+
+def cache_key(symbol, last_bar, version):
+    day = pd.Timestamp(last_bar).strftime('%Y-%m-%d')
+    return hashlib.sha1(f"{symbol}|{day}|{version}".encode('utf-8')).hexdigest()
+
+def _jsonable(value):
+    return value.item() if hasattr(value, 'item') else value
+
+class ScanCache:
+    """
+    Usage:
+        cache = ScanCache(version=scoring_version(SCORING_PARAMS))
+        row = cache.get(symbol, last_bar)      # None on miss (or when force=True)
+        cache.put(symbol, last_bar, row)
+    """
+
+    def __init__(self, version, db_path=None, force=False, max_age_days=MAX_AGE_DAYS, max_entries=MAX_ENTRIES):
+        self.version = version
+        self.force = force
+        self.db_path = db_path or CACHE_DB
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self.conn = sqlite3.connect(self.db_path, timeout=10, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, symbol TEXT NOT NULL, "
+            "created REAL NOT NULL, row TEXT NOT NULL)")
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evict(max_age_days, max_entries)
+
+    def get(self, symbol, last_bar):
+        if self.force or last_bar is None or pd.isna(last_bar):
+            self.misses += 1
+            return None
+        with self.lock:
+            found = self.conn.execute("SELECT row FROM results WHERE key = ?",
+                                      (cache_key(symbol, last_bar, self.version),)).fetchone()
+        if found is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(found[0])
+
+    def put(self, symbol, last_bar, row):
+        if row is None or last_bar is None or pd.isna(last_bar):
+            return
+        payload = json.dumps({k: _jsonable(v) for k, v in row.items()})
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO results (key, symbol, created, row) VALUES (?, ?, ?, ?)",
+                              (cache_key(symbol, last_bar, self.version), symbol, time.time(), payload))
+
+    def evict(self, max_age_days=MAX_AGE_DAYS, max_entries=MAX_ENTRIES):
+        """Drop entries older than max_age_days, then the oldest beyond max_entries."""
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM results WHERE created < ?", (time.time() - max_age_days * 86400,))
+            self.conn.execute(
+                "DELETE FROM results WHERE key IN (SELECT key FROM results ORDER BY created DESC LIMIT -1 OFFSET ?)",
+                (max_entries,))
+
+    def close(self):
+        print(f"Scan cache: {self.hits} hits, {self.misses} misses.")
+        self.conn.close()
@@ -0,0 +1,484 @@
+"""
+Local HTTP service over the published scan and the history archive.
+The dashboard, the notifier and internal tools can query one in-memory copy
+instead of each re-parsing data/market_scan.csv:
+
+  GET /scan              filtered, sorted, paginated rows of the latest scan
+  GET /scan/<SYMBOL>     one symbol's row
+  GET /history           archived rows (with a 'date' column), same options plus start / end
+  GET /history/dates     archived session dates
+  GET /streaks           current consecutive-session Passed streaks (?sessions=30&min=1)
+  GET /health            data versions and row counts
+
+Query options: passed=true|false, min_confidence=60, symbol=TCS,INFY,
+start / end (history, inclusive), columns=Symbol,Close, sort=-Volume,Symbol
+('-' for descending), limit (default 100, at most 10,000) / offset, and
+format=json|arrow (or Accept: application/vnd.apache.arrow.stream). JSON
+bodies carry total / offset / limit next to the rows; every response also
+has them in X-Total-Count / X-Offset / X-Limit headers.
+
+Each table keeps per-column sort orders and a symbol -> rows map, so a
+filtered page is a boolean mask and a slice rather than a sort. A watcher
+thread polls the published files and archive partitions and swaps in a
+fresh index when a new scan lands (only new or rewritten partitions are
+read); requests never wait on a reload. ETags come from the data version
+and the normalized query, so a poll with If-None-Match is answered 304
+without touching the data, and recently rendered bodies are reused.
+
+Usage: python -m logic.scan_server [--host 127.0.0.1] [--port 8765] [--poll 2]
+"""
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs, urlencode
+import numpy as np
+import pandas as pd
+try:
+    import result_sink
+    import scan_archive
+except ImportError:
+    from logic import result_sink
+    from logic import scan_archive
+
+HOST = '127.0.0.1'
+PORT = 8765
+POLL_SECONDS = 2.0
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 10000
+BODY_CACHE = 256          # rendered responses kept (keyed by ETag, so stale ones just age out)
+ARROW_TYPE = 'application/vnd.apache.arrow.stream'
+CSV_NEWER_SECONDS = 60    # a publish writes Parquet then CSV moments apart; a much newer CSV is from an older scanner
+
+def file_version(path):
+    """Changes whenever the file is replaced (atomic publish) or rewritten."""
+    st = os.stat(path)
+    return f"{st.st_mtime_ns:x}-{st.st_size:x}"
+
+class ScanTable:
+    """
+    One immutable, queryable frame (the latest scan, or the archive with a
+    'date' column in date order, plus its archived sessions). A reload builds
+    a new table; readers keep whichever table they started with.
+    """
+
+    def __init__(self, df, version, sessions=()):
+        self.df = df.reset_index(drop=True)
+        self.version = version
+        self.sessions = list(sessions)
+        columns = self.df.columns
+        self.symbol_rows = self.df.groupby('Symbol', sort=False).indices if 'Symbol' in columns else {}
+        self.passed = (self.df['Passed'] == True).to_numpy() if 'Passed' in columns else None
+        self.confidence = (pd.to_numeric(self.df['Confidence'], errors='coerce').to_numpy(dtype=float)
+                           if 'Confidence' in columns else None)
+        self.dates = self.df['date'].to_numpy(dtype=str) if 'date' in columns else None
+        self._orders = {}
+
+    def __len__(self):
+        return len(self.df)
+
+    def _order(self, column, descending):
+        """Row positions sorted by one column (stable, missing values last); computed once per table."""
+        key = (column, descending)
+        if key not in self._orders:
+            ordered = self.df[column].sort_values(ascending=not descending, kind='stable', na_position='last')
+            self._orders[key] = ordered.index.to_numpy()
+        return self._orders[key]
+
+    def select(self, q):
+        """(total matching rows, requested page) for a parsed query."""
+        n = len(self.df)
+        for column in [key.lstrip('-') for key in q['sort']] + (q['columns'] or []):
+            if column not in self.df.columns:
+                raise ValueError(f"Unknown column: {column}")
+        mask = np.ones(n, dtype=bool)
+        if q['symbols'] is not None:
+            mask[:] = False
+            for symbol in q['symbols']:
+                mask[self.symbol_rows.get(symbol, [])] = True
+        if q['passed'] is not None:
+            if self.passed is None:
+                raise ValueError("This table has no Passed column")
+            mask &= self.passed == q['passed']
+        if q['min_confidence'] is not None:
+            if self.confidence is None:
+                raise ValueError("This table has no Confidence column")
+            mask &= self.confidence >= q['min_confidence']
+        if self.dates is not None and (q['start'] or q['end']):
+            lo = np.searchsorted(self.dates, q['start'], 'left') if q['start'] else 0
+            hi = np.searchsorted(self.dates, q['end'], 'right') if q['end'] else n
+            mask[:lo] = False
+            mask[hi:] = False
+
+        if not q['sort']:
+            order = np.flatnonzero(mask)
+        elif len(q['sort']) == 1:
+            key = q['sort'][0]
+            order = self._order(key.lstrip('-'), key.startswith('-'))
+            order = order[mask[order]]
+        else:
+            keys = [key.lstrip('-') for key in q['sort']]
+            ascending = [not key.startswith('-') for key in q['sort']]
+            order = self.df[mask].sort_values(keys, ascending=ascending, kind='stable', na_position='last').index.to_numpy()
+
+        page = self.df.iloc[order[q['offset']:q['offset'] + q['limit']]]
+        if q['columns']:
+            # Archived rows keep their session date, as in scan_archive.query
+            dated = self.dates is not None and 'date' not in q['columns']
+            page = page[(['date'] if dated else []) + q['columns']]
+        return len(order), page
+
+EMPTY = ScanTable(pd.DataFrame(columns=['Symbol']), 'none')
+
+def parse_query(params, history=False):
+    """Normalized query from parse_qs() output; raises ValueError on a bad parameter."""
+    def one(name):
+        values = params.get(name)
+        return values[-1].strip() if values else None
+
+    def listed(name):
+        values = params.get(name)
+        return [v.strip() for v in ",".join(values).split(",") if v.strip()] if values else None
+
+    q = {'passed': None, 'min_confidence': None, 'start': None, 'end': None}
+    passed = one('passed')
+    if passed is not None:
+        if passed.lower() not in ('true', 'false', '1', '0'):
+            raise ValueError(f"passed must be true or false, not {passed!r}")
+        q['passed'] = passed.lower() in ('true', '1')
+    if one('min_confidence') is not None:
+        try:
+            q['min_confidence'] = float(one('min_confidence'))
+        except ValueError:
+            raise ValueError(f"min_confidence must be a number, not {one('min_confidence')!r}")
+    symbols = listed('symbol')
+    q['symbols'] = sorted({s.upper() for s in symbols}) if symbols is not None else None
+    q['columns'] = listed('columns')
+    q['sort'] = listed('sort') or []
+    for name in ('limit', 'offset'):
+        value = one(name)
+        try:
+            q[name] = int(value) if value is not None else (DEFAULT_LIMIT if name == 'limit' else 0)
+        except ValueError:
+            raise ValueError(f"{name} must be an integer, not {value!r}")
+    if not 0 < q['limit'] <= MAX_LIMIT or q['offset'] < 0:
+        raise ValueError(f"limit must be 1-{MAX_LIMIT} and offset >= 0")
+    if history:
+        for name in ('start', 'end'):
+            if one(name):
+                try:
+                    q[name] = pd.Timestamp(one(name)).strftime('%Y-%m-%d')
+                except ValueError:
+                    raise ValueError(f"{name} must be a date, not {one(name)!r}")
+    return q
+
+def render(meta, page, fmt):
+    """(content type, body) for a page of rows."""
+    if fmt == 'arrow':
+        import pyarrow as pa
+        table = pa.Table.from_pandas(page, preserve_index=False)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return ARROW_TYPE, sink.getvalue().to_pybytes()
+    rows = page.to_json(orient='records', date_format='iso')
+    # Splice in the records pandas already serialized rather than decoding and re-encoding them
+    return 'application/json', (json.dumps(meta)[:-1] + ', "rows": ' + rows + '}').encode('utf-8')
+
+def etag_matches(header, etag):
+    if not header:
+        return False
+    tags = [t.strip() for t in header.split(',')]
+    return '*' in tags or etag in tags or f"W/{etag}" in tags
+
+class ScanService:
+    """
+    Usage:
+        service = ScanService()
+        service.refresh()                      # load the published scan and archive
+        service.start_watcher()                # hot-reload when new files land
+        status, headers, body = service.respond('/scan', 'passed=true&sort=-Volume', if_none_match=etag)
+    """
+
+    def __init__(self, poll=POLL_SECONDS):
+        self.poll = poll
+        self.scan = EMPTY
+        self.history = EMPTY
+        self.scan_source = None
+        self.partitions = {}          # date -> (file version, frame)
+        self.loaded = None
+        self.reload_lock = threading.Lock()
+        self.cache_lock = threading.Lock()
+        self.bodies = OrderedDict()
+        self.stop_event = threading.Event()
+        self.watcher = None
+
+    # --- loading ---
+
+    def _published(self):
+        """Path of the published scan: the typed Parquet file unless the CSV is clearly newer."""
+        parquet, csv = result_sink.SCAN_PARQUET, result_sink.SCAN_FILE
+        if os.path.exists(parquet) and not (os.path.exists(csv) and
+                                            os.path.getmtime(csv) > os.path.getmtime(parquet) + CSV_NEWER_SECONDS):
+            return parquet
+        return csv if os.path.exists(csv) else None
+
+    def _reload_scan(self):
+        path = self._published()
+        if path is None:
+            changed = self.scan is not EMPTY
+            self.scan, self.scan_source = EMPTY, None
+            return changed
+        version = file_version(path)
+        if version == self.scan.version:
+            return False
+        df = pd.read_parquet(path) if path.endswith('.parquet') else pd.read_csv(path)
+        self.scan, self.scan_source = ScanTable(df, version), path
+        return True
+
+    def _reload_history(self):
+        partitions = {}
+        for day in scan_archive.archived_dates():
+            path = os.path.join(scan_archive.ARCHIVE_DIR, f"date={day}", 'scan.parquet')
+            if not os.path.exists(path):
+                continue
+            version = file_version(path)
+            known = self.partitions.get(day)
+            partitions[day] = known if known and known[0] == version else (version, pd.read_parquet(path).assign(date=day))
+        if not partitions:
+            changed = self.history is not EMPTY
+            self.history = EMPTY
+            self.partitions = {}
+            return changed
+        version = hashlib.sha1(json.dumps([[d, v] for d, (v, _) in sorted(partitions.items())]).encode()).hexdigest()[:16]
+        if version == self.history.version:
+            return False
+        frames = [frame for _, (_, frame) in sorted(partitions.items())]
+        # Request threads only read self.history, so this one assignment swaps the archive atomically;
+        # self.partitions is reload bookkeeping, touched under reload_lock only
+        self.history = ScanTable(pd.concat(frames, ignore_index=True), version, sessions=sorted(partitions))
+        self.partitions = partitions
+        return True
+
+    def refresh(self):
+        """Re-read whatever changed on disk; returns the names of the reloaded tables."""
+        with self.reload_lock:
+            reloaded = [name for name, reload in (('scan', self._reload_scan), ('history', self._reload_history)) if reload()]
+            if reloaded:
+                self.loaded = datetime.now().isoformat(timespec='seconds')
+            return reloaded
+
+    def _watch(self):
+        while not self.stop_event.wait(self.poll):
+            try:
+                reloaded = self.refresh()
+                if reloaded:
+                    print(f"Reloaded {', '.join(reloaded)}: {len(self.scan)} scan rows, {len(self.history)} archived rows.")
+            except Exception as e:
+                # A file replaced mid-read; the current index stays up and the next poll retries
+                print(f"Reload failed: {e}")
+
+    def start_watcher(self):
+        self.watcher = threading.Thread(target=self._watch, name='scan-watcher', daemon=True)
+        self.watcher.start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    # --- requests ---
+
+    def _cached(self, etag, build):
+        with self.cache_lock:
+            if etag in self.bodies:
+                self.bodies.move_to_end(etag)
+                return self.bodies[etag]
+        entry = build()
+        with self.cache_lock:
+            self.bodies[etag] = entry
+            while len(self.bodies) > BODY_CACHE:
+                self.bodies.popitem(last=False)
+        return entry
+
+    def respond(self, path, query='', accept='', if_none_match=None):
+        """(status, headers, body) for a GET request."""
+        params = parse_qs(query)
+        route = path.rstrip('/') or '/'
+        try:
+            fmt = (params.get('format') or ['arrow' if ARROW_TYPE in (accept or '') else 'json'])[-1]
+            if fmt not in ('json', 'arrow'):
+                raise ValueError(f"format must be json or arrow, not {fmt!r}")
+            if route == '/health':
+                return self._json(200, self.health())
+            if route == '/scan':
+                table, q = self.scan, parse_query(params)
+            elif route.startswith('/scan/'):
+                table, q = self.scan, parse_query({**params, 'symbol': [route[len('/scan/'):]], 'limit': ['1']})
+            elif route == '/history':
+                table, q = self.history, parse_query(params, history=True)
+            elif route == '/history/dates':
+                table, q = self.history, None
+            elif route == '/streaks':
+                table, q = self.history, parse_query(params)
+                try:
+                    q['sessions'], q['min'] = int(params.get('sessions', [30])[-1]), int(params.get('min', [1])[-1])
+                except ValueError:
+                    raise ValueError("sessions and min must be integers")
+                if q['sessions'] < 1:
+                    raise ValueError("sessions must be at least 1")
+            else:
+                return self._json(404, {'error': f"Unknown path: {path}"})
+
+            normalized = json.dumps([route, fmt, q], sort_keys=True)
+            etag = '"' + hashlib.sha1(f"{table.version}|{normalized}".encode()).hexdigest()[:20] + '"'
+            if etag_matches(if_none_match, etag):
+                return 304, {'ETag': etag, 'Cache-Control': 'no-cache'}, b''
+            content_type, body, meta = self._cached(etag, lambda: self._build(route, table, q, fmt))
+        except ValueError as e:
+            return self._json(400, {'error': str(e)})
+        except Exception as e:
+            # Anything else is a server fault: answer it rather than dropping the connection
+            print(f"Request failed: {path}?{query}: {type(e).__name__}: {e}")
+            return self._json(500, {'error': f"{type(e).__name__}: {e}"})
+        if route.startswith('/scan/') and not meta['total']:
+            return self._json(404, {'error': f"{route[len('/scan/'):].upper()} is not in the latest scan"})
+        headers = {'Content-Type': content_type, 'ETag': etag, 'Cache-Control': 'no-cache',
+                   'X-Data-Version': table.version}
+        if 'total' in meta:
+            headers.update({'X-Total-Count': str(meta['total']), 'X-Offset': str(meta['offset']), 'X-Limit': str(meta['limit'])})
+        return 200, headers, body
+
+    def _build(self, route, table, q, fmt):
+        if route == '/history/dates':
+            meta = {'version': table.version}
+            page = pd.DataFrame({'date': table.sessions})
+        elif route == '/streaks':
+            streaks = self._streaks(table, q['sessions'])
+            streaks = streaks[streaks['Streak'] >= q['min']]
+            if q['symbols'] is not None:
+                streaks = streaks[streaks['Symbol'].isin(q['symbols'])]
+            meta = {'version': table.version, 'sessions': q['sessions'], 'total': len(streaks),
+                    'offset': q['offset'], 'limit': q['limit']}
+            page = streaks.iloc[q['offset']:q['offset'] + q['limit']]
+        else:
+            total, page = table.select(q)
+            meta = {'version': table.version, 'total': total, 'offset': q['offset'], 'limit': q['limit']}
+        content_type, body = render(meta, page, fmt)
+        return content_type, body, meta
+
+    def _streaks(self, table, sessions):
+        """Consecutive-session Passed streaks over the last 'sessions' archived dates (scan_archive.pass_streaks)."""
+        if not len(table) or table.passed is None:
+            return pd.DataFrame(columns=['Symbol', 'Streak'])
+        dates = table.sessions[-sessions:]
+        recent = table.df.loc[table.dates >= dates[0], ['date', 'Symbol']].assign(Passed=table.passed[table.dates >= dates[0]])
+        passed = recent.pivot_table(index='date', columns='Symbol', values='Passed', aggfunc='last')
+        passed = passed.reindex(dates).fillna(False).astype(bool)
+        failed_since = (~passed).iloc[::-1].cumsum()
+        streaks = (failed_since == 0).sum().astype(int).sort_values(ascending=False, kind='stable')
+        return streaks.rename_axis('Symbol').reset_index(name='Streak')
+
+    def health(self):
+        history = self.history
+        return {
+            'scan': {'version': self.scan.version, 'rows': len(self.scan),
+                     'source': os.path.basename(self.scan_source) if self.scan_source else None},
+            'history': {'version': history.version, 'rows': len(history), 'sessions': len(history.sessions)},
+            'loaded': self.loaded,
+        }
+
+    @staticmethod
+    def _json(status, payload):
+        return status, {'Content-Type': 'application/json', 'Cache-Control': 'no-store'}, json.dumps(payload).encode('utf-8')
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out in separate writes; without this, keep-alive clients wait on delayed ACKs
+    disable_nagle_algorithm = True
+    access_log = False
+
+    def log_message(self, *args):
+        if self.access_log:
+            super().log_message(*args)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        status, headers, body = self.server.service.respond(
+            url.path, url.query, self.headers.get('Accept', ''), self.headers.get('If-None-Match'))
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+class ScanServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, service):
+        super().__init__(address, Handler)
+        self.service = service
+
+class ScanClient:
+    """
+    Polling client that revalidates with If-None-Match:
+        client = ScanClient('http://127.0.0.1:8765')
+        df = client.get('/scan', passed='true', min_confidence=60, sort='-Volume', limit=10)
+    Repeating a query while the data is unchanged costs one 304 and returns
+    the frame from the previous call. Pages travel as Arrow IPC.
+    """
+
+    def __init__(self, base_url=f"http://{HOST}:{PORT}", timeout=10):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.cache = {}               # url -> (etag, frame)
+        self.not_modified = 0
+
+    def get(self, path, **params):
+        import urllib.request
+        import urllib.error
+        import pyarrow as pa
+        url = f"{self.base_url}{path}?{urlencode(sorted({**params, 'format': 'arrow'}.items()))}"
+        request = urllib.request.Request(url)
+        cached = self.cache.get(url)
+        if cached:
+            request.add_header('If-None-Match', cached[0])
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                etag, body = response.headers.get('ETag'), response.read()
+        except urllib.error.HTTPError as e:
+            if e.code == 304 and cached:
+                self.not_modified += 1
+                return cached[1]
+            raise
+        df = pa.ipc.open_stream(body).read_all().to_pandas()
+        self.cache[url] = (etag, df)
+        return df
+
+def serve(host=HOST, port=PORT, poll=POLL_SECONDS, access_log=False):
+    service = ScanService(poll=poll)
+    service.refresh()
+    service.start_watcher()
+    Handler.access_log = access_log
+    server = ScanServer((host, port), service)
+    print(f"Serving {len(service.scan)} scan rows and {len(service.history)} archived rows "
+          f"on http://{host}:{server.server_port} (checking for new scans every {poll:g}s)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.stop()
+        server.server_close()
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Local HTTP service over the latest scan and the history archive")
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--poll', type=float, default=POLL_SECONDS, help="Seconds between checks for a new scan")
+    parser.add_argument('--access-log', action='store_true', help="Log every request to stderr")
+    args = parser.parse_args()
+    serve(args.host, args.port, args.poll, args.access_log)
@@ -0,0 +1,294 @@
+"""
+Scan specs: several scans over different universes and timeframes in one pass.
+A spec file (YAML or JSON) lists scans:
+
+    scans:
+      - name: top500
+        universe: {top_turnover: 500}
+      - name: fno_weekly
+        universe: {fno: true}
+        timeframe: weekly
+      - name: banks
+        universe: {sectors: [Banks, NBFC]}          # data/sectors.csv (Symbol, Sector)
+      - name: watchlist_15m
+        universe: {watchlist: data/watchlist.txt}   # or {symbols: [RELIANCE, TCS]}
+        timeframe: 15min
+        bars: data/bars.csv                         # intraday bars (as logic.intraday)
+        params: {adx_max: 20}                       # optional scoring overrides
+
+Universe filters intersect, and top_turnover ranks what is left by the latest
+session's turnover. Timeframes are 'daily', 'weekly' or a pandas offset
+('15min', '1h') resampled from intraday bars. Each timeframe is scored with
+SCORING_PARAMS plus its TIMEFRAME_PARAMS (HV annualized over 52 weeks, or
+sessions x bars per session intraday) and the spec's own 'params'.
+An F&O universe needs the live F&O list, so it is an error offline.
+
+All scans share one pass: the Bhavcopy panel is built once for the longest
+lookback, the F&O and ban lists are fetched once, each timeframe's panel is
+derived once, and indicators are computed once per (timeframe, lookback)
+over the union of the scans' symbols. A symbol in several scans is fetched
+and scored once. Results go to data/scans/<name>.parquet (and .csv).
+"""
+import os
+import re
+import json
+import math
+import pandas as pd
+try:
+    from bhavcopy_panel import build_panel, PANEL_FIELDS
+    from nse_fetcher import get_fno_ban_list, get_fno_symbols
+    from screener import score_panel, SCORING_PARAMS, PERIOD_KEY
+    from result_sink import atomic_write_csv, atomic_write_parquet
+    from intraday import BAR_COLUMNS
+except ImportError:
+    from logic.bhavcopy_panel import build_panel, PANEL_FIELDS
+    from logic.nse_fetcher import get_fno_ban_list, get_fno_symbols
+    from logic.screener import score_panel, SCORING_PARAMS, PERIOD_KEY
+    from logic.result_sink import atomic_write_csv, atomic_write_parquet
+    from logic.intraday import BAR_COLUMNS
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+SPEC_FILE = os.path.join(DATA_DIR, 'scans.yaml')
+SECTOR_FILE = os.path.join(DATA_DIR, 'sectors.csv')
+SCANS_DIR = os.path.join(DATA_DIR, 'scans')
+
+# Lookback in sessions (daily) or weeks (weekly) when a spec gives none
+DEFAULT_LOOKBACK = {'daily': 60, 'weekly': 52}
+UNIVERSE_KEYS = {'top_turnover', 'fno', 'sectors', 'symbols', 'watchlist', 'include_banned'}
+# Scoring overrides per timeframe on top of SCORING_PARAMS (intraday is derived in timeframe_params)
+TIMEFRAME_PARAMS = {'daily': {}, 'weekly': {PERIOD_KEY: 52}}
+SESSIONS_PER_YEAR = 252
+SESSION_MINUTES = 375   # NSE 09:15-15:30
+DEFAULT_SPECS = [{'name': 'top500', 'universe': {'top_turnover': 500}, 'timeframe': 'daily'}]
+
+# Per-field aggregation when resampling OHLCV to a coarser timeframe
+AGGREGATION = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum', 'Turnover': 'sum'}
+
+def is_intraday(timeframe):
+    return timeframe not in ('daily', 'weekly')
+
+def timeframe_params(timeframe, overrides=None):
+    """Scoring params for a timeframe: SCORING_PARAMS, the timeframe's defaults, then spec overrides."""
+    if is_intraday(timeframe):
+        minutes = pd.tseries.frequencies.to_offset(timeframe).nanos / 60e9
+        defaults = {PERIOD_KEY: SESSIONS_PER_YEAR * max(1, math.ceil(SESSION_MINUTES / minutes))}
+    else:
+        defaults = TIMEFRAME_PARAMS[timeframe]
+    return {**SCORING_PARAMS, **defaults, **(overrides or {})}
+
+def normalize_spec(spec):
+    """Validated copy of one scan spec with defaults filled in."""
+    if not spec.get('name') or not re.fullmatch(r'[\w.-]+', str(spec['name'])):
+        raise ValueError(f"Scan spec needs a file-safe 'name': {spec!r}")
+    universe = dict(spec.get('universe') or {})
+    unknown = set(universe) - UNIVERSE_KEYS
+    if unknown:
+        raise ValueError(f"Scan '{spec['name']}': unknown universe keys {sorted(unknown)}")
+    timeframe = str(spec.get('timeframe', 'daily')).lower()
+    if is_intraday(timeframe):
+        pd.tseries.frequencies.to_offset(timeframe)   # raises on a bad offset
+        if not spec.get('bars'):
+            raise ValueError(f"Scan '{spec['name']}': intraday timeframe {timeframe} needs a 'bars' file")
+    lookback = int(spec.get('lookback') or DEFAULT_LOOKBACK.get(timeframe, 0))
+    params = dict(spec.get('params') or {})
+    unknown = set(params) - set(SCORING_PARAMS) - {PERIOD_KEY}
+    if unknown:
+        raise ValueError(f"Scan '{spec['name']}': unknown params {sorted(unknown)}")
+    return {'name': str(spec['name']), 'universe': universe, 'timeframe': timeframe,
+            'lookback': lookback, 'bars': spec.get('bars'), 'params': params}
+
+def load_specs(source=None):
+    """Specs from a YAML / JSON file, a list of dicts, or data/scans.yaml (else DEFAULT_SPECS)."""
+    if source is None:
+        source = SPEC_FILE if os.path.exists(SPEC_FILE) else DEFAULT_SPECS
+    if isinstance(source, str):
+        with open(source) as f:
+            if source.endswith(('.yaml', '.yml')):
+                try:
+                    import yaml
+                except ImportError:
+                    raise ImportError("PyYAML is needed for YAML scan specs (pip install pyyaml); or use JSON.")
+                source = yaml.safe_load(f)
+            else:
+                source = json.load(f)
+    if isinstance(source, dict):
+        source = source.get('scans', [])
+    specs = [normalize_spec(s) for s in source]
+    names = [s['name'] for s in specs]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Duplicate scan names in {names}")
+    return specs
+
+def sessions_needed(specs):
+    """Daily sessions the shared Bhavcopy panel must cover for every spec."""
+    needed = [DEFAULT_LOOKBACK['daily']]
+    for spec in specs:
+        if spec['timeframe'] == 'daily':
+            needed.append(spec['lookback'])
+        elif spec['timeframe'] == 'weekly':
+            needed.append(spec['lookback'] * 5 + 5)
+    return max(needed)
+
+def resample_panel(panel, rule):
+    """Wide OHLCV panel resampled to a coarser period (e.g. 'W-FRI'); empty periods stay NaN."""
+    out = {}
+    for field, matrix in panel.items():
+        how = AGGREGATION.get(field, 'last')
+        resampled = matrix.resample(rule)
+        out[field] = resampled.sum(min_count=1) if how == 'sum' else getattr(resampled, how)()
+    return out
+
+def bars_panel(bars, rule):
+    """Wide OHLCV panel from long intraday bars (Timestamp, Symbol, OHLCV), bucketed to 'rule'."""
+    bars = bars.sort_values('Timestamp', kind='stable')
+    bucket = bars['Timestamp'].dt.floor(rule).rename('Bucket')
+    grouped = bars.groupby([bucket, bars['Symbol']], sort=True)
+    long_df = grouped.agg({field: AGGREGATION[field] for field in ['Open', 'High', 'Low', 'Close', 'Volume']})
+    return {field: long_df[field].unstack('Symbol') for field in long_df.columns}
+
+def load_sectors(path=None):
+    """Symbol -> Sector mapping (empty if no sector file)."""
+    path = path or SECTOR_FILE
+    if not os.path.exists(path):
+        return pd.Series(dtype=object)
+    df = pd.read_csv(path)
+    return df.set_index('Symbol')['Sector']
+
+def read_watchlist(path):
+    """Symbols from a text file (one per line or comma separated; '#' comments)."""
+    with open(path) as f:
+        text = re.sub(r'#.*', '', f.read())
+    return [s.strip().upper() for s in re.split(r'[\s,]+', text) if s.strip()]
+
+class MarketData:
+    """
+    Everything the scans read, fetched lazily and at most once per pass:
+    the daily Bhavcopy panel, derived timeframe panels, F&O / ban / sector lists.
+    """
+
+    def __init__(self, sessions, offline=False):
+        self.sessions = sessions
+        self.offline = offline
+        self.cache = {}
+
+    def _once(self, key, fn):
+        if key not in self.cache:
+            self.cache[key] = fn()
+        return self.cache[key]
+
+    def daily(self):
+        return self._once('daily', lambda: build_panel(sessions=self.sessions, offline=self.offline, save=False))
+
+    def fno(self):
+        if self.offline:
+            raise ValueError("An F&O universe needs the live F&O list; run without --offline or list the symbols")
+        return self._once('fno', lambda: set(get_fno_symbols()))
+
+    def banned(self):
+        return self._once('banned', lambda: set() if self.offline else set(get_fno_ban_list()))
+
+    def sectors(self):
+        return self._once('sectors', load_sectors)
+
+    def panel(self, timeframe, bars=None):
+        """OHLCV panel for a timeframe (the daily panel, resampled weekly, or bucketed intraday bars)."""
+        if timeframe == 'daily':
+            return self.daily()
+        if timeframe == 'weekly':
+            return self._once('weekly', lambda: resample_panel(self.daily(), 'W-FRI') if self.daily() else {})
+        return self._once(('bars', bars, timeframe), lambda: bars_panel(self.bars(bars), timeframe))
+
+    def bars(self, path):
+        def read():
+            df = pd.read_parquet(path) if path.endswith('.parquet') else pd.read_csv(path)
+            df['Timestamp'] = pd.to_datetime(df['Timestamp'])
+            return df[BAR_COLUMNS]
+        return self._once(('bars', path), read)
+
+    def universe(self, spec):
+        """Symbols of a spec's universe (ranked by turnover when top_turnover is given)."""
+        rules = spec['universe']
+        daily = self.daily()
+        if daily:
+            turnover = daily['Turnover'].iloc[-1].dropna().sort_values(ascending=False)
+            symbols = list(turnover.index)
+        else:
+            turnover, symbols = pd.Series(dtype=float), []
+        if rules.get('symbols') or rules.get('watchlist'):
+            listed = [str(s).upper() for s in rules.get('symbols') or []]
+            if rules.get('watchlist'):
+                listed += read_watchlist(rules['watchlist'])
+            # Listed symbols keep their turnover order; ones without a daily bar (intraday-only) go last
+            ranked = [s for s in symbols if s in set(listed)]
+            symbols = ranked + [s for s in dict.fromkeys(listed) if s not in set(ranked)]
+        if rules.get('sectors'):
+            sectors = self.sectors()
+            wanted = set(rules['sectors'])
+            symbols = [s for s in symbols if sectors.get(s) in wanted]
+        if rules.get('fno'):
+            fno = self.fno()
+            symbols = [s for s in symbols if s in fno]
+        if not rules.get('include_banned'):
+            banned = self.banned()
+            symbols = [s for s in symbols if s not in banned]
+        if rules.get('top_turnover'):
+            symbols = symbols[:int(rules['top_turnover'])]
+        return symbols
+
+def run_scans(specs=None, offline=False, workers=1, save=True):
+    """
+    Run every scan of 'specs' (see load_specs) in one pass.
+    Returns {scan name: results DataFrame}.
+    """
+    specs = load_specs(specs)
+    data = MarketData(sessions_needed(specs), offline=offline)
+    print(f"Running {len(specs)} scan(s) over a {data.sessions}-session panel...")
+
+    # Group scans that read the same bars with the same params: one scoring pass per
+    # (timeframe, lookback, bars file, params)
+    universes, groups, keys = {}, {}, {}
+    for spec in specs:
+        universes[spec['name']] = data.universe(spec)
+        key = keys[spec['name']] = (spec['timeframe'], spec['lookback'], spec['bars'],
+                                    json.dumps(spec['params'], sort_keys=True))
+        groups.setdefault(key, []).append(spec['name'])
+
+    scored, requested = {}, 0
+    for key, names in groups.items():
+        timeframe, lookback, bars, overrides = key
+        panel = data.panel(timeframe, bars)
+        if panel and lookback:
+            panel = {field: matrix.iloc[-lookback:] for field, matrix in panel.items()}
+        union = list(dict.fromkeys(s for name in names for s in universes[name]))
+        requested += sum(len(universes[name]) for name in names)
+        params = timeframe_params(timeframe, json.loads(overrides))
+        rows = score_panel(panel, union, workers=workers, params=params) if panel else []
+        scored[key] = pd.DataFrame(rows).set_index('Symbol', drop=False) if rows else None
+        print(f"  {timeframe} ({lookback or 'all'} bars): {len(union)} unique symbols scored for {', '.join(names)}")
+
+    results = {}
+    for spec in specs:
+        table = scored[keys[spec['name']]]
+        symbols = universes[spec['name']]
+        df = table.reindex([s for s in symbols if s in table.index]).reset_index(drop=True) if table is not None else pd.DataFrame()
+        if not df.empty:
+            df.insert(1, 'Timeframe', spec['timeframe'])
+        results[spec['name']] = df
+        if save:
+            os.makedirs(SCANS_DIR, exist_ok=True)
+            atomic_write_parquet(df, os.path.join(SCANS_DIR, f"{spec['name']}.parquet"))
+            atomic_write_csv(df, os.path.join(SCANS_DIR, f"{spec['name']}.csv"))
+        passed = int(df['Passed'].sum()) if 'Passed' in df.columns else 0
+        print(f"  {spec['name']}: {len(df)}/{len(symbols)} scored, {passed} passed")
+    unique = sum(len(t) for t in scored.values() if t is not None)
+    print(f"Scored {unique} (timeframe, symbol) pairs for {requested} requested across scans.")
+    return results
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Run several scans from a spec file in one pass")
+    parser.add_argument('spec', nargs='?', default=None, help="YAML / JSON spec file (default: data/scans.yaml)")
+    parser.add_argument('--offline', action='store_true', help="Use cached Bhavcopy files only")
+    parser.add_argument('--workers', type=int, default=1, help="Scoring processes (0: one per CPU)")
+    args = parser.parse_args()
+    run_scans(args.spec, offline=args.offline, workers=args.workers or os.cpu_count())
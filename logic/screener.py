@@ -1,161 +1,480 @@
-import pandas as pd
-try:
-    import pandas_ta as ta
-except ImportError:
-    try:
-        import pandas_ta_classic as ta
-    except ImportError:
-        raise ImportError("Neither pandas_ta nor pandas_ta_classic could be imported")
-import numpy as np
-import json
+"""
+Daily market scan: scoring (SCORING_PARAMS, score_panel / score_rows, shared
+with the backtest, intraday and scan-spec modules) and the run_screener pipeline.
+pandas and the pipeline modules (fetchers, stores, archive, correlations) are
+imported inside the functions that use them, so importing the scoring
+functions does not load the whole scan.
+"""
 import os
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import numpy as np
 try:
-    from nse_fetcher import get_top_500_active_stocks, get_fno_ban_list, get_ohlc_history, get_fii_sentiment
+    import run_report
 except ImportError:
-    from logic.nse_fetcher import get_top_500_active_stocks, get_fno_ban_list, get_ohlc_history, get_fii_sentiment
-
-def calculate_hv(df, window=20):
-    if df.empty: return 0
-    col = 'ClosePrice' if 'ClosePrice' in df.columns else 'close' if 'close' in df.columns else None
-    if not col:
-        col = 'ClsgPric' if 'ClsgPric' in df.columns else None
-        if not col: return 0
-
-    df[col] = pd.to_numeric(df[col], errors='coerce')
-    df = df.dropna(subset=[col])
-    if len(df) < window: return 0
-    
-    log_returns = np.log(df[col] / df[col].shift(1))
-    std_dev = log_returns.rolling(window=window).std()
-    hv = std_dev * np.sqrt(252) * 100
-    if hv.empty or pd.isna(hv.iloc[-1]):
-        return 0
-    return hv.iloc[-1]
-
-def analyze_stock(symbol):
+    from logic import run_report
+
+# Scoring parameters. Any change alters the scan-cache version, so cached
+# rows scored under old parameters are recomputed. Bump 'revision' when the
+# score formulas themselves change.
+SCORING_PARAMS = {
+    'revision': 1,
+    'length': 14,                 # ADX / RSI lookback
+    'hv_window': 20,
+    'min_bars': 30,
+    'adx_max': 25,
+    'rsi_low': 40,
+    'rsi_high': 60,
+    'weights': (0.4, 0.4, 0.2),   # trend, stability, volatility
+    'stop_loss_pct': 0.05,
+    'strike_pct': 0.08,
+}
+# Bars per year for HV. Daily scans use the default; scan specs on other
+# timeframes set it (kept out of SCORING_PARAMS so daily cache keys are unchanged).
+PERIOD_KEY = 'periods_per_year'
+DAILY_PERIODS = 252
+
+def analyze_stock(symbol, offline=False):
     """Worker function to analyze a single stock."""
     try:
-        df = get_ohlc_history(symbol)
-        if df.empty or len(df) < 30:
+        from nse_fetcher import get_ohlc_history
+    except ImportError:
+        from logic.nse_fetcher import get_ohlc_history
+    try:
+        df = get_ohlc_history(symbol, offline=offline)
+    except Exception as e:
+        run_report.drop('fetch_failed', f"{type(e).__name__}: {e}")
+        return None
+    return score_history(symbol, df)
+
+def score_cached(symbol, df, cache=None):
+    """Score a history window; with a cache, rows already scored for the same last bar are reused."""
+    last_bar = df['Date'].iloc[-1] if 'Date' in df.columns and not df.empty else None
+    if cache is not None:
+        cached = cache.get(symbol, last_bar)
+        if cached is not None:
+            run_report.mark('cached')
+            return cached
+    res = score_history(symbol, df)
+    if cache is not None:
+        cache.put(symbol, last_bar, res)
+    return res
+
+def score_history(symbol, df):
+    """
+    Score one symbol from its OHLC history frame. Symbols that cannot be
+    scored return None and record the reason in the active run report.
+    """
+    try:
+        from ingest import normalize_frame, select_series
+        from indicators import latest_indicators
+    except ImportError:
+        from logic.ingest import normalize_frame, select_series
+        from logic.indicators import latest_indicators
+    try:
+        if df.empty:
+            run_report.drop('empty_history')
             return None
-        
-        # Clean column names even more aggressively
-        df.columns = [c.replace('ï»¿', '').replace(' ', '').strip() for c in df.columns]
-        
-        close_col = next((c for c in df.columns if 'ClosePrice' in c or 'ClsgPric' in c or 'Close' in c), None)
-        high_col = next((c for c in df.columns if 'HighPrice' in c or 'HghPric' in c or 'High' in c), None)
-        low_col = next((c for c in df.columns if 'LowPrice' in c or 'LwPric' in c or 'Low' in c), None)
-        # Volume could be 'TotalTradedQuantity', 'Volume', 'TradedQty', etc.
-        vol_col = next((c for c in df.columns if 'TradedQuantity' in c or 'TradedVolume' in c or 'TradedQty' in c or 'Volume' in c), None)
-        
-        if not all([close_col, high_col, low_col]):
+        if len(df) < SCORING_PARAMS['min_bars']:
+            run_report.drop('too_few_bars', f"{len(df)} rows")
             return None
 
-        # TA calculations
-        try:
-            adx_df = ta.adx(pd.to_numeric(df[high_col]), pd.to_numeric(df[low_col]), pd.to_numeric(df[close_col]), length=14)
-            adx = adx_df['ADX_14'].iloc[-1]
-        except: adx = 99
-        
-        try:
-            rsi = ta.rsi(pd.to_numeric(df[close_col]), length=14).iloc[-1]
-        except: rsi = 0
-            
-        hv = calculate_hv(df)
-        last_close = pd.to_numeric(df[close_col]).iloc[-1]
+        # Canonical columns and grouped numbers handled once by the ingest module
+        with run_report.stage('parse'):
+            if not {'High', 'Low', 'Close'}.issubset(df.columns):
+                df = select_series(normalize_frame(df))
+            if not {'High', 'Low', 'Close'}.issubset(df.columns):
+                run_report.drop('missing_columns', ", ".join(map(str, df.columns[:12])))
+                return None
+            high = df['High'].to_numpy(dtype=float)[:, None]
+            low = df['Low'].to_numpy(dtype=float)[:, None]
+            close = df['Close'].to_numpy(dtype=float)[:, None]
+
+        # TA calculations (single-column run of the batch engine)
+        with run_report.stage('indicators'):
+            ind = latest_indicators(high, low, close, SCORING_PARAMS['length'], SCORING_PARAMS['hv_window'])
+        if ind['Bars'][0] < SCORING_PARAMS['min_bars']:
+            run_report.drop('too_few_bars', f"{int(ind['Bars'][0])} valid bars")
+            return None
         
         # Robust volume extraction
         last_vol = 0
-        if vol_col:
+        if 'Volume' in df.columns:
             try:
-                last_vol = pd.to_numeric(df[vol_col]).dropna().iloc[-1]
+                last_vol = df['Volume'].dropna().iloc[-1]
             except: last_vol = 0
         
-        # Scoring Logic (0-100)
-        # Trend Score: Lower ADX is better for sideways (100 = ADX 0, 0 = ADX 50+)
-        trend_score = max(0, min(100, (50 - adx) * 2)) if adx < 50 else 0
-        
-        # Stability Score: RSI closer to 50 is better (100 = RSI 50, 0 = RSI <30 or >70)
-        stability_score = max(0, min(100, 100 - abs(50 - rsi) * 5))
-        
-        # Volatility Score: Higher HV is better for premiums (100 = HV 60+, 0 = HV 0)
-        volatility_score = max(0, min(100, hv * 1.66))
-        
-        is_sideways = adx < 25
-        is_stable = 40 < rsi < 60
-        confidence = round((trend_score * 0.4 + stability_score * 0.4 + volatility_score * 0.2), 2)
-        passed = is_sideways and is_stable
-
-        return {
-            'Symbol': symbol,
-            'Close': last_close,
-            'Volume': int(last_vol),
-            'ADX': round(adx, 2),
-            'RSI': round(rsi, 2),
-            'HV': round(hv, 2),
-            'Trend_Score': round(trend_score, 2),
-            'Stability_Score': round(stability_score, 2),
-            'Vol_Score': round(volatility_score, 2),
-            'Status': "Sideways" if is_sideways else "Trending",
-            'Stability': "Stable" if is_stable else "Volatile",
-            'Confidence': confidence,
-            'StopLoss_L': round(last_close * 0.95, 2),
-            'StopLoss_H': round(last_close * 1.05, 2),
-            'Target_Put': round(last_close * 0.92, 2),
-            'Target_Call': round(last_close * 1.08, 2),
-            'Passed': passed
-        }
+        with run_report.stage('scoring'):
+            return score_indicators(symbol, ind['Close'][0], last_vol, ind['ADX'][0], ind['RSI'][0], ind['HV'][0])
     except Exception as e:
-        # print(f"Error analyzing {symbol}: {e}")
+        run_report.drop('error', f"{type(e).__name__}: {e}")
         return None
 
+def score_panel(panel, symbols, workers=1, params=SCORING_PARAMS):
+    """
+    Score every symbol of an OHLCV panel in one vectorized indicator pass.
+    workers > 1 scores disjoint symbol shards in a process pool that reads
+    the panel from shared memory (logic.shared_panel). 'params' carries the
+    thresholds and HV annualization for the panel's bar size.
+    """
+    for symbol in symbols:
+        if not panel or symbol not in panel['Close'].columns:
+            run_report.drop('empty_history', symbol=symbol)
+    symbols = [s for s in symbols if panel and s in panel['Close'].columns]
+    if not symbols:
+        return []
+    if workers and workers > 1:
+        try:
+            from shared_panel import score_panel_parallel
+        except ImportError:
+            from logic.shared_panel import score_panel_parallel
+        results, short = score_panel_parallel(panel, symbols, workers, params=params)
+    else:
+        with run_report.stage('parse'):
+            close = panel['Close'][symbols].to_numpy()
+            high, low = panel['High'][symbols].to_numpy(), panel['Low'][symbols].to_numpy()
+            volume = panel['Volume'][symbols].to_numpy()
+        results, short = score_block(symbols, high, low, close, volume, params)
+    for symbol, bars in short.items():
+        run_report.drop('too_few_bars', f"{bars} valid bars", symbol=symbol)
+    return results
+
+def score_block(symbols, high, low, close, volume, params=SCORING_PARAMS):
+    """
+    Score the columns of (days x symbols) arrays. Returns (rows, short), where
+    short maps symbols with fewer than min_bars valid bars to their bar count.
+    """
+    try:
+        from indicators import latest_indicators, right_align
+    except ImportError:
+        from logic.indicators import latest_indicators, right_align
+    with run_report.stage('indicators'):
+        ind = latest_indicators(high, low, close, params['length'], params['hv_window'],
+                                params.get(PERIOD_KEY, DAILY_PERIODS))
+        (volume,), bars = right_align(volume, valid=np.isfinite(close))
+
+    results, short = [], {}
+    with run_report.stage('scoring'):
+        for j, symbol in enumerate(symbols):
+            if bars[j] < params['min_bars']:
+                short[symbol] = int(bars[j])
+                continue
+            last_vol = volume[-1, j] if np.isfinite(volume[-1, j]) else 0
+            results.append(score_indicators(symbol, ind['Close'][j], last_vol, ind['ADX'][j], ind['RSI'][j], ind['HV'][j], params))
+    return results, short
+
+def score_indicators(symbol, last_close, last_vol, adx, rsi, hv, params=SCORING_PARAMS):
+    """Turn the latest ADX / RSI / HV readings into a scored result row."""
+    adx = 99 if np.isnan(adx) else adx
+    rsi = 0 if np.isnan(rsi) else rsi
+    hv = 0 if np.isnan(hv) else hv
+
+    # Scoring Logic (0-100)
+    # Trend Score: Lower ADX is better for sideways (100 = ADX 0, 0 = ADX 50+)
+    trend_score = max(0, min(100, (50 - adx) * 2)) if adx < 50 else 0
+    
+    # Stability Score: RSI closer to 50 is better (100 = RSI 50, 0 = RSI <30 or >70)
+    stability_score = max(0, min(100, 100 - abs(50 - rsi) * 5))
+    
+    # Volatility Score: Higher HV is better for premiums (100 = HV 60+, 0 = HV 0)
+    volatility_score = max(0, min(100, hv * 1.66))
+    
+    is_sideways = adx < params['adx_max']
+    is_stable = params['rsi_low'] < rsi < params['rsi_high']
+    w_trend, w_stability, w_vol = params['weights']
+    confidence = round((trend_score * w_trend + stability_score * w_stability + volatility_score * w_vol), 2)
+    passed = is_sideways and is_stable
+    sl, strike = params['stop_loss_pct'], params['strike_pct']
+
+    return {
+        'Symbol': symbol,
+        'Close': last_close,
+        'Volume': int(last_vol),
+        'ADX': round(adx, 2),
+        'RSI': round(rsi, 2),
+        'HV': round(hv, 2),
+        'Trend_Score': round(trend_score, 2),
+        'Stability_Score': round(stability_score, 2),
+        'Vol_Score': round(volatility_score, 2),
+        'Status': "Sideways" if is_sideways else "Trending",
+        'Stability': "Stable" if is_stable else "Volatile",
+        'Confidence': confidence,
+        'StopLoss_L': round(last_close * (1 - sl), 2),
+        'StopLoss_H': round(last_close * (1 + sl), 2),
+        'Target_Put': round(last_close * (1 - strike), 2),
+        'Target_Call': round(last_close * (1 + strike), 2),
+        'Passed': passed
+    }
+
+def score_arrays(adx, rsi, hv, params=SCORING_PARAMS):
+    """
+    Vectorized score_indicators for arrays of readings (same formulas and NaN
+    defaults). Returns a dict of arrays: ADX, RSI, HV, Trend_Score,
+    Stability_Score, Vol_Score, Confidence (unrounded) and Passed.
+    """
+    adx = np.where(np.isfinite(adx), adx, 99.0)
+    rsi = np.where(np.isfinite(rsi), rsi, 0.0)
+    hv = np.where(np.isfinite(hv), hv, 0.0)
+    trend = np.where(adx < 50, np.clip((50 - adx) * 2, 0, 100), 0.0)
+    stability = np.clip(100 - np.abs(50 - rsi) * 5, 0, 100)
+    volatility = np.clip(hv * 1.66, 0, 100)
+    w_trend, w_stability, w_vol = params['weights']
+    return {
+        'ADX': adx, 'RSI': rsi, 'HV': hv,
+        'Trend_Score': trend, 'Stability_Score': stability, 'Vol_Score': volatility,
+        'Confidence': trend * w_trend + stability * w_stability + volatility * w_vol,
+        'Passed': (adx < params['adx_max']) & (rsi > params['rsi_low']) & (rsi < params['rsi_high']),
+    }
+
+def score_rows(symbols, close, volume, adx, rsi, hv, params=SCORING_PARAMS):
+    """Vectorized score_indicators: a DataFrame of result rows for arrays of readings."""
+    import pandas as pd
+    scores = score_arrays(adx, rsi, hv, params)
+    close = np.asarray(close, dtype=float)
+    sl, strike = params['stop_loss_pct'], params['strike_pct']
+    passed = scores['Passed']
+    sideways = scores['ADX'] < params['adx_max']
+    stable = (scores['RSI'] > params['rsi_low']) & (scores['RSI'] < params['rsi_high'])
+    return pd.DataFrame({
+        'Symbol': list(symbols),
+        'Close': close,
+        'Volume': np.nan_to_num(np.asarray(volume, dtype=float)).astype(np.int64),
+        'ADX': np.round(scores['ADX'], 2),
+        'RSI': np.round(scores['RSI'], 2),
+        'HV': np.round(scores['HV'], 2),
+        'Trend_Score': np.round(scores['Trend_Score'], 2),
+        'Stability_Score': np.round(scores['Stability_Score'], 2),
+        'Vol_Score': np.round(scores['Vol_Score'], 2),
+        'Status': np.where(sideways, "Sideways", "Trending"),
+        'Stability': np.where(stable, "Stable", "Volatile"),
+        'Confidence': np.round(scores['Confidence'], 2),
+        'StopLoss_L': np.round(close * (1 - sl), 2),
+        'StopLoss_H': np.round(close * (1 + sl), 2),
+        'Target_Put': np.round(close * (1 - strike), 2),
+        'Target_Call': np.round(close * (1 + strike), 2),
+        'Passed': passed,
+    })
+
 def save_results(results, fii_stats):
+    """Publish a full result list directly (atomic replace of every file)."""
+    import pandas as pd
+    try:
+        from result_sink import atomic_write_csv, atomic_write_json, atomic_write_parquet
+    except ImportError:
+        from logic.result_sink import atomic_write_csv, atomic_write_json, atomic_write_parquet
     df_results = pd.DataFrame(results)
     data_dir = os.path.join(os.path.dirname(__file__), '..', 'data')
     os.makedirs(data_dir, exist_ok=True)
-    df_results.to_csv(os.path.join(data_dir, 'market_scan.csv'), index=False)
-    with open(os.path.join(data_dir, 'fii_stats.json'), 'w') as f:
-        json.dump(fii_stats, f)
+    atomic_write_parquet(df_results, os.path.join(data_dir, 'market_scan.parquet'))
+    atomic_write_csv(df_results, os.path.join(data_dir, 'market_scan.csv'))
+    atomic_write_json(fii_stats, os.path.join(data_dir, 'fii_stats.json'))
 
-def run_screener():
-    print("Starting Optimized Market Scan (Top 500 Stocks)...")
+def run_screener(offline=False, source='history', force=False, notify=False, profile=None, top_n=500, workers=1):
+    """
+    Run the daily scan.
+    source='history' fetches per-symbol history (through the local store);
+    source='bhavcopy' builds one OHLCV panel from daily Bhavcopy files.
+    force=True ignores cached result rows and rescores every symbol.
+    notify=True sends change alerts for this scan to Discord / Telegram.
+    profile='cprofile' | 'pyinstrument' also captures a profile of the run.
+    top_n: universe size (top symbols by turnover).
+    workers > 1 scores the Bhavcopy panel in a process pool over shared memory.
+    """
+    import pandas as pd
+    try:
+        from nse_fetcher import (get_top_500_active_stocks, get_fno_ban_list, get_fii_sentiment,
+                                 stored_ohlc_history, download_ohlc_history, history_window)
+        import history_store
+        from bhavcopy_panel import build_panel, top_symbols_by_turnover
+        from fetch_scheduler import FetchScheduler
+        from result_sink import ResultSink
+        from scan_cache import ScanCache, scoring_version
+        from portfolio import update_correlations, history_closes
+        import scan_archive
+        import trading_calendar
+    except ImportError:
+        from logic.nse_fetcher import (get_top_500_active_stocks, get_fno_ban_list, get_fii_sentiment,
+                                       stored_ohlc_history, download_ohlc_history, history_window)
+        from logic import history_store
+        from logic.bhavcopy_panel import build_panel, top_symbols_by_turnover
+        from logic.fetch_scheduler import FetchScheduler
+        from logic.result_sink import ResultSink
+        from logic.scan_cache import ScanCache, scoring_version
+        from logic.portfolio import update_correlations, history_closes
+        from logic import scan_archive
+        from logic import trading_calendar
+    print(f"Starting Optimized Market Scan (Top {top_n} Stocks)...")
     
-    top_stocks = get_top_500_active_stocks()  # Full 500 stocks
-    ban_list = get_fno_ban_list()
-    universe = [s for s in top_stocks if s not in ban_list]
-    print(f"Universe size: {len(universe)} stocks. Using conservative parallelization with retries...")
-
-    # Initial FII Sentiment
-    fii_data = get_fii_sentiment()
-    fii_stats = {"ratio": 1.0, "status": "Neutral"}
-    if fii_data is not None:
+    # Per-stage timings, retries and drop reasons go to data/run_report.json
+    recorder = run_report.RunRecorder(source=source, offline=offline, force=force)
+    with recorder.activate(profile=profile):
+        panel = {}
+        if source == 'bhavcopy':
+            with run_report.stage('fetch'):
+                panel = build_panel(offline=offline)
+            top_stocks = top_symbols_by_turnover(panel, n=top_n)
+        elif offline:
+            # Warm history store only: no network calls at all
+            top_stocks = history_store.stored_symbols()
+        else:
+            with run_report.stage('fetch'):
+                top_stocks = get_top_500_active_stocks(n=top_n)
+
+        if offline:
+            ban_list, fii_data = [], None
+            print(f"Offline mode: scanning {len(top_stocks)} symbols from local data.")
+        else:
+            with run_report.stage('fetch'):
+                ban_list = get_fno_ban_list()
+                # Initial FII Sentiment
+                fii_data = get_fii_sentiment()
+        universe = [s for s in top_stocks if s not in ban_list]
+        scheduler, failed = None, {}
+        print(f"Universe size: {len(universe)} stocks.")
+
+        fii_stats = {"ratio": 1.0, "status": "Neutral"}
+        if fii_data is not None:
+            try:
+                longs = float(fii_data['Future Index Long'])
+                shorts = float(fii_data['Future Index Short'])
+                ratio = longs / shorts if shorts != 0 else 0
+                fii_stats = {"ratio": round(ratio, 2), "status": "Balanced" if 0.8 < ratio < 1.5 else "Risk On", "longs": longs, "shorts": shorts}
+            except: pass
+
+        # Rows stream into the sink as they complete; the dashboard reads progress from it
+        cache = ScanCache(scoring_version(SCORING_PARAMS), force=force)
+        sink = ResultSink()
+        sink.start(total=len(universe))
         try:
-            longs = float(fii_data['Future Index Long'])
-            shorts = float(fii_data['Future Index Short'])
-            ratio = longs / shorts if shorts != 0 else 0
-            fii_stats = {"ratio": round(ratio, 2), "status": "Balanced" if 0.8 < ratio < 1.5 else "Risk On", "longs": longs, "shorts": shorts}
-        except: pass
-
-    results = []
-    with ThreadPoolExecutor(max_workers=3) as executor:  # Reduced for cloud reliability
-        futures = {executor.submit(analyze_stock, s): s for s in universe}
-        
-        count = 0
-        for future in as_completed(futures):
-            count += 1
-            res = future.result()
-            if res:
-                results.append(res)
-            
-            # Save every 50 stocks for live updates in dashboard
-            if count % 50 == 0:
-                print(f"[{count}/{len(universe)}] Stocks processed. Saving partial results...")
-                save_results(results, fii_stats)
-
-    # Final Save
-    save_results(results, fii_stats)
+            if source == 'bhavcopy':
+                # Serve unchanged symbols from the cache, score the rest in one array pass
+                last_bars = panel['Close'].apply(pd.Series.last_valid_index) if panel else pd.Series(dtype=object)
+                to_score = []
+                for symbol in universe:
+                    cached = cache.get(symbol, last_bars.get(symbol))
+                    if cached is not None:
+                        run_report.mark('cached', symbol=symbol)
+                        with run_report.stage('save'):
+                            sink.write(cached)
+                    else:
+                        to_score.append(symbol)
+                scored = score_panel(panel, to_score, workers=workers)
+                with run_report.stage('save'):
+                    for res in scored:
+                        sink.write(res)
+                        cache.put(res['Symbol'], last_bars.get(res['Symbol']), res)
+            else:
+                progress = {'count': 0}
+
+                def emit(symbol, res):
+                    progress['count'] += 1
+                    if res:
+                        with run_report.stage('save'):
+                            sink.write(res)
+                    if progress['count'] % 50 == 0:
+                        print(f"[{progress['count']}/{len(universe)}] Stocks processed.")
+
+                def score_stored(symbol):
+                    window = history_window(stored.pop(symbol))
+                    if not window.empty:
+                        last_bars[symbol] = window['Date'].iloc[-1]
+                    return score_cached(symbol, window, cache)
+
+                # Only real downloads go through the scheduler (rate limits, AIMD); symbols the
+                # store already covers, and every symbol offline, are scored straight away
+                stored, fetch_from, last_bars = {}, {}, {}
+                plan = recorder.task(stored_ohlc_history)
+                score = recorder.task(score_stored)
+                for symbol in universe:
+                    stored[symbol], start = plan(symbol)
+                    if start is None or offline:
+                        emit(symbol, score(symbol))
+                    else:
+                        fetch_from[symbol] = start
+                print(f"{len(universe) - len(fetch_from)} symbols scored from the local store without network requests.")
+
+                if fetch_from:
+                    print(f"Downloading {len(fetch_from)} symbols with the adaptive fetch scheduler "
+                          f"(AIMD concurrency, per-endpoint rate limits)...")
+
+                    def on_download(symbol, history):
+                        stored[symbol] = history
+                        emit(symbol, score(symbol))
+
+                    scheduler = FetchScheduler()
+                    download = recorder.task(lambda s: download_ohlc_history(s, stored[s], fetch_from[s], max_retries=1, raise_errors=True))
+                    _, failed = scheduler.run(list(fetch_from), download, endpoint='history', on_result=on_download)
+                    if failed:
+                        print(f"Warning: {len(failed)} symbols failed after retries: {', '.join(sorted(failed)[:20])}")
+                        for symbol, reason in sorted(failed.items())[:5]:
+                            print(f"  {symbol}: {reason}")
+                    print(f"Fetch stats: {scheduler.stats}")
+
+            # Final Save: compact CSV published with an atomic rename
+            with run_report.stage('save'):
+                results = sink.publish(fii_stats)
+        except BaseException:
+            # A scan that dies part-way must not show as 'running' on the dashboard forever
+            sink.fail()
+            raise
+        finally:
+            sink.close()
+            cache.close()
+
+        with run_report.stage('save'):
+            # Append to the per-session archive (re-running a session replaces its partition),
+            # dated by the newest bar that was scored, not by the calendar
+            scored_bars = [last_bars.get(s) for s in results['Symbol']] if len(results) else []
+            scored_bars = [d for d in scored_bars if d is not None and pd.notna(d)]
+            scan_date = max(scored_bars) if scored_bars else trading_calendar.latest_session()
+            scan_archive.append_scan(results, scan_date)
+
+        # Rolling return correlations for diversified picks (dashboard / notifier)
+        with run_report.stage('correlation'):
+            try:
+                close = panel['Close'] if panel else history_closes(universe)
+                passed = results.loc[results['Passed'] == True, 'Symbol'].tolist() if len(results) else []
+                kind = update_correlations(close, passed)
+                print(f"Correlation cache: {kind} update, {len(passed)} passing candidates published.")
+            except Exception as e:
+                print(f"Correlation update failed: {e}")
+    recorder.finish(universe, results, scheduler=scheduler, failed=failed)
+    recorder.save()
+    print(recorder.summary())
     print(f"Scan complete. {len(results)} stocks saved to market_scan.csv.")
 
+    if notify:
+        try:
+            from notifier import run_notifier
+        except ImportError:
+            from logic.notifier import run_notifier
+        # Offline runs have no ban list: unknown, not empty. A delivery or alert
+        # failure is reported but never fails the scan: its results are already published
+        try:
+            run_notifier(results, ban_list=None if offline else ban_list, scan_date=scan_date)
+        except Exception as e:
+            print(f"Notification failed: {type(e).__name__}: {e}")
+    return results
+
 if __name__ == "__main__":
-    run_screener()
+    import argparse
+    parser = argparse.ArgumentParser(description="Theta Hunter market scan")
+    parser.add_argument('--offline', action='store_true', help="Scan only from locally cached data (no network)")
+    parser.add_argument('--source', choices=['history', 'bhavcopy'], default='history',
+                        help="history: per-symbol requests; bhavcopy: one panel from daily Bhavcopy files")
+    parser.add_argument('--force', action='store_true', help="Ignore cached results and rescore every symbol")
+    parser.add_argument('--notify', action='store_true', help="Send change alerts for this scan to Discord / Telegram")
+    parser.add_argument('--profile', choices=['cprofile', 'pyinstrument'],
+                        help="Capture a profile of the run (data/run_profile.pstats / .html)")
+    parser.add_argument('--data-source', default=None,
+                        help="live (default), replay:<fixture dir> or record:<fixture dir>")
+    parser.add_argument('--top', type=int, default=500, help="Universe size (top symbols by turnover)")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Score the Bhavcopy panel in N processes sharing it in memory (0: one per CPU)")
+    args = parser.parse_args()
+    if args.data_source:
+        try:
+            from data_sources import set_source
+        except ImportError:
+            from logic.data_sources import set_source
+        set_source(args.data_source)
+    run_screener(offline=args.offline, source=args.source, force=args.force, notify=args.notify,
+                 profile=args.profile, top_n=args.top, workers=args.workers or os.cpu_count())
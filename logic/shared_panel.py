@@ -0,0 +1,143 @@
+"""
+Multi-process scoring over a shared OHLCV panel.
+The panel's High / Low / Close / Volume matrices are copied once into a single
+(field x day x symbol) float64 block, either in multiprocessing.shared_memory
+or in a memory-mapped .npy file (used when /dev/shm is too small, or with
+store='mmap'). Pool workers attach to the block by name when they start and
+score disjoint symbol shards straight from NumPy views of it. Neither the
+panel nor a shard is pickled: a task carries its column range and symbol
+names, and returns only the shard's result rows, its short-history symbols
+and stage timings. Each shard is an independent indicator pass, so the work
+divides evenly across processes and scaling is close to linear once
+universes reach a few thousand symbols or multi-year panels.
+"""
+import os
+import shutil
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+try:
+    import run_report
+    from screener import score_block, SCORING_PARAMS
+except ImportError:
+    from logic import run_report
+    from logic.screener import score_block, SCORING_PARAMS
+
+FIELDS = ['High', 'Low', 'Close', 'Volume']
+# The indicator recurrences loop over days in Python, so every shard pays that loop once:
+# one wide shard per worker, and no pool at all for universes too small to amortise it
+MIN_SYMBOLS_PER_WORKER = 250
+
+class SharedPanel:
+    """
+    Usage:
+        with SharedPanel(panel, symbols) as shared:
+            pool = ProcessPoolExecutor(initializer=attach_worker, initargs=(shared.handle,))
+    The owner creates and removes the block; workers only attach to it.
+    """
+
+    def __init__(self, panel, symbols, store='shm'):
+        shape = (len(FIELDS), len(panel['Close'].index), len(symbols))
+        nbytes = int(np.prod(shape)) * 8
+        self.shm = None
+        self.path = None
+        # tmpfs over-commits: a too-small /dev/shm fails on first write (SIGBUS), not on create
+        if store == 'shm' and os.path.isdir('/dev/shm') and shutil.disk_usage('/dev/shm').free < nbytes:
+            print(f"/dev/shm has less than {nbytes / 2**20:.0f} MiB free; using a memory-mapped file.")
+            store = 'mmap'
+        if store == 'shm':
+            try:
+                self.shm = shared_memory.SharedMemory(create=True, size=max(nbytes, 1))
+                self.array = np.ndarray(shape, dtype=np.float64, buffer=self.shm.buf)
+            except OSError as e:
+                print(f"Shared memory unavailable ({e}); using a memory-mapped file.")
+                self.shm = None
+        if self.shm is None:
+            fd, self.path = tempfile.mkstemp(suffix='.npy', prefix='theta-panel-')
+            os.close(fd)
+            self.array = np.lib.format.open_memmap(self.path, mode='w+', dtype=np.float64, shape=shape)
+        for i, field in enumerate(FIELDS):
+            self.array[i] = panel[field].reindex(columns=symbols).to_numpy(dtype=np.float64)
+        if self.path:
+            self.array.flush()
+        self.handle = {'shm': self.shm.name if self.shm else None, 'path': self.path, 'shape': shape}
+
+    def close(self):
+        self.array = None
+        if self.shm is not None:
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+            self.path = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def attach(handle):
+    """Read-only view of a SharedPanel block (plus the object keeping it mapped)."""
+    if handle['path']:
+        array = np.load(handle['path'], mmap_mode='r')
+        return array, array
+    # Pool workers share the owner's resource tracker, so the block is unlinked once, by the owner
+    shm = shared_memory.SharedMemory(name=handle['shm'])
+    array = np.ndarray(handle['shape'], dtype=np.float64, buffer=shm.buf)
+    array.flags.writeable = False
+    return array, shm
+
+_PANEL = None
+_KEEPALIVE = None
+
+def attach_worker(handle):
+    """Pool initializer: map the shared panel once per worker process."""
+    global _PANEL, _KEEPALIVE
+    _PANEL, _KEEPALIVE = attach(handle)
+
+def score_shard(start, stop, symbols, params=SCORING_PARAMS):
+    """Score panel columns [start, stop) in a worker; returns (rows, short, stage timings)."""
+    high, low, close, volume = (_PANEL[i, :, start:stop] for i in range(len(FIELDS)))
+    recorder = run_report.RunRecorder()
+    with recorder.activate():
+        rows, short = score_block(symbols, high, low, close, volume, params)
+    return rows, short, recorder.durations
+
+def shard_bounds(n, shards):
+    """[start, stop) column ranges splitting n symbols into at most 'shards' contiguous pieces."""
+    edges = np.linspace(0, n, min(shards, n) + 1).round().astype(int)
+    return [(int(a), int(b)) for a, b in zip(edges[:-1], edges[1:]) if b > a]
+
+def score_panel_parallel(panel, symbols, workers=None, store='shm', params=SCORING_PARAMS):
+    """
+    score_block over 'symbols' of the panel with a process pool.
+    Returns (rows, short) in symbol order, like a single score_block pass.
+    """
+    workers = min(workers or os.cpu_count() or 1, len(symbols) // MIN_SYMBOLS_PER_WORKER)
+    if workers <= 1:
+        with run_report.stage('parse'):
+            arrays = [panel[field][symbols].to_numpy() for field in FIELDS]
+        return score_block(symbols, *arrays, params)
+    with run_report.stage('parse'):
+        shared = SharedPanel(panel, symbols, store=store)
+    rows, short = [], {}
+    try:
+        bounds = shard_bounds(len(symbols), workers)
+        # fork where available: workers inherit the imported modules instead of re-importing them
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                 initializer=attach_worker, initargs=(shared.handle,)) as pool:
+            futures = [pool.submit(score_shard, a, b, symbols[a:b], params) for a, b in bounds]
+            for future in futures:
+                shard_rows, shard_short, durations = future.result()
+                rows.extend(shard_rows)
+                short.update(shard_short)
+                run_report.merge(durations)
+    finally:
+        shared.close()
+    return rows, short
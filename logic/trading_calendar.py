@@ -0,0 +1,61 @@
+"""
+NSE trading-session calendar.
+Resolves the latest session, the previous N sessions and history windows in
+exact session counts, so fetchers never request a weekend or exchange holiday.
+Backed by pandas_market_calendars ('NSE'); falls back to weekdays only if
+the calendar package is unavailable.
+"""
+import functools
+from datetime import datetime
+import pandas as pd
+
+CALENDAR_NAME = 'NSE'
+
+@functools.lru_cache(maxsize=8)
+def _sessions_for_years(first_year, last_year):
+    start, end = f"{first_year}-01-01", f"{last_year}-12-31"
+    try:
+        import pandas_market_calendars as mcal
+        days = mcal.get_calendar(CALENDAR_NAME).valid_days(start_date=start, end_date=end)
+        return pd.DatetimeIndex(days.tz_localize(None).normalize())
+    except Exception as e:
+        print(f"Warning: NSE calendar unavailable ({e}). Falling back to weekdays.")
+        return pd.bdate_range(start, end)
+
+def sessions_between(start, end):
+    """All NSE sessions with start <= date <= end (naive, normalized timestamps)."""
+    start, end = pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize()
+    # Cache whole decades so repeated lookups share one calendar build
+    first_year = start.year - start.year % 10
+    last_year = end.year + 1
+    index = _sessions_for_years(first_year, last_year)
+    return index[(index >= start) & (index <= end)]
+
+def is_session(date):
+    date = pd.Timestamp(date).normalize()
+    return len(sessions_between(date, date)) == 1
+
+def latest_session(now=None):
+    """The most recent session on or before 'now' (defaults to today)."""
+    now = pd.Timestamp(now or datetime.now()).normalize()
+    recent = sessions_between(now - pd.Timedelta(days=30), now)
+    return recent[-1]
+
+def previous_sessions(n, end=None):
+    """The last n sessions ending at (and including) the latest session <= end, oldest first."""
+    end = latest_session(end)
+    # ~250 sessions a year; pad generously for long holiday stretches
+    start = end - pd.Timedelta(days=int(n * 7 / 5) + 30)
+    while True:
+        window = sessions_between(start, end)
+        if len(window) >= n:
+            return window[-n:]
+        start -= pd.Timedelta(days=int(n * 7 / 5) + 30)
+
+def session_offset(offset=0, now=None):
+    """The session 'offset' sessions before the latest one (0 = latest)."""
+    return previous_sessions(offset + 1, now)[0]
+
+def window_start(sessions, now=None):
+    """First date of a history window covering exactly the last 'sessions' sessions."""
+    return previous_sessions(sessions, now)[0]